@@ -0,0 +1,179 @@
+"""
+atmosphere.py — MSIS density tabulated once, interpolated in the RHS
+
+A decay run asks for density thousands of times, but always over the same
+few hundred kilometres and the same few days. DensityTable samples MSIS once
+on an (epoch × altitude × latitude × longitude) grid — a single vectorized
+pymsis call, with the space-weather indices for every grid epoch passed in —
+and then answers each RHS query with log-linear interpolation:
+
+    table = DensityTable.build(epoch, days=3, alt_range_km=(100, 450),
+                               lon=np.arange(0, 361, 15), lat=np.arange(-60, 61, 10),
+                               space_weather="data/sw_g3_storm_2025-11.csv")
+    rho = table.density(t_s, alt_km, lat, lon)   # t_s seconds after `epoch`, kg/m³
+
+A scalar lat / lon gives a single-site table (the sky above one point).
+ln ρ is close to linear in altitude over a kilometre and smooth over an
+hour between index changes. The ap index steps every three hours, so grid
+epochs sit on the step boundaries and each step is sampled from both sides.
+A single-site 1 km × 1 h table then tracks MSIS to well under a percent; a
+global 4 km × 10° × 30° one to ~0.5 % typical and a few percent worst case.
+
+The interpolation itself is the @njit kernel `log_density`, so compiled
+RHS functions can read the table directly from `table.grid`,
+`table.log_rho` and `table.log_rho_left`.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pymsis
+from numba import njit
+
+import space_weather as sw
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def _axis(x, x0, dx, n):
+    """Lower grid index and weight for x on a regular axis (clamped; a 1-point axis has weight 0)."""
+    if n == 1:
+        return 0, 0.0
+    f = min(max((x - x0) / dx, 0.0), n - 1.0)
+    i = min(int(f), n - 2)
+    return i, f - i
+
+
+@njit(cache=True)
+def log_density(t_s, alt_km, lat, lon, grid, log_rho, log_rho_left):
+    """ln ρ from a table: `grid` = [t0, dt, alt0, dalt, lat0, dlat, lon0, dlon].
+
+    Longitude wraps by 360°; the upper time corner reads the left-limit samples so a
+    step in the indices is never smeared across a grid interval.
+    """
+    n_t, n_h, n_lat, n_lon = log_rho.shape
+    if n_lon > 1:
+        lon = grid[6] + (lon - grid[6]) % 360.0
+    i, wi = _axis(t_s, grid[0], grid[1], n_t)
+    j, wj = _axis(alt_km, grid[2], grid[3], n_h)
+    k, wk = _axis(lat, grid[4], grid[5], n_lat)
+    m, wm = _axis(lon, grid[6], grid[7], n_lon)
+    i1, j1 = min(i + 1, n_t - 1), min(j + 1, n_h - 1)
+    k1, m1 = min(k + 1, n_lat - 1), min(m + 1, n_lon - 1)
+
+    total = 0.0
+    for side in range(2):
+        table = log_rho if side == 0 else log_rho_left
+        ti = i if side == 0 else i1
+        wt = 1.0 - wi if side == 0 else wi
+        if wt == 0.0:
+            continue
+        s = ((1 - wj) * ((1 - wk) * ((1 - wm) * table[ti, j, k, m] + wm * table[ti, j, k, m1])
+                         + wk * ((1 - wm) * table[ti, j, k1, m] + wm * table[ti, j, k1, m1]))
+             + wj * ((1 - wk) * ((1 - wm) * table[ti, j1, k, m] + wm * table[ti, j1, k, m1])
+                     + wk * ((1 - wm) * table[ti, j1, k1, m] + wm * table[ti, j1, k1, m1])))
+        total += wt * s
+    return total
+
+
+@njit(cache=True)
+def density_many(t_s, alt_km, lat, lon, grid, log_rho, log_rho_left):
+    out = np.empty(t_s.size)
+    for n in range(t_s.size):
+        out[n] = np.exp(log_density(t_s[n], alt_km[n], lat[n], lon[n], grid, log_rho, log_rho_left))
+    return out
+
+
+# ================== TABLE ==================
+class DensityTable:
+    """ln ρ on a regular grid of seconds-after-epoch × altitude (km) × latitude (°) × longitude (°)."""
+
+    def __init__(self, epoch, t_s, alt_km, lat, lon, log_rho, log_rho_left=None, source="MSIS"):
+        self.epoch = epoch
+        self.t_s = np.asarray(t_s, dtype=float)
+        self.alt_km = np.asarray(alt_km, dtype=float)
+        self.lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        self.lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        shape = (self.t_s.size, self.alt_km.size, self.lat.size, self.lon.size)
+        self.log_rho = np.ascontiguousarray(np.reshape(log_rho, shape), dtype=float)
+        # ln ρ just before each grid epoch; differs from log_rho only where an index steps
+        self.log_rho_left = (self.log_rho if log_rho_left is None
+                             else np.ascontiguousarray(np.reshape(log_rho_left, shape), dtype=float))
+        self.source = source
+
+        def step(axis):
+            return axis[1] - axis[0] if axis.size > 1 else 1.0
+        self.grid = np.array([self.t_s[0], step(self.t_s), self.alt_km[0], step(self.alt_km),
+                              self.lat[0], step(self.lat), self.lon[0], step(self.lon)])
+
+    @classmethod
+    def build(cls, epoch, days, alt_range_km, lon, lat, space_weather=None,
+              version=2.0, step_s=3600.0, step_km=1.0):
+        """One pymsis call over the whole grid; `space_weather` as accepted by space_weather.resolve.
+
+        `lon` / `lat` are a single site or regular, ascending grids (° ; a longitude grid
+        should span 360° so the table wraps). `step_s` must divide the 3-hour ap bin so grid
+        epochs land on every index step; each step is sampled from both sides and
+        interpolation never blends two ap values.
+        """
+        if sw.AP_BIN_S % step_s:
+            raise ValueError(f"step_s={step_s} must divide the {sw.AP_BIN_S:.0f} s ap bin")
+        first = -(float(sw.to_seconds(np.datetime64(epoch, "us"))) % step_s)
+        n_t = int(np.ceil((days * 86400.0 - first) / step_s)) + 1
+        t_s = first + np.arange(n_t) * step_s
+        alt_km = np.arange(alt_range_km[0], alt_range_km[1] + step_km, step_km, dtype=float)
+        lon, lat = np.atleast_1d(np.asarray(lon, float)), np.atleast_1d(np.asarray(lat, float))
+        right = np.datetime64(epoch, "us") + (t_s * 1e6).astype("timedelta64[us]")
+        left = right - np.timedelta64(1, "ms")
+
+        # Left-limit samples are only needed where an index actually steps at a grid epoch;
+        # with pymsis's own lookup we cannot tell, so every epoch is sampled twice.
+        weather = sw.resolve(space_weather)
+        if weather is None:
+            stepped = np.ones(n_t, dtype=bool)
+        else:
+            (f_r, fa_r, ap_r), (f_l, fa_l, ap_l) = weather.indices(right), weather.indices(left)
+            stepped = ~((ap_r == ap_l).all(axis=1) & np.isclose(f_r, f_l, rtol=1e-3, atol=0)
+                        & np.isclose(fa_r, fa_l, rtol=1e-3, atol=0))
+        dates = np.concatenate((right, left[stepped]))
+
+        data = pymsis.calculate(dates, lon, lat, alt_km, version=version,
+                                **sw.msis_kwargs(weather, dates))
+        # pymsis grids as (date, lon, lat, alt); the table is (date, alt, lat, lon)
+        log_rho = np.log(np.asarray(data)[..., 0]).transpose(0, 3, 2, 1)
+        log_rho_left = log_rho[:n_t].copy()
+        log_rho_left[stepped] = log_rho[n_t:]
+        source = getattr(weather, "source", "pymsis default indices")
+        return cls(epoch, t_s, alt_km, lat, lon, log_rho[:n_t], log_rho_left, source=f"MSIS {version} / {source}")
+
+    def density(self, t_s, alt_km, lat=None, lon=None):
+        """ρ (kg/m³) at seconds-after-epoch, altitude and (for a gridded table) lat/lon.
+
+        Scalars or broadcastable arrays. Outside the grid the nearest edge is used
+        (clamped, not extrapolated); longitude wraps.
+        """
+        lat = self.lat[0] if lat is None else lat
+        lon = self.lon[0] if lon is None else lon
+        if np.ndim(t_s) == np.ndim(alt_km) == np.ndim(lat) == np.ndim(lon) == 0:
+            return float(np.exp(log_density(float(t_s), float(alt_km), float(lat), float(lon),
+                                            self.grid, self.log_rho, self.log_rho_left)))
+        t_s, alt_km, lat, lon = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (t_s, alt_km, lat, lon)))
+        rho = density_many(t_s.ravel(), alt_km.ravel(), lat.ravel(), lon.ravel(),
+                           self.grid, self.log_rho, self.log_rho_left)
+        return rho.reshape(t_s.shape)
+
+    def at(self, t_s):
+        """Datetime of a grid offset — handy when comparing against direct MSIS calls."""
+        return self.epoch + timedelta(seconds=float(t_s))
+
+    def save(self, path):
+        np.savez_compressed(path, epoch=np.datetime64(self.epoch, "us"), t_s=self.t_s, alt_km=self.alt_km,
+                            lat=self.lat, lon=self.lon, log_rho=self.log_rho,
+                            log_rho_left=self.log_rho_left, source=self.source)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        epoch = data["epoch"].astype("datetime64[us]").item()
+        return cls(epoch, data["t_s"], data["alt_km"], data["lat"], data["lon"], data["log_rho"],
+                   data["log_rho_left"], source=str(data["source"]))
@@ -0,0 +1,114 @@
+"""
+batch.py — many scenario files, every core, one columnar result
+
+    python batch.py scenarios/*.toml
+    python batch.py scenarios/*.toml --workers 8 --out batch_results/sweep-01
+
+Each scenario file runs in a worker process (processes are reused, so
+imports and JIT caches are paid once per worker, not once per file). The
+results land in <out>/:
+
+  summary.npz       one column per summary field, one row per scenario
+                    (numbers as float64 with NaN where a field is missing,
+                    everything else as strings; nested fields flattened to
+                    "a.b", lists to "a[0]", ...)
+  trajectories.npz  each scenario's arrays as "<name>/<array>"
+
+A scenario that fails is kept as a row with outcome="error" and its message,
+so one bad file never sinks the batch.
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def _run_file(path):
+    """Worker: load, build and run one scenario file."""
+    import scenario_files
+    t0 = time.perf_counter()
+    try:
+        scenario = scenario_files.load_scenario(path)
+        summary, arrays = scenario_files.run_scenario(scenario, quiet=True)
+        return {"path": path, "outcome": "ok", "error": "", **summary}, arrays
+    except Exception as exc:  # noqa: BLE001 — reported as a row, not raised
+        return {"path": path, "outcome": "error", "error": f"{type(exc).__name__}: {exc}",
+                "trace": traceback.format_exc(limit=3), "runtime_s": time.perf_counter() - t0}, {}
+
+
+def flatten(record, prefix=""):
+    """{"a": {"b": 1}, "c": [1, 2]} → {"a.b": 1, "c[0]": 1, "c[1]": 2}."""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (list, tuple)):
+            flat.update(flatten({f"[{i}]": v for i, v in enumerate(value)}, name))
+        else:
+            flat[name] = value
+    return flat
+
+
+def to_columns(rows):
+    """Rows of flat dicts → dict of equal-length numpy columns."""
+    names = []
+    for row in rows:
+        names.extend(k for k in row if k not in names)
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        numeric = all(v is None or (isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+                      for v in values)
+        if numeric:
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            columns[name] = np.array(["" if v is None else str(v) for v in values])
+    return columns
+
+
+def run_batch(paths, out_dir, workers=None):
+    """Run every scenario file across `workers` processes and write the columnar results."""
+    os.makedirs(out_dir, exist_ok=True)
+    rows, trajectories = [], {}
+    seen = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for summary, arrays in pool.map(_run_file, paths, chunksize=1):
+            name = summary.get("name") or os.path.splitext(os.path.basename(summary["path"]))[0]
+            unique, n = name, 1
+            while unique in seen:
+                n += 1
+                unique = f"{name}#{n}"
+            seen.add(unique)
+            summary["name"] = unique
+            rows.append(flatten(summary))
+            trajectories.update({f"{unique}/{key}": value for key, value in arrays.items()})
+            flag = "ok   " if summary["outcome"] == "ok" else "ERROR"
+            print(f"{flag} {unique:36} {summary.get('runtime_s', float('nan')):8.2f} s  {summary['error']}")
+
+    np.savez_compressed(os.path.join(out_dir, "summary.npz"), **to_columns(rows))
+    np.savez_compressed(os.path.join(out_dir, "trajectories.npz"), **trajectories)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run scenario files concurrently.")
+    parser.add_argument("files", nargs="+", help="scenario .toml files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="batch_results", help="output directory (default: batch_results)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    rows = run_batch(args.files, args.out, args.workers)
+    failed = sum(row["outcome"] != "ok" for row in rows)
+    print(f"\n{len(rows) - failed}/{len(rows)} scenarios ok in {time.perf_counter() - t0:.1f} s → {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
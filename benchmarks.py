@@ -0,0 +1,471 @@
+"""
+benchmarks.py — a stopwatch for every song and every hot kernel
+
+Times the things that decide how long a run takes:
+  · scalar and batched MSIS density calls
+  · RHS evaluations per second for each `derivatives` / `full_accel`
+  · end-to-end runtime of TrajectorySong, OrbitalInsertionSong (v1 + v2),
+    FullRoundTripSong and the orbit_tug 24 h propagations
+  · fresh-process startup to the first full_accel call: cold JIT, warm
+    on-disk cache and the AOT build (see force_models.py)
+  · peak traced memory of each case
+
+Every run is appended to .benchmarks/history.jsonl together with the git
+commit it was measured on, so a regression shows up as soon as two commits
+can be compared:
+
+    python benchmarks.py                  # run everything and store it
+    python benchmarks.py -k msis -k rhs   # only names containing "msis" or "rhs"
+    python benchmarks.py --quick          # one timed repeat per case
+    python benchmarks.py --compare        # latest stored run vs the one before
+    python benchmarks.py --compare abc123 # latest stored run vs commit abc123
+
+Runs offline: the MSIS cases pass explicit F10.7/Ap so pymsis never reaches
+for the network. The song cases call each song's own density lookup, which
+uses pymsis's cached SW-All.csv. Cases whose imports are missing (e.g.
+poliastro) are recorded as skipped, and a case that raises is recorded as an
+error; neither stops the rest of the suite.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".benchmarks", "history.jsonl")
+
+# Quiet-sun indices used for every offline MSIS benchmark call
+F107 = 150.0
+AP = 4.0
+MSIS_DATE = np.datetime64("2025-11-22T00:00")
+
+BENCHMARKS = []
+
+
+class Skip(Exception):
+    """Raised by a setup function when the case cannot run in this environment."""
+
+
+def benchmark(name, group, ops=1, repeat=5):
+    """Register `setup()` → `run()` under `name`. `ops` = operations per run (for ops/s)."""
+    def register(setup):
+        BENCHMARKS.append({"name": name, "group": group, "ops": ops, "repeat": repeat, "setup": setup})
+        return setup
+    return register
+
+
+def _import(module_name):
+    """Import a song module quietly (their constructors love to sing)."""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return __import__(module_name)
+    except ImportError as exc:
+        raise Skip(f"{module_name}: {exc}") from exc
+
+
+# ================== MSIS DENSITY ==================
+@benchmark("msis_scalar_call", "msis", ops=1, repeat=200)
+def _msis_scalar():
+    import pymsis
+
+    def run():
+        data = pymsis.calculate(MSIS_DATE, -140.0, 0.0, 250.0,
+                                f107s=F107, f107as=F107, aps=[[AP] * 7], version=2.0)
+        return float(data[0, 0])
+    return run
+
+
+@benchmark("msis_batched_10k", "msis", ops=10_000, repeat=5)
+def _msis_batched():
+    import pymsis
+    n = 10_000
+    dates = np.full(n, MSIS_DATE)
+    lons = np.full(n, -140.0)
+    lats = np.zeros(n)
+    alts = np.linspace(80.0, 1000.0, n)
+    f107 = np.full(n, F107)
+    aps = np.full((n, 7), AP)
+
+    def run():
+        return pymsis.calculate(dates, lons, lats, alts, f107s=f107, f107as=f107, aps=aps, version=2.0)
+    return run
+
+
+# ================== RHS EVALUATIONS ==================
+N_RHS = 500
+
+
+def _rhs_runner(fun, times, states):
+    def run():
+        for t, y in zip(times, states):
+            fun(t, y)
+    return run
+
+
+@benchmark("rhs_trajectory_song", "rhs", ops=N_RHS)
+def _rhs_trajectory():
+    module = _import("trajectory_song")
+    with contextlib.redirect_stdout(io.StringIO()):
+        song = module.TrajectorySong()
+    alts = np.linspace(120_000, 100, N_RHS)
+    states = [np.array([h, 7800.0 * h / 120_000 + 5.0, song.m]) for h in alts]
+    return _rhs_runner(song.derivatives, np.zeros(N_RHS), states)
+
+
+@benchmark("rhs_orbital_insertion_v1", "rhs", ops=N_RHS)
+def _rhs_insertion_v1():
+    module = _import("orbital_insertion_song")
+    with contextlib.redirect_stdout(io.StringIO()):
+        song = module.OrbitalInsertionSong()
+    times = np.linspace(0, 600, N_RHS)
+    states = [np.array([t * 500.0, t * 5.0, song.m_total - t * 5000.0]) for t in times]
+    return _rhs_runner(song.derivatives_ascent, times, states)
+
+
+@benchmark("rhs_orbital_insertion_v2", "rhs", ops=N_RHS)
+def _rhs_insertion_v2():
+    module = _import("orbital_insertion_song_v2")
+    with contextlib.redirect_stdout(io.StringIO()):
+        song = module.OrbitalInsertionSong()
+    times = np.linspace(0, 600, N_RHS)
+    states = [np.array([t * 500.0, t * 5.0, song.m_total - t * 5000.0]) for t in times]
+    return _rhs_runner(song.derivatives, times, states)
+
+
+@benchmark("rhs_full_round_trip", "rhs", ops=N_RHS)
+def _rhs_round_trip():
+    module = _import("full_round_trip_song")
+    with contextlib.redirect_stdout(io.StringIO()):
+        song = module.FullRoundTripSong()
+    # A third each through ascent, coast and low reentry (every phase's hot path)
+    n = N_RHS // 3
+    times = np.concatenate([np.linspace(0, 379, n), np.linspace(380, 5399, n),
+                            np.linspace(5500, 7000, N_RHS - 2 * n)])
+    states = ([np.array([t * 400.0, t * 4.0, song.m - t * 9000.0]) for t in times[:n]]
+              + [np.array([300_000.0, 0.0, 1.5e6]) for _ in range(n)]
+              + [np.array([h, -200.0, 1.4e5]) for h in np.linspace(90_000, 100, N_RHS - 2 * n)])
+    return _rhs_runner(song.derivatives, times, states)
+
+
+@benchmark("rhs_orbit_tug_perturbed_accel", "rhs", ops=N_RHS * 10)
+def _rhs_orbit_tug():
+    module = _import("orbit_tug")
+    k = module.Earth.k.to_value(module.u.km**3 / module.u.s**2)
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    module.perturbed_accel(0.0, u0, k)  # JIT outside the timed loop
+
+    def run():
+        for _ in range(N_RHS * 10):
+            module.perturbed_accel(0.0, u0, k)
+    return run
+
+
+@benchmark("rhs_orbit_tug_full_accel", "rhs", ops=N_RHS * 10)
+def _rhs_final_victory():
+    module = _import("orbit_tug_final_victory")
+    k = module.Earth.k.to_value(module.u.km**3 / module.u.s**2)
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    module.full_accel(0.0, u0, k)
+
+    def run():
+        for _ in range(N_RHS * 10):
+            module.full_accel(0.0, u0, k)
+    return run
+
+
+@benchmark("rhs_force_models_full_accel", "rhs", ops=N_RHS * 10)
+def _rhs_force_models():
+    force_models = __import__("force_models")
+    full_accel = force_models.get_rhs("full_accel")
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    full_accel(0.0, u0, force_models.MU_EARTH)
+
+    def run():
+        for _ in range(N_RHS * 10):
+            full_accel(0.0, u0, force_models.MU_EARTH)
+    return run
+
+
+@benchmark("rhs_force_models_field_deg20", "rhs", ops=N_RHS * 10)
+def _rhs_field_deg20():
+    force_models, gravity = __import__("force_models"), __import__("gravity")
+    full_accel_field = force_models.get_rhs("full_accel_field")
+    field = gravity.GravityField.kaula(20)   # synthetic degree-20 field: same cost as a real one
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    args = (force_models.MU_EARTH, field.C, field.S, field.radius, field.n_max, 0.0)
+    full_accel_field(0.0, u0, *args)
+
+    def run():
+        for _ in range(N_RHS * 10):
+            full_accel_field(0.0, u0, *args)
+    return run
+
+
+@benchmark("rhs_force_models_lunisolar", "rhs", ops=N_RHS * 10)
+def _rhs_lunisolar():
+    force_models, ephemeris = __import__("force_models"), __import__("ephemeris")
+    full_accel_lunisolar = force_models.get_rhs("full_accel_lunisolar")
+    sun, moon = ephemeris.sun_table(2461022.5, 2.0), ephemeris.moon_table(2461022.5, 2.0)
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    args = (force_models.MU_EARTH, sun.coeffs, sun.seg_s, moon.coeffs, moon.seg_s)
+    full_accel_lunisolar(3600.0, u0, *args)
+
+    def run():
+        for _ in range(N_RHS * 10):
+            full_accel_lunisolar(3600.0, u0, *args)
+    return run
+
+
+# ================== KERNEL STARTUP (force_models JIT cache / AOT) ==================
+def _startup_runner(env_fn):
+    force_models = __import__("force_models")
+
+    def run():
+        with contextlib.ExitStack() as stack:
+            env = env_fn(stack)
+            subprocess.run([sys.executable, "-c", force_models._STARTUP_PROBE], cwd=force_models.HERE,
+                           env={**os.environ, **env}, capture_output=True, check=True)
+    return run
+
+
+@benchmark("startup_full_accel_cold_jit", "startup", repeat=2)
+def _startup_cold():
+    import tempfile
+    return _startup_runner(lambda stack: {"NUMBA_CACHE_DIR": stack.enter_context(tempfile.TemporaryDirectory()),
+                                          "GYM_NO_AOT": "1"})
+
+
+@benchmark("startup_full_accel_warm_cache", "startup", repeat=3)
+def _startup_warm():
+    return _startup_runner(lambda stack: {"GYM_NO_AOT": "1"})
+
+
+@benchmark("startup_full_accel_aot", "startup", repeat=3)
+def _startup_aot():
+    if not __import__("force_models").aot_available():
+        raise Skip("no AOT build — run `python force_models.py --aot`")
+    return _startup_runner(lambda stack: {})
+
+
+# ================== END-TO-END SCENARIOS ==================
+def _solution_extras(sol):
+    return {"nfev": int(sol.nfev), "n_steps": int(sol.t.size - 1)}
+
+
+@benchmark("e2e_trajectory_song", "e2e", repeat=3)
+def _e2e_trajectory():
+    module = _import("trajectory_song")
+    return lambda: _solution_extras(module.simulate())
+
+
+@benchmark("e2e_orbital_insertion_v1", "e2e", repeat=3)
+def _e2e_insertion_v1():
+    module = _import("orbital_insertion_song")
+    return lambda: _solution_extras(module.simulate())
+
+
+@benchmark("e2e_orbital_insertion_v2", "e2e", repeat=3)
+def _e2e_insertion_v2():
+    module = _import("orbital_insertion_song_v2")
+    return lambda: _solution_extras(module.simulate())
+
+
+@benchmark("e2e_full_round_trip", "e2e", repeat=3)
+def _e2e_round_trip():
+    module = _import("full_round_trip_song")
+    return lambda: _solution_extras(module.simulate())
+
+
+@benchmark("e2e_full_round_trip_3dof", "e2e", repeat=3)
+def _e2e_round_trip_3dof():
+    module = _import("full_round_trip_song")
+    module.simulate_3dof()                                   # load the compiled kernels first
+    return lambda: _solution_extras(module.simulate_3dof())
+
+
+@benchmark("e2e_orbit_tug_24h_cases", "e2e", repeat=3)
+def _e2e_orbit_tug():
+    module = _import("orbit_tug")
+    initial = module.initial_orbit()
+
+    def run():
+        module.propagate_cases(initial, verbose=False)
+    return run
+
+
+@benchmark("e2e_orbit_tug_final_victory_24h", "e2e", repeat=3)
+def _e2e_final_victory():
+    module = _import("orbit_tug_final_victory")
+    initial = module.initial_orbit()
+
+    def run():
+        module.propagate_24h(initial)
+    return run
+
+
+# ================== RUNNER ==================
+def measure(case, repeat=None):
+    """Time one registered case; returns a JSON-ready result record."""
+    repeat = repeat or case["repeat"]
+    sink = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sink):
+            run = case["setup"]()
+            t0 = time.perf_counter()
+            extras = run()                                  # warm-up: JIT, caches, imports
+            first = time.perf_counter() - t0
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - t0)
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    except Skip as exc:
+        return {"status": "skipped", "reason": str(exc)}
+    except Exception as exc:  # noqa: BLE001 — one broken song must not stop the suite
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return {"status": "error", "reason": f"{type(exc).__name__}: {exc}"}
+
+    best = min(samples)
+    record = {
+        "status": "ok",
+        "group": case["group"],
+        "repeat": repeat,
+        "first_run_s": first,
+        "min_s": best,
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "ops": case["ops"],
+        "ops_per_s": case["ops"] / best if best > 0 else float("inf"),
+        "peak_traced_mb": peak / 2**20,
+    }
+    if isinstance(extras, dict):
+        record.update(extras)
+    return record
+
+
+def git_commit():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return sha + ("-dirty" if dirty else "")
+
+
+def run_suite(filters=(), quick=False):
+    results = {}
+    for case in BENCHMARKS:
+        if filters and not any(f in case["name"] for f in filters):
+            continue
+        record = measure(case, repeat=1 if quick else None)
+        results[case["name"]] = record
+        if record["status"] == "ok":
+            print(f"{case['name']:36} {record['min_s'] * 1e3:12.3f} ms  "
+                  f"{record['ops_per_s']:14,.0f} ops/s  {record['peak_traced_mb']:8.1f} MB")
+        else:
+            print(f"{case['name']:36} {record['status'].upper():>12}  {record['reason']}")
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+    }
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def save_run(entry, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as fh:
+        fh.write(json.dumps(entry) + "\n")
+
+
+def compare(new, old, threshold=0.10):
+    """Print min-time ratios new/old; return the names that slowed down by more than `threshold`."""
+    print(f"\nComparing {new['commit']} ({new['timestamp']}) against {old['commit']} ({old['timestamp']})")
+    regressions = []
+    for name, rec in new["results"].items():
+        prev = old["results"].get(name)
+        if rec.get("status") != "ok" or not prev or prev.get("status") != "ok":
+            continue
+        ratio = rec["min_s"] / prev["min_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ← REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  ← faster"
+        print(f"{name:36} {prev['min_s'] * 1e3:12.3f} → {rec['min_s'] * 1e3:12.3f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every song and hot kernel.")
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="one timed repeat per case")
+    parser.add_argument("--no-save", action="store_true", help="do not append to the history file")
+    parser.add_argument("--compare", nargs="?", const="", default=None, metavar="COMMIT",
+                        help="compare the latest stored run against COMMIT (default: the run before it)")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slow-down reported as a regression (default 0.10)")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in BENCHMARKS:
+            print(f"{case['group']:6} {case['name']}")
+        return 0
+
+    if args.compare is None:
+        entry = run_suite(args.filters, quick=args.quick)
+        if not args.no_save:
+            save_run(entry)
+            print(f"\nStored as {entry['commit']} in {HISTORY_PATH}")
+        return 0
+
+    history = load_history()
+    if len(history) < 2:
+        print("Need at least two stored runs to compare.")
+        return 1
+    new = history[-1]
+    if args.compare:
+        older = [h for h in history[:-1] if h["commit"].startswith(args.compare)]
+        if not older:
+            print(f"No stored run for commit {args.compare}.")
+            return 1
+        old = older[-1]
+    else:
+        old = history[-2]
+    return 1 if compare(new, old, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,24 @@
 import numpy as np
 from poliastro.bodies import Earth
 from poliastro.twobody import Orbit
-from poliastro.twobody.propagation import propagate
 from astropy import units as u
+from astropy.time import Time   # <-- add this import at top
 
 # Primary Starlink at 550 km, simple circular orbit
 a = Earth.R + 550 * u.km
-from astropy.time import Time   # <-- add this import at top
 
-epoch = Time.now()   # or Time("2025-11-17T12:00:00")
+def simulate(epoch=None):
+    """Build the primary and the debris 10 km above it; return (primary, debris)."""
+    if epoch is None:
+        epoch = Time.now()   # or Time("2025-11-17T12:00:00")
+
+    # Fixed lines
+    primary = Orbit.circular(Earth, alt=550 * u.km, epoch=epoch)
+    debris  = Orbit.circular(Earth, alt=560 * u.km, epoch=epoch)
+    return primary, debris
 
-# Fixed lines
-primary = Orbit.circular(Earth, alt=550 * u.km, epoch=epoch)
-debris  = Orbit.circular(Earth, alt=560 * u.km, epoch=epoch)
+if __name__ == "__main__":
+    primary, debris = simulate()
 
-print("Primary altitude:", (primary.a - Earth.R).to(u.km))
-print("Debris altitude:", (debris.a - Earth.R).to(u.km))
\ No newline at end of file
+    print("Primary altitude:", (primary.a - Earth.R).to(u.km))
+    print("Debris altitude:", (debris.a - Earth.R).to(u.km))
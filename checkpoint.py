@@ -0,0 +1,230 @@
+"""
+checkpoint.py — long runs that survive a crash: integrator state to disk, and back, bit for bit
+
+A month of PacificWhaleSong decay or a big ensemble can take hours; a
+preemption should cost minutes, not the run. Two drivers write their full
+state every `every_s` of wall time to one uncompressed npz (written to
+<path>.tmp, fsynced, then renamed over <path>, so a crash mid-write leaves
+the previous checkpoint intact), and pick up from it when asked to resume:
+
+    sol = checkpoint.solve_ivp(rhs, (0, 30 * 86400), y0, "decay.ckpt.npz", events=reentry,
+                               rtol=1e-9, atol=1e-9, settings={...}, resume=True)
+    y, t_stop, work = checkpoint.propagate_ensemble(y0, 30 * 86400, "mc.ckpt.npz", table=table,
+                                                    beta=beta, segment_s=86400, rng=rng, resume=True)
+
+`solve_ivp` steps scipy's RK45 / RK23 / DOP853 object by hand with
+solve_ivp's event handling, so with no checkpoint it reproduces
+scipy.integrate.solve_ivp exactly. The checkpoint holds t, y, f, the
+next step size h_abs, the evaluation counters and every accepted point so
+far; restoring those four numbers is all an explicit RK solver needs to
+take the same next step. `propagate_ensemble` flies ensemble.propagate in
+fixed segments and checkpoints between them, with the state of the
+caller's numpy Generator alongside. A resumed run matches the
+uninterrupted one bit for bit.
+
+`settings` (JSON-able) is stored with the state. Resuming against a
+checkpoint made with different settings raises ValueError instead of
+quietly splicing two different runs.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+from scipy.integrate import DOP853, RK23, RK45
+from scipy.optimize import OptimizeResult, brentq
+
+METHODS = {"RK45": RK45, "RK23": RK23, "DOP853": DOP853}
+FORMAT_VERSION = 1
+EVENT_TOL = 4 * np.finfo(float).eps      # solve_ivp's tolerance on event roots
+
+
+# ================== FILES ==================
+def save(path, state, settings=None, rng=None):
+    """Write `state` (arrays) + settings + Generator state atomically; returns seconds spent."""
+    t0 = time.perf_counter()
+    tmp = f"{path}.tmp"
+    rng_state = None if rng is None else rng.bit_generator.state
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **state, settings=json.dumps(settings or {}, sort_keys=True, default=str),
+                 rng=json.dumps(rng_state), version=FORMAT_VERSION)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return time.perf_counter() - t0
+
+
+def load(path, settings=None):
+    """(state dict, settings, Generator or None); checks `settings` against the stored ones."""
+    with np.load(path) as f:
+        state = {k: f[k] for k in f.files if k not in ("settings", "rng", "version")}
+        if int(f["version"]) != FORMAT_VERSION:
+            raise ValueError(f"{path}: checkpoint format {int(f['version'])}, expected {FORMAT_VERSION}")
+        stored = json.loads(str(f["settings"]))
+        rng_state = json.loads(str(f["rng"]))
+    if settings is not None:
+        expected = json.loads(json.dumps(settings, sort_keys=True, default=str))
+        if stored != expected:
+            changed = sorted(k for k in set(stored) | set(expected) if stored.get(k) != expected.get(k))
+            raise ValueError(f"{path}: checkpoint was written with different settings {changed}")
+    rng = None
+    if rng_state is not None:
+        bit_generator = getattr(np.random, rng_state["bit_generator"])()
+        bit_generator.state = rng_state
+        rng = np.random.Generator(bit_generator)
+    return state, stored, rng
+
+
+# ================== ODE DRIVER ==================
+def _event_values(events, t, y):
+    return np.array([event(t, y) for event in events])
+
+
+def _find_events(events, sol, g_old, g_new, t_old, t):
+    """Roots of the events that changed sign over the step, in time order; (indices, roots, stop)."""
+    found = []
+    for i, event in enumerate(events):
+        direction = getattr(event, "direction", 0)
+        up = g_old[i] <= 0 <= g_new[i]
+        down = g_old[i] >= 0 >= g_new[i]
+        if (up and direction > 0) or (down and direction < 0) or ((up or down) and direction == 0):
+            root = brentq(lambda s: event(s, sol(s)), t_old, t, xtol=EVENT_TOL, rtol=EVENT_TOL)
+            found.append((root, i))
+    found.sort(key=lambda x: x[0] * np.sign(t - t_old))
+    stop = False
+    kept = []
+    for root, i in found:
+        kept.append((i, root))
+        if getattr(events[i], "terminal", False):
+            stop = True
+            break
+    return kept, stop
+
+
+def solve_ivp(fun, t_span, y0, path=None, every_s=60.0, events=None, method="RK45",
+              settings=None, resume=False, **options):
+    """solve_ivp with periodic checkpoints to `path`; continues from it when `resume` is set.
+
+    `options` are the solver's (rtol, atol, max_step, first_step). Returns a solve_ivp-style
+    OptimizeResult plus `checkpoints` (files written) and `checkpoint_s` (time spent writing).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {sorted(METHODS)}, got {method!r}")
+    events = [] if events is None else (list(events) if isinstance(events, (list, tuple)) else [events])
+    t0, t_bound = float(t_span[0]), float(t_span[1])
+    run = {"t_span": [t0, t_bound], "method": method, "options": options, "n_events": len(events),
+           **(settings or {})}
+    solver = METHODS[method](fun, t0, np.asarray(y0, dtype=float), t_bound, **options)
+
+    ts, ys = [t0], [solver.y.copy()]
+    status = message = None
+    t_events = [[] for _ in events]
+    y_events = [[] for _ in events]
+    if resume and path is not None and os.path.exists(path):
+        state, _, _ = load(path, run)
+        solver.t, solver.y, solver.f = float(state["t"]), state["y"].copy(), state["f"].copy()
+        solver.h_abs = float(state["h_abs"])
+        solver.nfev, solver.njev, solver.nlu = (int(n) for n in state["counters"])
+        ts, ys = list(state["ts"]), list(state["ys"])
+        for i in range(len(events)):
+            t_events[i] = list(state[f"t_events_{i}"])
+            y_events[i] = list(state[f"y_events_{i}"])
+        if int(state["status"]) >= 0:                            # it had already finished
+            status = int(state["status"])
+
+    def snapshot():
+        state = {"t": solver.t, "y": solver.y, "f": solver.f, "h_abs": solver.h_abs,
+                 "counters": np.array([solver.nfev, solver.njev, solver.nlu]),
+                 "ts": np.array(ts), "ys": np.array(ys), "status": -2 if status is None else status}
+        for i in range(len(events)):
+            state[f"t_events_{i}"] = np.array(t_events[i])
+            state[f"y_events_{i}"] = np.array(y_events[i]).reshape(-1, solver.n)
+        return state
+
+    g = _event_values(events, solver.t, solver.y)
+    written, spent, last = 0, 0.0, time.perf_counter()
+    while status is None:
+        message = solver.step()
+        if solver.status == "finished":
+            status = 0
+        elif solver.status == "failed":
+            status = -1
+            break
+        t_old, t, y = solver.t_old, solver.t, solver.y
+        if events:
+            g_new = _event_values(events, t, y)
+            if np.any(((g <= 0) & (g_new >= 0)) | ((g >= 0) & (g_new <= 0))):
+                sol = solver.dense_output()
+                found, stop = _find_events(events, sol, g, g_new, t_old, t)
+                for i, root in found:
+                    t_events[i].append(root)
+                    y_events[i].append(sol(root))
+                if stop:
+                    status = 1
+                    t = found[-1][1]
+                    y = sol(t)
+            g = g_new
+        ts.append(t)
+        ys.append(y.copy())
+        if path is not None and status is None and time.perf_counter() - last >= every_s:
+            spent += save(path, snapshot(), run)
+            written += 1
+            last = time.perf_counter()
+
+    if status is not None and status >= 0:
+        message = {0: "The solver successfully reached the end of the integration interval.",
+                   1: "A termination event occurred."}[status]
+    if path is not None:
+        spent += save(path, snapshot(), run)
+        written += 1
+    return OptimizeResult(t=np.array(ts), y=np.array(ys).T, sol=None,
+                          t_events=[np.array(te) for te in t_events] if events else None,
+                          y_events=[np.array(ye).reshape(-1, solver.n) for ye in y_events] if events else None,
+                          nfev=solver.nfev, njev=solver.njev, nlu=solver.nlu, status=status,
+                          message=message, success=status >= 0, checkpoints=written, checkpoint_s=spent)
+
+
+# ================== ENSEMBLE DRIVER ==================
+def propagate_ensemble(y0, duration_s, path, segment_s=86400.0, every_s=60.0, rng=None,
+                       settings=None, resume=False, **propagate_settings):
+    """ensemble.propagate in `segment_s` slices with a checkpoint between them.
+
+    `propagate_settings` go to ensemble.propagate (table, beta, t0, dt, use_j2, stop_alt_km).
+    Members that stopped early (reentered) stay stopped. `rng` is saved with the state and,
+    on resume, its state is restored in place so the caller's draws carry on where they were.
+    Returns (y, t_stop, work) like ensemble.propagate.
+    """
+    import ensemble
+
+    table = propagate_settings.pop("table", None)
+    t0 = np.broadcast_to(np.asarray(propagate_settings.pop("t0", 0.0), dtype=float), (len(y0),))
+    run = {"n": len(y0), "duration_s": duration_s, "segment_s": segment_s,
+           "propagate": {k: np.asarray(v).tolist() for k, v in propagate_settings.items()},
+           "table": None if table is None else table.source, **(settings or {})}
+
+    y, t, work = np.array(y0, dtype=float), t0.copy(), np.zeros(len(y0))
+    done = 0.0
+    if resume and os.path.exists(path):
+        state, _, saved_rng = load(path, run)
+        y, t, work, done = state["y"], state["t"], state["work"], float(state["done"])
+        if rng is not None and saved_rng is not None:
+            rng.bit_generator.state = saved_rng.bit_generator.state
+
+    def members(value, flying):
+        value = np.asarray(value)
+        return value[flying] if value.ndim and value.shape[0] == len(flying) else value
+
+    last = time.perf_counter()
+    while done < duration_s:
+        span = min(segment_s, duration_s - done)
+        flying = t >= t0 + done - 1e-6                        # reentered members stopped short
+        per_member = {k: members(v, flying) for k, v in propagate_settings.items()}
+        y_new, t_new, w = ensemble.propagate(y[flying], span, table, t0=t[flying], **per_member)
+        y[flying], t[flying], work[flying] = y_new, t_new, work[flying] + w
+        done += span
+        if done < duration_s and time.perf_counter() - last >= every_s:
+            save(path, {"y": y, "t": t, "work": work, "done": done}, run, rng)
+            last = time.perf_counter()
+    save(path, {"y": y, "t": t, "work": work, "done": done}, run, rng)
+    return y, t, work
@@ -0,0 +1,267 @@
+"""
+descent_sensitivity.py — how touchdown answers every knob, from one flight
+
+Tuning TrajectorySong by rerunning it once per finite-difference probe
+costs 2k + 1 flights for k knobs. Here one flight carries the forward
+sensitivity (variational) equations along with the state:
+
+    dS/dt = ∂f/∂y · S + ∂f/∂p,      S = ∂y/∂p,   y = [alt, v_up, m]
+
+and returns d(touchdown speed, propellant used, touchdown time)/dp for the
+chosen song parameters:
+
+    result = descent_sensitivity.fly(song, wrt=("h_burn", "throttle_floor", "Cd_belly"))
+    result.gradients["touchdown_speed_m_s"]["h_burn"]          # m/s per m
+
+The dynamics are TrajectorySong's — the attitude drag schedule, its
+landing rule (throttle to g + 0.05 m/s², floored and capped, below
+h_burn, while propellant lasts) and its site's MSIS sky from a
+DensityTable — written as compiled kernels over one parameter array
+(indices P_*). Both Jacobians are central differences inside those kernels.
+The rule switches the right-hand side at altitudes and at burnout, so each switch
+ends an integration segment; there the sensitivities take the jump
+
+    S⁺ = S⁻ + (f⁻ − f⁺) dτ/dp,      dτ/dp = −(g_y S⁻ + g_p) / (g_y f⁻)
+
+which is the only way h_burn reaches the answer at all. State and speed
+use one sign convention (v_up, negative when falling); the song's own
+derivatives mix a speed with a velocity and reach the ground in 14 s.
+"""
+
+import numpy as np
+from numba import njit
+from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+
+from atmosphere import DensityTable, log_density
+from instrumentation import section
+
+R_EARTH_KM = 6371.0
+
+# Parameter-array layout (song attribute names in PARAMETERS, same order)
+(P_G0, P_ISP, P_M_DRY, P_M_PROP, P_T_MAX, P_FLOOR, P_H_BURN, P_HOVER_MARGIN,
+ P_CD_BELLY, P_A_BELLY, P_CD_EDGE, P_A_EDGE, P_CD_VERTICAL, P_A_VERTICAL,
+ P_ALT_BELLY, P_ALT_VERTICAL, N_PARAMS) = range(17)
+PARAMETERS = ("g0", "Isp", "m_dry", "m_prop_start", "thrust_max", "throttle_floor", "h_burn", None,
+              "Cd_belly", "A_belly", "Cd_edge", "A_edge", "Cd_vertical", "A_vertical", None, None)
+OUTPUTS = ("touchdown_speed_m_s", "propellant_used_kg", "t_touchdown_s")
+FD_RTOL_PER_STEP = 1e-7      # loosest rtol per unit relative step that still differences to a few %
+
+BELLY, EDGE, VERTICAL = range(3)
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def rates(t, y, P, attitude, burning, grid, log_rho, log_rho_left):
+    """d/dt [alt, v_up, m] with the mode held fixed (attitude, burn on/off)."""
+    alt, v, m = y[0], y[1], y[2]
+    g = P[P_G0] * (R_EARTH_KM / (R_EARTH_KM + alt / 1000.0)) ** 2
+    if attitude == BELLY:
+        cda = P[P_CD_BELLY] * P[P_A_BELLY]
+    elif attitude == EDGE:
+        cda = P[P_CD_EDGE] * P[P_A_EDGE]
+    else:
+        cda = P[P_CD_VERTICAL] * P[P_A_VERTICAL]
+    rho = np.exp(log_density(t, max(alt, 0.0) / 1000.0, grid[4], grid[6], grid, log_rho, log_rho_left))
+    a_drag = -0.5 * rho * v * abs(v) * cda / m
+    thrust = 0.0
+    if burning:
+        thrust = min(max((g + P[P_HOVER_MARGIN]) * m, P[P_FLOOR] * P[P_T_MAX]), P[P_T_MAX])
+    dy = np.empty(3)
+    dy[0] = v
+    dy[1] = thrust / m - g + a_drag
+    dy[2] = -thrust / (P[P_ISP] * P[P_G0])
+    return dy
+
+
+@njit(cache=True)
+def augmented(t, z, P, wrt, attitude, burning, grid, log_rho, log_rho_left):
+    """[ẏ, Ṡ] for z = [y (3), S (3 × k) row-major]; Jacobians by central differences."""
+    k = wrt.size
+    y = z[:3]
+    S = z[3:].reshape(3, k)
+    dz = np.empty(3 + 3 * k)
+    dz[:3] = rates(t, y, P, attitude, burning, grid, log_rho, log_rho_left)
+    J = np.empty((3, 3))
+    for j in range(3):
+        h = 1e-7 * max(abs(y[j]), 1.0)
+        yp, ym = y.copy(), y.copy()
+        yp[j] += h
+        ym[j] -= h
+        J[:, j] = (rates(t, yp, P, attitude, burning, grid, log_rho, log_rho_left)
+                   - rates(t, ym, P, attitude, burning, grid, log_rho, log_rho_left)) / (2.0 * h)
+    dS = J @ S
+    for i in range(k):
+        j = wrt[i]
+        h = 1e-7 * max(abs(P[j]), 1.0)
+        Pp, Pm = P.copy(), P.copy()
+        Pp[j] += h
+        Pm[j] -= h
+        dS[:, i] += (rates(t, y, Pp, attitude, burning, grid, log_rho, log_rho_left)
+                     - rates(t, y, Pm, attitude, burning, grid, log_rho, log_rho_left)) / (2.0 * h)
+    dz[3:] = dS.ravel()
+    return dz
+
+
+# ================== PYTHON SIDE ==================
+def params(song):
+    """Parameter array from TrajectorySong attributes (the hover margin is the rule's 0.05 m/s²)."""
+    P = np.zeros(N_PARAMS)
+    for i, name in enumerate(PARAMETERS):
+        if name is not None:
+            P[i] = getattr(song, name)
+    P[P_HOVER_MARGIN] = 0.05
+    P[P_ALT_BELLY], P[P_ALT_VERTICAL] = 70_000.0, 800.0
+    return P
+
+
+def _attitude(alt, P):
+    return BELLY if alt > P[P_ALT_BELLY] else (EDGE if alt > P[P_ALT_VERTICAL] else VERTICAL)
+
+
+def _switches(P):
+    """(name, g(y), ∂g/∂y, index of the parameter g moves with or None) for every mode boundary."""
+    return [("belly", lambda y: y[0] - P[P_ALT_BELLY], np.array([1.0, 0.0, 0.0]), None),
+            ("vertical", lambda y: y[0] - P[P_ALT_VERTICAL], np.array([1.0, 0.0, 0.0]), None),
+            ("burn", lambda y: y[0] - P[P_H_BURN], np.array([1.0, 0.0, 0.0]), P_H_BURN),
+            ("burnout", lambda y: y[2] - P[P_M_DRY], np.array([0.0, 0.0, 1.0]), P_M_DRY),
+            ("ground", lambda y: y[0], np.array([1.0, 0.0, 0.0]), None)]
+
+
+def _terminal(fun):
+    def event(t, z, *args):
+        return fun(z[:3])
+    event.terminal = True
+    return event
+
+
+def site_table(song, t_max, top_km):
+    return DensityTable.build(song.date, t_max / 86400.0, (0.0, top_km), lon=song.site_lon, lat=song.site_lat,
+                              space_weather=song.space_weather, version=song.msis_version, step_km=0.5)
+
+
+def fly(song=None, probe=None, wrt=("h_burn", "throttle_floor", "m_prop_start", "Cd_belly", "Cd_edge", "Cd_vertical"),
+        h0=120_000.0, v0=7800.0, t_max=900.0, rtol=1e-8, atol=1e-8, max_step=5.0, table=None, P=None):
+    """One flight from h0 falling at v0 with sensitivities to `wrt` (song attribute names).
+
+    Returns an OptimizeResult: t, y [alt, v_up, m] and S (3, k, n) along the flight, the
+    touchdown `outputs`, and `gradients[output][parameter]`; `switches` lists (name, t).
+    """
+    if song is None:
+        import trajectory_song
+        song = trajectory_song.TrajectorySong()
+    if probe is not None:
+        probe.attach(song)
+    P = params(song) if P is None else P
+    unknown = [name for name in wrt if name not in PARAMETERS]
+    if unknown:
+        raise ValueError(f"no sensitivity parameter(s) {unknown}; choose from "
+                         f"{[p for p in PARAMETERS if p is not None]}")
+    idx = np.array([PARAMETERS.index(name) for name in wrt], dtype=np.int64)
+    if table is None:
+        with section(probe, "density_table"):
+            table = site_table(song, t_max, h0 / 1000.0 + 5.0)
+    grid, log_rho, log_rho_left = table.grid, table.log_rho, table.log_rho_left
+
+    with section(probe, "solve"):
+        result = _integrate(P, idx, tuple(wrt), h0, v0, t_max, rtol, atol, max_step, grid, log_rho, log_rho_left)
+    if probe is not None:
+        probe.record_solution(result, "RK45")
+    return result
+
+
+def _integrate(P, idx, wrt, h0, v0, t_max, rtol, atol, max_step, grid, log_rho, log_rho_left):
+    k = idx.size
+    y = np.array([h0, -abs(v0), P[P_M_DRY] + P[P_M_PROP]])
+    S = np.zeros((3, k))
+    S[2, idx == P_M_PROP] = 1.0                              # m0 = m_dry + m_prop_start
+    S[2, idx == P_M_DRY] = 1.0
+    attitude, burning = _attitude(y[0], P), y[0] <= P[P_H_BURN] and y[2] > P[P_M_DRY]
+    t = 0.0
+    ts, ys, Ss, switches = [np.array([t])], [y[:, None]], [S[:, :, None]], []
+    nfev = 0
+    boundaries = _switches(P)
+    while True:
+        live = [b for b in boundaries if b[0] != "burnout" or burning]   # mass only moves while burning
+        events = [_terminal(fun) for _, fun, _, _ in live]
+        sol = solve_ivp(augmented, (t, t_max), np.concatenate([y, S.ravel()]), method="RK45",
+                        args=(P, idx, attitude, burning, grid, log_rho, log_rho_left), events=events,
+                        rtol=rtol, atol=atol, max_step=max_step)
+        nfev += sol.nfev
+        ts.append(sol.t[1:])
+        ys.append(sol.y[:3, 1:])
+        Ss.append(sol.y[3:, 1:].reshape(3, k, sol.t.size - 1))
+        t, z = sol.t[-1], sol.y[:, -1]
+        y, S = z[:3].copy(), z[3:].reshape(3, k).copy()
+        if sol.status != 1:
+            break
+        hit = next(i for i, te in enumerate(sol.t_events) if te.size)
+        name, _, g_y, moves = live[hit]
+        f_minus = rates(t, y, P, attitude, burning, grid, log_rho, log_rho_left)
+        g_p = np.where(idx == moves, -1.0, 0.0) if moves is not None else np.zeros(k)
+        dtau = -(g_y @ S + g_p) / (g_y @ f_minus)
+        switches.append((name, t))
+        if name == "ground":
+            S = S + np.outer(f_minus, dtau)                 # touchdown state, time-shifted
+            break
+        if name == "burnout":
+            burning = False
+        elif name == "burn":
+            burning = f_minus[0] < 0.0 and y[2] > P[P_M_DRY]  # on going down, off climbing back out
+        else:
+            attitude = _attitude(y[0] + np.sign(f_minus[0]), P)
+        f_plus = rates(t, y, P, attitude, burning, grid, log_rho, log_rho_left)
+        S = S + np.outer(f_minus - f_plus, dtau)
+        # Nudge past the boundary so the event that stopped us does not fire again at once
+        y = y + f_plus * 1e-9
+
+    landed = bool(switches) and switches[-1][0] == "ground"
+    outputs = {"touchdown_speed_m_s": abs(y[1]), "propellant_used_kg": P[P_M_DRY] + P[P_M_PROP] - y[2],
+               "t_touchdown_s": t}
+    d_outputs = {"touchdown_speed_m_s": np.sign(y[1]) * S[1],
+                 "propellant_used_kg": np.where((idx == P_M_PROP) | (idx == P_M_DRY), 1.0, 0.0) - S[2],
+                 "t_touchdown_s": dtau if landed else np.zeros(k)}
+    return OptimizeResult(
+        t=np.concatenate(ts), y=np.concatenate(ys, axis=1), S=np.concatenate(Ss, axis=2),
+        wrt=wrt, outputs=outputs,
+        gradients={out: dict(zip(wrt, (float(x) for x in d_outputs[out]))) for out in OUTPUTS},
+        switches=switches, nfev=nfev, status=1 if landed else 0, success=landed,
+        message="Touched the ground." if landed else "Reached t_max.",
+        t_events=[np.array([t])] if landed else [np.empty(0)],
+        y_events=[y[None, :]] if landed else [np.empty((0, 3))])
+
+
+def finite_differences(song=None, wrt=("h_burn",), rel_step=1e-2, rtol=1e-11, atol=1e-10, **settings):
+    """The brute-force check: 2 flights per parameter (sensitivities off), central differences.
+
+    The difference of two flights is only as good as their tolerances: d/dCd_belly, a
+    weak knob, comes out with the wrong sign at rtol 1e-8 and a 1e-4 step. So the
+    defaults are tight and the step wide, and an rtol above FD_RTOL_PER_STEP × rel_step
+    is refused rather than differenced."""
+    if rtol > FD_RTOL_PER_STEP * rel_step:
+        raise ValueError(f"rtol {rtol:g} cannot resolve a {rel_step:g} relative step; "
+                         f"use rtol ≤ {FD_RTOL_PER_STEP * rel_step:g} or a wider step")
+    if song is None:
+        import trajectory_song
+        song = trajectory_song.TrajectorySong()
+    base = params(song)
+    table = settings.pop("table", None) or site_table(song, settings.get("t_max", 900.0),
+                                                       settings.get("h0", 120_000.0) / 1000.0 + 5.0)
+    out = {name: {} for name in OUTPUTS}
+    for name in wrt:
+        i = PARAMETERS.index(name)
+        h = rel_step * max(abs(base[i]), 1.0)
+        values = []
+        for sign in (1.0, -1.0):
+            P = base.copy()
+            P[i] += sign * h
+            values.append(fly(song, wrt=(), table=table, P=P, rtol=rtol, atol=atol, **settings).outputs)
+        for o in OUTPUTS:
+            out[o][name] = (values[0][o] - values[1][o]) / (2.0 * h)
+    return out
+
+
+def summary(result):
+    """Touchdown outputs and their gradients as plain floats (gym's summary.json)."""
+    return {"touchdown": {k: float(v) for k, v in result.outputs.items()},
+            "gradients": result.gradients, "switches": [[name, float(t)] for name, t in result.switches]}
@@ -0,0 +1,222 @@
+"""
+ensemble.py — hundreds of orbits at once: parallel compiled RK4 with J2 and MSIS-table drag
+
+Trade studies and Monte Carlo runs ask the same question of many nearby
+states. Calling solve_ivp once per member pays Python on every step; here
+the whole ensemble is one @njit(parallel=True) call, each member a
+fixed-step RK4 in its own prange iteration, reading J2 from force_models,
+the sub-satellite point from frames and the sky from an atmosphere
+DensityTable — the same physics as PacificWhaleSong's decay, minus Python:
+
+    table = DensityTable.build(epoch, days, (80, 1000), lon=..., lat=...)
+    y, t_stop, work = ensemble.propagate(y0, duration_s=86400.0, table=table, beta=30.0)
+
+`y0` is (n, 6) ECI km / km/s at seconds `t0` after the table epoch;
+`beta` is the ballistic coefficient m / (C_D A) in kg/m², per member or
+shared. Members stop at `duration_s` or when they sink below
+`stop_alt_km` (geodetic), whichever is first; `work` is the specific
+work done by drag (km²/s², ≤ 0), which turns into a decay rate with
+`decay_rate`. `lifetime` carries states on to reentry with King-Hele's
+orbit-averaged perigee / apogee decay. The step is stretched with
+(r / r_ref)^1.5 so apogee arcs of eccentric orbits do not cost as much as
+perigee passes.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+import frames
+from atmosphere import log_density
+from force_models import MU_EARTH, R_EARTH_KM, j2_accel
+
+STEP_R_REF_KM = 6878.0          # the step is `dt` at this radius and grows as r^1.5 beyond it
+MAX_STEP_S = 300.0
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def derivatives(t, y, k, use_j2, beta, jd0, grid, log_rho, log_rho_left):
+    """[v, a, drag power] for one member: two-body (+ J2) + drag from a density table (km, s)."""
+    r, v = y[:3], y[3:6]
+    r_norm = np.sqrt(r[0] * r[0] + r[1] * r[1] + r[2] * r[2])
+    du = np.zeros(7)
+    du[:3] = v
+    du[3:6] = -k * r / r_norm ** 3
+    if use_j2:
+        du[3:6] += j2_accel(r, k)
+    if beta > 0.0:
+        lat, lon, alt = frames.eci_to_geodetic(r, jd0 + t / 86400.0)
+        top = grid[2] + grid[3] * (log_rho.shape[1] - 1)
+        if 0.0 < alt <= top:
+            rho = np.exp(log_density(t, alt, lat, lon, grid, log_rho, log_rho_left))
+            v_rel = frames.relative_velocity(r, v)
+            speed = np.sqrt(v_rel[0] ** 2 + v_rel[1] ** 2 + v_rel[2] ** 2)
+            a_drag = -(500.0 * rho * speed / beta) * v_rel               # ½ρ(1000 v)²/β → km/s²
+            du[3:6] += a_drag
+            du[6] = a_drag[0] * v[0] + a_drag[1] * v[1] + a_drag[2] * v[2]
+    return du
+
+
+@njit(cache=True)
+def _rk4(t, y, h, k, use_j2, beta, jd0, grid, log_rho, log_rho_left):
+    k1 = derivatives(t, y, k, use_j2, beta, jd0, grid, log_rho, log_rho_left)
+    k2 = derivatives(t + 0.5 * h, y + 0.5 * h * k1, k, use_j2, beta, jd0, grid, log_rho, log_rho_left)
+    k3 = derivatives(t + 0.5 * h, y + 0.5 * h * k2, k, use_j2, beta, jd0, grid, log_rho, log_rho_left)
+    k4 = derivatives(t + h, y + h * k3, k, use_j2, beta, jd0, grid, log_rho, log_rho_left)
+    return y + (h / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+
+@njit(parallel=True, cache=True)
+def propagate_many(y0, t0, t_end, dt, k, use_j2, beta, jd0, grid, log_rho, log_rho_left, stop_alt_km):
+    """Advance every row of y0 from t0[i] to t_end[i]; returns (y, t_stop, drag work)."""
+    n = y0.shape[0]
+    y_out = np.empty((n, 6))
+    t_out = np.empty(n)
+    work = np.empty(n)
+    for i in prange(n):
+        y = np.zeros(7)
+        y[:6] = y0[i]
+        t = t0[i]
+        alt = frames.geodetic_altitude(y[:3])
+        while t < t_end[i]:
+            r_norm = np.sqrt(y[0] ** 2 + y[1] ** 2 + y[2] ** 2)
+            h = min(dt * (r_norm / STEP_R_REF_KM) ** 1.5, MAX_STEP_S, t_end[i] - t)
+            y_new = _rk4(t, y, h, k, use_j2, beta[i], jd0, grid, log_rho, log_rho_left)
+            alt_new = frames.geodetic_altitude(y_new[:3])
+            if alt_new < stop_alt_km:
+                f = (alt - stop_alt_km) / (alt - alt_new)                # linear to the crossing
+                y = y + f * (y_new - y)
+                t += f * h
+                break
+            y, t, alt = y_new, t + h, alt_new
+        y_out[i] = y[:6]
+        t_out[i] = t
+        work[i] = y[6]
+    return y_out, t_out, work
+
+
+# ================== ARRAY HELPERS ==================
+def states_from_elements(a_km, ecc, inc_deg, raan_deg, argp_deg, nu_deg, k=MU_EARTH):
+    """Classical elements (broadcastable arrays) → (..., 6) ECI states, km and km/s."""
+    a, e = np.asarray(a_km, float), np.asarray(ecc, float)
+    inc, raan, argp, nu = (np.radians(np.asarray(x, float)) for x in (inc_deg, raan_deg, argp_deg, nu_deg))
+    p = a * (1.0 - e * e)
+    r = p / (1.0 + e * np.cos(nu))
+    r_pf = np.stack([r * np.cos(nu), r * np.sin(nu), np.zeros_like(r)], axis=-1)
+    v_pf = np.stack([-np.sin(nu), e + np.cos(nu), np.zeros_like(r)], axis=-1) * np.sqrt(k / p)[..., None]
+    cO, sO, ci, si, cw, sw = np.cos(raan), np.sin(raan), np.cos(inc), np.sin(inc), np.cos(argp), np.sin(argp)
+    rot = np.stack([np.stack([cO * cw - sO * sw * ci, -cO * sw - sO * cw * ci, sO * si], axis=-1),
+                    np.stack([sO * cw + cO * sw * ci, -sO * sw + cO * cw * ci, -cO * si], axis=-1),
+                    np.stack([sw * si, cw * si, ci], axis=-1)], axis=-2)
+    return np.concatenate([np.einsum("...ij,...j->...i", rot, r_pf),
+                           np.einsum("...ij,...j->...i", rot, v_pf)], axis=-1)
+
+
+def apsides(y, k=MU_EARTH):
+    """(..., 6) states → (a, r_p, r_a) in km, osculating two-body values (r_a = inf when unbound)."""
+    r = np.linalg.norm(y[..., :3], axis=-1)
+    v2 = np.sum(y[..., 3:] ** 2, axis=-1)
+    a = 1.0 / (2.0 / r - v2 / k)
+    h = np.cross(y[..., :3], y[..., 3:])
+    p = np.sum(h * h, axis=-1) / k
+    e = np.sqrt(np.maximum(1.0 - p / a, 0.0))
+    return a, a * (1.0 - e), np.where(a > 0, a * (1.0 + e), np.inf)
+
+
+def decay_rate(y, work, elapsed_s, k=MU_EARTH):
+    """Mean da/dt (km/s) from the drag work over `elapsed_s`: ȧ = 2a²/μ · dE/dt."""
+    a = apsides(y, k)[0]
+    return 2.0 * a * a / k * work / np.maximum(elapsed_s, 1e-9)
+
+
+def mean_profile(table):
+    """(alt km, ρ kg/m³) of a DensityTable averaged over its epochs, latitudes and longitudes."""
+    return table.alt_km, np.exp(table.log_rho).mean(axis=(0, 2, 3))
+
+
+def lifetime(y, beta, alt_km, rho, stop_alt_km, horizon_days=36_525.0, k=MU_EARTH, n_nodes=256,
+             max_iter=100_000):
+    """Days until perigee sinks to `stop_alt_km`; inf when it does not within `horizon_days`.
+
+    King-Hele's orbit-averaged drag decay over a static ρ(h) profile (alt_km, rho): per
+    revolution, with δ = 1/β and F the atmosphere-rotation factor at perigee,
+
+        Δa = −F δ a² ∮ ρ (1 + e cos E)^(3/2) / (1 − e cos E)^(1/2) dE
+        Δe = −F δ a (1 − e²) ∮ ρ ((1 + e cos E) / (1 − e cos E))^(1/2) cos E dE
+
+    taken by quadrature in eccentric anomaly E over the profile itself, so the apogee comes
+    down first and the orbit circularizes before the perigee falls. Each step covers as many
+    revolutions as keep the perigee change within 5 % of the scale height there and the apogee
+    change within 2 % of r_a − r_p. Steps run over the whole ensemble at once.
+    """
+    a, rp, ra = (np.array(x, dtype=float).ravel() for x in apsides(y, k))
+    e = np.where(np.isfinite(ra), (ra - rp) / (ra + rp), 0.0)
+    h_vec = np.cross(y[..., :3], y[..., 3:]).reshape(-1, 3)
+    cos_i = h_vec[:, 2] / np.linalg.norm(h_vec, axis=-1)
+    delta = 1.0 / np.broadcast_to(np.asarray(beta, dtype=float), np.shape(y)[:-1]).ravel()
+    alt_km = np.asarray(alt_km, dtype=float)
+    log_rho = np.log(np.maximum(np.asarray(rho, dtype=float), 1e-300))
+    inv_h = -np.diff(log_rho) / np.diff(alt_km)                      # 1/H per layer, 1/km
+    alt_mid = 0.5 * (alt_km[1:] + alt_km[:-1])
+    r_stop, horizon_s = R_EARTH_KM + stop_alt_km, horizon_days * 86400.0
+    cos_E = np.cos(np.linspace(0.0, np.pi, n_nodes))                 # integrands are even in E
+    w_E = np.full(n_nodes, 2.0 * np.pi / (n_nodes - 1))
+    w_E[[0, -1]] *= 0.5
+
+    t = np.zeros(a.shape)
+    out = np.full(a.shape, np.inf)
+    down = rp <= r_stop
+    out[down] = 0.0
+    active = ~down & (a > 0)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        i = np.flatnonzero(active)
+        ai, ei = a[i], e[i]
+        ec = ei[:, None] * cos_E
+        h = ai[:, None] * (1.0 - ec) - R_EARTH_KM
+        rho_E = np.where(h <= alt_km[-1], np.exp(np.interp(h, alt_km, log_rho)), 0.0)
+        root = np.sqrt((1.0 + ec) / (1.0 - ec))
+        r_p = ai * (1.0 - ei)
+        v_p = np.sqrt(k / ai * (1.0 + ei) / (1.0 - ei))
+        F = (1.0 - r_p * frames.OMEGA_EARTH * cos_i[i] / v_p) ** 2
+        q = F * delta[i] * 1000.0                                      # δ m²/kg · ρ kg/m³ · a km → km/km
+        da = -q * ai * ai * ((rho_E * (1.0 + ec) * root) @ w_E)
+        de = -q * ai * (1.0 - ei * ei) * ((rho_E * root * cos_E) @ w_E)
+        dae = ai * de + ei * da
+        scale = 1.0 / np.maximum(np.interp(r_p - R_EARTH_KM, alt_mid, inv_h), 1e-6)
+        period = 2.0 * np.pi * np.sqrt(ai ** 3 / k)
+        with np.errstate(divide="ignore"):
+            revs = np.minimum(0.05 * scale / np.abs(da - dae), 0.02 * (2.0 * ai * ei + scale) / np.abs(da + dae))
+        revs = np.minimum(revs, (horizon_s - t[i]) / period)
+        a[i] = ai + revs * da
+        e[i] = np.maximum(ai * ei + revs * dae, 0.0) / a[i]
+        t[i] += revs * period
+        landed = a[i] * (1.0 - e[i]) <= r_stop
+        out[i[landed]] = t[i[landed]] / 86400.0
+        active[i[landed | (t[i] >= horizon_s * (1.0 - 1e-12))]] = False
+    return out.reshape(np.shape(y)[:-1])
+
+
+def propagate(y0, duration_s, table=None, beta=np.inf, t0=0.0, dt=10.0, use_j2=True,
+              stop_alt_km=0.0, k=MU_EARTH):
+    """Python entry to propagate_many: broadcasts t0 / beta, and flies drag-free without a table."""
+    y0 = np.ascontiguousarray(np.atleast_2d(y0), dtype=float)
+    n = y0.shape[0]
+    t0 = np.broadcast_to(np.asarray(t0, dtype=float), (n,)).copy()
+    t_end = t0 + duration_s
+    beta = np.broadcast_to(np.asarray(beta, dtype=float), (n,)).copy()
+    if table is None:
+        grid, log_rho = np.array([0.0, 1.0, 0.0, 1.0, 0.0, 1.0, 0.0, 1.0]), np.zeros((1, 1, 1, 1))
+        beta[:], jd0, log_rho_left = 0.0, frames.JD_J2000, log_rho
+    else:
+        grid, log_rho, log_rho_left = table.grid, table.log_rho, table.log_rho_left
+        jd0 = float(frames.julian_date(table.epoch))
+    beta = np.where(np.isfinite(beta), beta, 0.0)
+    return propagate_many(y0, t0, t_end, float(dt), float(k), bool(use_j2), beta, jd0,
+                          grid, log_rho, log_rho_left, float(stop_alt_km))
+
+
+def warm():
+    """Compile propagate_many once so the on-disk cache holds it."""
+    propagate(np.array([[R_EARTH_KM + 500.0, 0.0, 0.0, 0.0, 7.6, 0.0]]), 60.0)
@@ -0,0 +1,198 @@
+"""
+ephemeris.py — where the Sun and Moon are, fitted once and read back in compiled code
+
+SRP needs the Sun's direction and distance on every RHS call, and whether
+the Earth is in the way; lunisolar third-body terms need the Moon as well.
+Evaluating even a cheap analytic series there is wasted work: over a
+propagation window both paths are smooth enough that a handful of
+Chebyshev coefficients per segment reproduce them to far better than the
+series themselves. So the series is evaluated once, at the
+Chebyshev nodes of each segment, and the RHS reads the fitted coefficients
+with a Clenshaw sum:
+
+    sun = ephemeris.sun_table(jd_epoch, days=1.0)             # cached per window
+    moon = ephemeris.moon_table(jd_epoch, days=1.0)
+    r_sun = ephemeris.chebyshev_position(t_s, sun.coeffs, sun.seg_s)   # @njit, km
+    nu = ephemeris.shadow_fraction(r_sat, r_sun, ephemeris.CONICAL)     # @njit, 0 … 1
+
+`t_s` is seconds after the table epoch; arrays are plain float64 so any
+@njit RHS can take them as arguments (force_models.case_accel does).
+
+The Sun and Moon models are the Astronomical Almanac's low-precision
+series (Sun 0.01°; Moon 0.3° and ~0.2 % in distance; 1950 to 2050), in
+the mean equator and equinox of date — the
+songs' "ECI" to within precession, as in frames.py. The shadow is either a
+cylinder of Earth radius or the dual cone of umbra and penumbra with the
+partial-overlap area of Montenbruck & Gill, Satellite Orbits §3.4.2.
+"""
+
+import functools
+
+import numpy as np
+from numba import njit
+
+from frames import JD_J2000, julian_date
+
+AU_KM = 149_597_870.7
+R_SUN_KM = 696_000.0
+R_EARTH_SHADOW_KM = 6378.137    # equatorial radius; the shadow ignores flattening
+
+NO_SHADOW, CYLINDRICAL, CONICAL = 0, 1, 2
+SHADOW_MODELS = {"none": NO_SHADOW, "cylindrical": CYLINDRICAL, "conical": CONICAL}
+
+
+# ================== ANALYTIC SUN ==================
+def sun_position(jd):
+    """Geocentric Sun position (km, mean equator of date) at Julian date(s) — numpy, not @njit."""
+    T = (np.asarray(jd, dtype=float) - JD_J2000) / 36525.0
+    mean_lon = np.radians(280.460 + 36000.771 * T)
+    M = np.radians(357.5291092 + 35999.05034 * T)
+    ecl_lon = mean_lon + np.radians(1.914666471 * np.sin(M) + 0.019994643 * np.sin(2 * M))
+    dist = AU_KM * (1.000140612 - 0.016708617 * np.cos(M) - 0.000139589 * np.cos(2 * M))
+    eps = np.radians(23.439291 - 0.0130042 * T)
+    return np.stack([dist * np.cos(ecl_lon),
+                     dist * np.cos(eps) * np.sin(ecl_lon),
+                     dist * np.sin(eps) * np.sin(ecl_lon)], axis=-1)
+
+
+def moon_position(jd):
+    """Geocentric Moon position (km, mean equator of date) at Julian date(s) — numpy, not @njit."""
+    T = (np.asarray(jd, dtype=float) - JD_J2000) / 36525.0
+
+    def sin(a, b):
+        return np.sin(np.radians(a + b * T))
+
+    def cos(a, b):
+        return np.cos(np.radians(a + b * T))
+
+    ecl_lon = np.radians(218.32 + 481267.8813 * T + 6.29 * sin(134.9, 477198.85) - 1.27 * sin(259.2, -413335.38)
+                         + 0.66 * sin(235.7, 890534.23) + 0.21 * sin(269.9, 954397.70)
+                         - 0.19 * sin(357.5, 35999.05) - 0.11 * sin(186.6, 966404.05))
+    ecl_lat = np.radians(5.13 * sin(93.3, 483202.03) + 0.28 * sin(228.2, 960400.87)
+                         - 0.28 * sin(318.3, 6003.18) - 0.17 * sin(217.6, -407332.20))
+    parallax = np.radians(0.9508 + 0.0518 * cos(134.9, 477198.85) + 0.0095 * cos(259.2, -413335.38)
+                          + 0.0078 * cos(235.7, 890534.23) + 0.0028 * cos(269.9, 954397.70))
+    dist = R_EARTH_SHADOW_KM / np.sin(parallax)
+    eps = np.radians(23.439291 - 0.0130042 * T)
+    x = np.cos(ecl_lat) * np.cos(ecl_lon)
+    y = np.cos(ecl_lat) * np.sin(ecl_lon)
+    z = np.sin(ecl_lat)
+    return dist[..., None] * np.stack([x, np.cos(eps) * y - np.sin(eps) * z,
+                                       np.sin(eps) * y + np.cos(eps) * z], axis=-1)
+
+
+# ================== CHEBYSHEV TABLES ==================
+class ChebyshevEphemeris:
+    """Piecewise Chebyshev fit of a body's position: `coeffs` (segments × 3 × degree+1), `seg_s` long each."""
+
+    def __init__(self, jd0, coeffs, seg_s, source="<arrays>"):
+        self.jd0 = float(jd0)
+        self.coeffs = np.ascontiguousarray(coeffs, dtype=float)
+        self.seg_s = float(seg_s)
+        self.source = source
+
+    @property
+    def span_s(self):
+        return self.coeffs.shape[0] * self.seg_s
+
+    @classmethod
+    def fit(cls, position, jd0, days, segment_days, degree, source="<fit>"):
+        """Sample `position(jd) → (n, 3) km` at each segment's Chebyshev nodes and interpolate."""
+        n_seg = max(int(np.ceil(days / segment_days)), 1)
+        n = degree + 1
+        k = np.arange(n)
+        nodes = np.cos(np.pi * (k + 0.5) / n)                       # on [-1, 1]
+        mid = (np.arange(n_seg) + 0.5) * segment_days
+        jd = jd0 + mid[:, None] + 0.5 * segment_days * nodes[None, :]
+        samples = position(jd.ravel()).reshape(n_seg, n, 3)
+        basis = np.cos(np.pi * np.outer(np.arange(n), k + 0.5) / n) * (2.0 / n)   # (j, k)
+        basis[0] *= 0.5
+        coeffs = np.einsum("jk,skc->scj", basis, samples)
+        return cls(jd0, coeffs, segment_days * 86400.0, source=source)
+
+    def position(self, t_s):
+        """Fitted position (km) at seconds after jd0 — scalar or array."""
+        t_s = np.asarray(t_s, dtype=float)
+        out = chebyshev_position_many(np.atleast_1d(t_s).ravel(), self.coeffs, self.seg_s)
+        return out.reshape(t_s.shape + (3,))
+
+
+@njit(cache=True)
+def chebyshev_position(t_s, coeffs, seg_s):
+    """Clenshaw sum of a ChebyshevEphemeris at t_s (s after its epoch); clamped to the fitted span."""
+    n_seg, _, n = coeffs.shape
+    i = min(max(int(t_s // seg_s), 0), n_seg - 1)
+    x = 2.0 * (t_s - i * seg_s) / seg_s - 1.0
+    out = np.empty(3)
+    for c in range(3):
+        b1 = b2 = 0.0
+        for j in range(n - 1, 0, -1):
+            b1, b2 = 2.0 * x * b1 - b2 + coeffs[i, c, j], b1
+        out[c] = x * b1 - b2 + coeffs[i, c, 0]
+    return out
+
+
+@njit(cache=True)
+def chebyshev_position_many(t_s, coeffs, seg_s):
+    out = np.empty((t_s.size, 3))
+    for n in range(t_s.size):
+        out[n] = chebyshev_position(t_s[n], coeffs, seg_s)
+    return out
+
+
+def _julian(epoch):
+    return float(epoch) if isinstance(epoch, (int, float, np.floating)) else float(julian_date(epoch))
+
+
+@functools.lru_cache(maxsize=16)
+def _sun_table(jd0, days, segment_days, degree):
+    return ChebyshevEphemeris.fit(sun_position, jd0, days, segment_days, degree, source="Sun (AA low precision)")
+
+
+def sun_table(epoch, days, segment_days=2.0, degree=8) -> ChebyshevEphemeris:
+    """Sun fit from `epoch` (Julian date or datetime) over `days`; the fit adds < 1 m to the series' error."""
+    return _sun_table(_julian(epoch), float(days), float(segment_days), int(degree))
+
+
+@functools.lru_cache(maxsize=16)
+def _moon_table(jd0, days, segment_days, degree):
+    return ChebyshevEphemeris.fit(moon_position, jd0, days, segment_days, degree, source="Moon (AA low precision)")
+
+
+def moon_table(epoch, days, segment_days=1.0, degree=12) -> ChebyshevEphemeris:
+    """Moon fit from `epoch` over `days`; one-day segments keep the fit at the metre level."""
+    return _moon_table(_julian(epoch), float(days), float(segment_days), int(degree))
+
+
+# ================== SHADOW ==================
+@njit(cache=True)
+def shadow_fraction(r, r_sun, model):
+    """Fraction of the solar disc visible from r (km): 1 sunlit, 0 umbra, in between penumbra."""
+    if model == NO_SHADOW:
+        return 1.0
+    r_norm = np.sqrt(r[0] * r[0] + r[1] * r[1] + r[2] * r[2])
+    d = r_sun - r
+    d_norm = np.sqrt(d[0] * d[0] + d[1] * d[1] + d[2] * d[2])
+    if model == CYLINDRICAL:
+        s_norm = np.sqrt(r_sun[0] ** 2 + r_sun[1] ** 2 + r_sun[2] ** 2)
+        along = (r[0] * r_sun[0] + r[1] * r_sun[1] + r[2] * r_sun[2]) / s_norm
+        if along < 0.0 and r_norm * r_norm - along * along < R_EARTH_SHADOW_KM * R_EARTH_SHADOW_KM:
+            return 0.0
+        return 1.0
+    # conical: apparent radii of Sun (a) and Earth (b), and their separation (c)
+    a = np.arcsin(min(R_SUN_KM / d_norm, 1.0))
+    b = np.arcsin(min(R_EARTH_SHADOW_KM / r_norm, 1.0))
+    cos_c = -(r[0] * d[0] + r[1] * d[1] + r[2] * d[2]) / (r_norm * d_norm)
+    c = np.arccos(min(max(cos_c, -1.0), 1.0))
+    if c >= a + b:
+        return 1.0
+    if c <= b - a:
+        return 0.0
+    if c <= a - b:                                   # annular: Earth inside the solar disc
+        return 1.0 - (b * b) / (a * a)
+    x = (c * c + a * a - b * b) / (2.0 * c)
+    y = np.sqrt(max(a * a - x * x, 0.0))
+    area = a * a * np.arccos(min(max(x / a, -1.0), 1.0)) \
+        + b * b * np.arccos(min(max((c - x) / b, -1.0), 1.0)) - c * y
+    return 1.0 - area / (np.pi * a * a)
+
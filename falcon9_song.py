@@ -5,7 +5,9 @@ Author: Amanda Wech-Meehan (@Am1Alpha)
 """
 
 import pymsis
+import space_weather as sw
 from datetime import datetime
+from instrumentation import finish, from_env
 
 class Falcon9Song:
     """She only weighs 25 tons, but carries the dreams of a thousand launches."""
@@ -14,26 +16,38 @@ class Falcon9Song:
         self.name = "Falcon 9 First Stage"
         self.dry_mass = 25_600          # kg
         self.prop_mass_landing = 3_000   # kg residual
-        self.total_mass = self.dry_mass + self.prop_mass_landing
+        self._update_mass()
         
         self.thrust_merlin_sl = 934_000  # N sea-level
         self.grid_fin_area = 4 * 3.5     # m² rough
         self.body_diameter = 3.7         # m
+        self.area_entry = 40             # m² effective area with grid fins deployed
+        self.cd_entry = 1.2
+
+        # Droneship station the sky is sampled over
+        self.site_lon = 0.0              # Atlantic droneship longitude (approx)
+        self.site_lat = 25.0             # off Florida
+        self.msis_version = 2.0
+        self.space_weather = None        # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
         
         print("A single Merlin is warming up.")
         print("Grid fins folded like sleeping dragonfly wings.")
         print("She is listening…\n")
 
+    def _update_mass(self):
+        self.total_mass = self.dry_mass + self.prop_mass_landing
+
     def get_atm_density(self, alt_km: float, dt: datetime = None) -> float:
         """Same gentle sky that carried the whale and the cathedral."""
         if dt is None:
             dt = datetime.utcnow()
         data = pymsis.calculate(
             alts=alt_km,
-            lons=0.0,      # Atlantic droneship longitude (approx)
-            lats=25.0,     # off Florida
+            lons=self.site_lon,
+            lats=self.site_lat,
             dates=dt,
-            version=2.0
+            version=self.msis_version,
+            **sw.msis_kwargs(self.space_weather, dt)
         )
         return float(data[0, 0])
 
@@ -44,9 +58,7 @@ class Falcon9Song:
             
         rho = self.get_atm_density(alt_km, dt)       # ← NOW PROPERLY BREATHING
         v_m_s = v_km_s * 1000
-        A = 40                                        # effective area with grid fins deployed
-        Cd = 1.2
-        drag_force = 0.5 * rho * v_m_s**2 * Cd * A
+        drag_force = 0.5 * rho * v_m_s**2 * self.cd_entry * self.area_entry
         return drag_force / self.total_mass / 1000    # km/s²
 
     def landing_burn_acceleration(self) -> float:
@@ -55,8 +67,26 @@ class Falcon9Song:
         net_acc = (self.thrust_merlin_sl / self.total_mass / 1000) - g0
         return net_acc
 
+def simulate(falcon=None, probe=None, alt_km=60.0, speed_km_s=2.0, date=datetime(2025, 12, 25)):
+    """Entry-burn drag sample plus the hoverslam acceleration, as a summary dict."""
+    if falcon is None:
+        falcon = Falcon9Song()
+    falcon.space_weather = sw.resolve(falcon.space_weather)   # a file is read here once, not per RHS call
+    if probe is not None:
+        probe.attach(falcon)
+    drag = falcon.drag_acceleration(alt_km, speed_km_s, date)
+    return {
+        "total_mass_kg": falcon.total_mass,
+        "drag_km_s2": drag,
+        "drag_g": drag * 1000 / 9.81,
+        "landing_net_accel_g": falcon.landing_burn_acceleration() * 1000 / 9.81,
+    }
+
 if __name__ == "__main__":
     falcon = Falcon9Song()
+    probe = from_env("falcon9")
+    if probe is not None:
+        probe.attach(falcon)
     
     print("≈ 70 km – Entry burn complete. Grid fins glowing orange.")
     drag_g = falcon.drag_acceleration(60, 2.0, datetime(2025, 12, 25)) * 1000 / 9.81
@@ -74,4 +104,5 @@ if __name__ == "__main__":
     print("One Merlin falls silent.")
     print("Another launch site cheers.")
     print("We did it again.")
-    print("The family is complete. 🐳✨🦅")
\ No newline at end of file
+    print("The family is complete. 🐳✨🦅")
+    finish(probe)
@@ -0,0 +1,304 @@
+"""
+flight_analysis.py — what the flight did to her, read off the stored arrays
+
+Max-Q, g-loads and touchdown speed used to be worked out by hand after
+each run, usually by calling drag_acceleration again one scalar at a time.
+This stage takes trajectories that are already stored (one run, or a
+NaN-padded stack of many) and makes one vectorized pass over every
+sample. Nothing is re-integrated:
+
+    profile = AtmosphereProfile.for_song(song)          # one pymsis call: ρ, T, mean molar mass
+    arrays = flight_analysis.analyze(sol.t, sol.y, profile, **flight_analysis.vehicle(song))
+    record = flight_analysis.summarize(arrays)
+    table = flight_analysis.records(t, y, profile, **flight_analysis.vehicle(song))   # 10k-run stacks
+
+    python flight_analysis.py runs/trajectory/result.npz --song trajectory_song
+    python flight_analysis.py batch_results/sweep-01/trajectories.npz --song trajectory_song
+
+Per sample it gives dynamic pressure q = ½ρV², Mach from the local speed
+of sound √(γ k_B T / m̄), axial load (T − D) / (m g₀) with thrust read back
+from the mass flow (T = −ṁ I_sp g₀, staging drops excluded), Sutton-Graves
+stagnation heat flux k √(ρ / R_n) V³, its time integral (heat load), and
+the propellant left over the dry mass. `summarize` turns those into one record per trajectory:
+max-Q, peak Mach, peak g, peak heat flux, heat load, touchdown speed and
+propellant margin.
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+
+import space_weather as sw
+
+K_SUTTON_GRAVES = 1.7415e-4           # Earth air, SI: q̇ [W/m²] = k √(ρ / R_n) V³
+K_BOLTZMANN = 1.380649e-23
+GAMMA_AIR = 1.4
+G0 = 9.80665
+NOSE_RADIUS_M = 4.5                   # a 9 m ship's nose
+PROFILE_TOP_KM = 150.0                # the songs' sky ends here
+LAYOUTS = ("radial", "planar3dof")
+
+
+# ================== ATMOSPHERE ==================
+class AtmosphereProfile:
+    """ρ, T and mean particle mass on an altitude grid over one site and date."""
+
+    def __init__(self, alt_km, rho, temperature, particle_mass, source="MSIS"):
+        self.alt_km = np.asarray(alt_km, dtype=float)
+        self.log_rho = np.log(np.maximum(np.asarray(rho, dtype=float), 1e-300))
+        self.temperature = np.asarray(temperature, dtype=float)
+        self.particle_mass = np.asarray(particle_mass, dtype=float)
+        self.source = source
+
+    @classmethod
+    def build(cls, date, lon, lat, space_weather=None, version=2.0, top_km=PROFILE_TOP_KM, step_km=0.5):
+        """One pymsis call: column 0 is mass density, 1–9 the number densities, 10 temperature."""
+        import pymsis
+        alt = np.arange(0.0, top_km + step_km, step_km)
+        data = pymsis.calculate(dates=np.datetime64(date), lons=lon, lats=lat, alts=alt, version=version,
+                                **sw.msis_kwargs(space_weather, date)).reshape(alt.size, -1)
+        number = np.nansum(data[:, 1:10], axis=1)
+        return cls(alt, data[:, 0], data[:, 10], data[:, 0] / number, source=f"MSIS {version}")
+
+    @classmethod
+    def for_song(cls, song, top_km=PROFILE_TOP_KM, step_km=0.5):
+        return cls.build(getattr(song, "date", datetime(2025, 12, 25)), song.site_lon, song.site_lat,
+                         space_weather=song.space_weather, version=song.msis_version,
+                         top_km=top_km, step_km=step_km)
+
+    def sample(self, alt_m):
+        """(ρ, speed of sound) for an array of altitudes; ρ = 0 outside the profile."""
+        alt_km = np.asarray(alt_m, dtype=float) / 1000.0
+        inside = (alt_km >= self.alt_km[0]) & (alt_km <= self.alt_km[-1])
+        rho = np.where(inside, np.exp(np.interp(alt_km, self.alt_km, self.log_rho)), 0.0)
+        temperature = np.interp(alt_km, self.alt_km, self.temperature)
+        particle_mass = np.interp(alt_km, self.alt_km, self.particle_mass)
+        return rho, np.sqrt(GAMMA_AIR * K_BOLTZMANN * temperature / particle_mass)
+
+    def save(self, path):
+        np.savez_compressed(path, alt_km=self.alt_km, log_rho=self.log_rho, temperature=self.temperature,
+                            particle_mass=self.particle_mass, source=self.source)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["alt_km"], np.exp(f["log_rho"]), f["temperature"], f["particle_mass"],
+                       source=str(f["source"]))
+
+
+# ================== VEHICLES ==================
+def vehicle(song, layout="radial", P=None):
+    """analyze() keyword arguments for a song: C_D·A and I_sp schedules, dry mass, nose radius.
+
+    For the insertion / round-trip stacks every event time and drag area is read from
+    planar3dof's parameter array `P` (default: as the song module's simulate_3dof builds
+    it), the one the 1-D songs' schedules also match. The 1-D ascent songs never drop the
+    booster casing, so their dry mass counts it.
+    """
+    if hasattr(song, "A_stack"):                        # insertion / round trip
+        import planar3dof as p3
+        if P is None:
+            P = planar_params(song)
+
+        def cd_area(t, alt, speed):
+            ascent = P[p3.P_CD_BASE] * (1.0 + 0.8 * np.minimum(speed / 340.0 / 5.0, 1.0) ** 2) * P[p3.P_A_STACK]
+            reentry = np.select([alt > P[p3.P_ALT_BELLY], alt > P[p3.P_ALT_VERTICAL]],
+                                [P[p3.P_CD_BELLY] * P[p3.P_A_BELLY], P[p3.P_CD_MID] * P[p3.P_A_MID]],
+                                P[p3.P_CD_VERTICAL] * P[p3.P_A_VERTICAL])
+            return np.where(t < P[p3.P_T_DEORBIT], ascent, reentry)
+
+        def isp(t, alt, speed):
+            return np.where(t < P[p3.P_T_STAGE], P[p3.P_ISP_BOOSTER], P[p3.P_ISP_SHIP])
+
+        def m_dot_max(t, alt, speed):
+            return np.where(t < P[p3.P_T_STAGE], P[p3.P_T_BOOSTER], P[p3.P_T_SHIP]) / (isp(t, alt, speed) * P[p3.P_G0])
+        m_dry = song.m_dry_ship + (0.0 if layout == "planar3dof" else song.m_dry_booster)
+        extra = {"omega_atm": P[p3.P_OMEGA_ATM]} if layout == "planar3dof" else {}
+    elif hasattr(song, "A_belly"):                      # TrajectorySong
+        def cd_area(t, alt, speed):
+            return np.select([alt > 70_000.0, alt > 800.0],
+                             [song.Cd_belly * song.A_belly, song.Cd_edge * song.A_edge],
+                             song.Cd_vertical * song.A_vertical)
+        isp, m_dry, m_dot_max, extra = song.Isp, song.m_dry, None, {}
+    else:
+        raise ValueError(f"no vehicle schedule for {type(song).__name__}")
+    return {"cd_area": cd_area, "isp": isp, "m_dry": m_dry, "m_dot_max": m_dot_max,
+            "nose_radius_m": NOSE_RADIUS_M, "g0": song.g0, "layout": layout, **extra}
+
+
+def planar_params(song):
+    """planar3dof.params for `song` with its module's simulate_3dof defaults (mission times, orbit)."""
+    import inspect
+    import sys
+
+    import planar3dof
+    fly = getattr(sys.modules[type(song).__module__], "simulate_3dof", None)
+    defaults = {} if fly is None else {name: p.default for name, p in inspect.signature(fly).parameters.items()}
+    keys = {"t_meco": "t_meco", "t_deorbit": "t_deorbit", "orbit_alt": "orbit_alt", "target_alt": "orbit_alt"}
+    return planar3dof.params(song, **{keys[k]: v for k, v in defaults.items() if k in keys})
+
+
+# ================== STACKING ==================
+def stack(trajectories):
+    """[(t, y), ...] of different lengths → (t (k, n), y (k, rows, n)), NaN-padded at the end."""
+    n = max(t.size for t, _ in trajectories)
+    rows = trajectories[0][1].shape[0]
+    t_all = np.full((len(trajectories), n), np.nan)
+    y_all = np.full((len(trajectories), rows, n), np.nan)
+    for i, (t, y) in enumerate(trajectories):
+        t_all[i, :t.size] = t
+        y_all[i, :, :t.size] = y
+    return t_all, y_all
+
+
+def load_trajectories(path):
+    """A gym result.npz (t, y) or a batch trajectories.npz ("<name>/t", "<name>/y") → (names, t, y)."""
+    with np.load(path) as f:
+        if "t" in f.files:
+            return ["run"], f["t"][None, :], f["y"][None, :, :]
+        names = sorted({k.rsplit("/", 1)[0] for k in f.files if k.endswith("/t") and k[:-2] + "/y" in f.files})
+        t, y = stack([(f[f"{name}/t"], f[f"{name}/y"]) for name in names])
+    return names, t, y
+
+
+# ================== ANALYSIS ==================
+def _evaluate(value, t, alt, speed):
+    value = value(t, alt, speed) if callable(value) else value
+    return np.broadcast_to(np.asarray(value, dtype=float), t.shape)
+
+
+def analyze(t, y, profile, cd_area, isp, m_dry, nose_radius_m=NOSE_RADIUS_M, g0=G0,
+            layout="radial", omega_atm=0.0, m_dot_max=None):
+    """Per-sample loads for trajectories t (..., n), y (..., rows, n); NaN samples stay NaN.
+
+    `layout` says how to read y: "radial" rows are [alt, v, m] (the 1-D songs and
+    landing_guidance), "planar3dof" rows [alt, v_r, m, downrange, v_h], with the air
+    turning at `omega_atm` rad/s in the flight plane. `cd_area`, `isp` and `m_dot_max`
+    are numbers, arrays or callables f(t, alt, speed) evaluated once over every sample.
+    A step that loses mass faster than `m_dot_max` (kg/s, the engines' full flow) dropped
+    hardware, such as a booster at staging; it keeps the previous step's flow instead.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}, got {layout!r}")
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    alt, mass = y[..., 0, :], y[..., 2, :]
+    if layout == "radial":
+        speed = np.abs(y[..., 1, :])
+    else:
+        r = alt + 6_371_000.0
+        speed = np.hypot(y[..., 1, :], y[..., 4, :] - omega_atm * r)
+
+    rho, sound = profile.sample(alt)
+    q = 0.5 * rho * speed ** 2
+    drag = q * _evaluate(cd_area, t, alt, speed)
+
+    # Thrust from the mass flow, sample by sample along each trajectory
+    valid = np.isfinite(t)
+    m_dot = np.zeros(t.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m_dot[..., :-1] = np.diff(mass, axis=-1) / np.diff(t, axis=-1)    # held over each step
+    m_dot = np.where(np.isfinite(m_dot), m_dot, 0.0)
+    if m_dot_max is not None:
+        jettison = -m_dot > 1.01 * _evaluate(m_dot_max, t, alt, speed)
+        previous = np.concatenate([np.zeros(m_dot.shape[:-1] + (1,)), m_dot[..., :-1]], axis=-1)
+        m_dot = np.where(jettison, previous, m_dot)
+    thrust = np.maximum(-m_dot, 0.0) * _evaluate(isp, t, alt, speed) * g0
+    axial_g = (thrust - drag) / (mass * g0)
+
+    heat_flux = K_SUTTON_GRAVES * np.sqrt(rho / nose_radius_m) * speed ** 3
+    flux_dt = np.where(valid, heat_flux, 0.0)
+    t_filled = np.where(valid, t, np.nanmax(t, axis=-1, keepdims=True))
+    heat_load = np.zeros(t.shape)
+    heat_load[..., 1:] = np.cumsum(0.5 * (flux_dt[..., 1:] + flux_dt[..., :-1]) * np.diff(t_filled, axis=-1),
+                                   axis=-1)
+    heat_load = np.where(valid, heat_load, np.nan)
+
+    return {"t": t, "alt_m": alt, "speed_m_s": speed, "mass_kg": mass, "density_kg_m3": rho,
+            "q_pa": q, "mach": speed / sound, "thrust_n": thrust, "drag_n": drag, "axial_g": axial_g,
+            "heat_flux_w_m2": heat_flux, "heat_load_j_m2": heat_load,
+            "propellant_kg": mass - m_dry, "m_dry": m_dry}
+
+
+def _at_peak(arrays, key, also):
+    x = np.where(np.isfinite(arrays[key]), arrays[key], -np.inf)
+    i = np.argmax(x, axis=-1)[..., None]
+    peak = np.take_along_axis(x, i, axis=-1)[..., 0]
+    return peak, {name: np.take_along_axis(arrays[name], i, axis=-1)[..., 0] for name in also}
+
+
+def summarize(arrays):
+    """One record per trajectory (scalars for one run, arrays for a stack)."""
+    last = (np.sum(np.isfinite(arrays["t"]), axis=-1) - 1)[..., None]
+
+    def final(name):
+        return np.take_along_axis(arrays[name], last, axis=-1)[..., 0]
+
+    max_q, at_q = _at_peak(arrays, "q_pa", ("t", "alt_m", "mach"))
+    max_mach, _ = _at_peak(arrays, "mach", ())
+    abs_g = {"abs_g": np.abs(arrays["axial_g"]), "t": arrays["t"], "axial_g": arrays["axial_g"]}
+    max_g, at_g = _at_peak(abs_g, "abs_g", ("t", "axial_g"))
+    max_flux, at_flux = _at_peak(arrays, "heat_flux_w_m2", ("t", "alt_m"))
+    propellant0 = arrays["propellant_kg"][..., 0]
+    propellant = final("propellant_kg")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(propellant0 > 0, propellant / propellant0, np.nan)
+    record = {
+        "max_q_pa": max_q, "max_q_t_s": at_q["t"], "max_q_alt_m": at_q["alt_m"], "max_q_mach": at_q["mach"],
+        "max_mach": max_mach,
+        "max_axial_g": at_g["axial_g"], "max_axial_g_t_s": at_g["t"],
+        "peak_heat_flux_w_m2": max_flux, "peak_heat_flux_t_s": at_flux["t"],
+        "peak_heat_flux_alt_m": at_flux["alt_m"],
+        "heat_load_j_m2": final("heat_load_j_m2"),
+        "t_final_s": final("t"), "final_alt_m": final("alt_m"), "touchdown_speed_m_s": final("speed_m_s"),
+        "propellant_left_kg": propellant, "propellant_margin": margin,
+    }
+    if np.ndim(max_q) == 0:
+        return {k: float(v) for k, v in record.items()}
+    return record
+
+
+def records(t, y, profile, chunk=512, **vehicle_settings):
+    """summarize(analyze(...)) for a big stack, `chunk` trajectories at a time to bound memory."""
+    parts = [summarize(analyze(t[i:i + chunk], y[i:i + chunk], profile, **vehicle_settings))
+             for i in range(0, t.shape[0], chunk)]
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+# ================== CLI ==================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Loads, heating and margins from stored trajectories.")
+    parser.add_argument("path", help="gym result.npz or batch trajectories.npz")
+    parser.add_argument("--song", default="trajectory_song", help="song module whose vehicle and site to use")
+    parser.add_argument("--layout", default="radial", choices=LAYOUTS)
+    parser.add_argument("--out", default=None, help="analysis npz (default: <path>_analysis.npz)")
+    args = parser.parse_args(argv)
+
+    import contextlib
+    import importlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        module = importlib.import_module(args.song)
+        song_class = next(v for k, v in vars(module).items() if k.endswith("Song") and isinstance(v, type))
+        song = song_class()
+    names, t, y = load_trajectories(args.path)
+    profile = AtmosphereProfile.for_song(song)
+    settings = vehicle(song, args.layout)
+    record = records(t, y, profile, **settings)
+
+    out = args.out or args.path.replace(".npz", "") + "_analysis.npz"
+    np.savez_compressed(out, names=np.array(names), **record)
+    if len(names) == 1:
+        print(json.dumps({k: float(v[0]) for k, v in record.items()}, indent=2))
+    else:
+        print(f"{len(names)} trajectories, {np.isfinite(t).sum():,} samples")
+        for name, i in zip(names[:20], range(20)):
+            print(f"  {name:32} max-Q {record['max_q_pa'][i] / 1e3:8.1f} kPa  "
+                  f"g {record['max_axial_g'][i]:+7.2f}  touchdown {record['touchdown_speed_m_s'][i]:8.2f} m/s")
+    print(f"→ {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+footprint.py — where the whale actually comes down, and how wide the splash is
+
+PacificWhaleSong says goodbye over Point Nemo, but a retro burn's errors, a
+tumbling attitude and a sky that is never quite the MSIS sky scatter the
+debris along the ground track. This flies the whole dispersed ensemble
+from the deorbit burn to the ground in one parallel compiled run
+(ensemble.propagate: RK4, J2, drag from a global DensityTable):
+
+    result = footprint.predict(song, n=10_000)
+    footprint.summary(result)          # impact ellipse, along/cross extents, keep-out probability
+    footprint.save(result, "footprint.npz")
+
+The nominal deorbit is a retrograde burn from a circular orbit. The burn
+point (argument of latitude) and the orbit's RAAN are solved so that the
+undispersed member lands on `target`. Each member then draws:
+
+  attitude      belly / edge / sail with `attitude_p`; β = m / (C_D·A) from the song
+  C_D           × N(1, sigma_cd)
+  density       × lognormal(sigma_log_rho), one factor per member; drag ∝ ρ/β,
+                so it folds into β
+  burn          |Δv| × N(1, sigma_dv), pointing N(0, sigma_point_deg) in and out of
+                plane, time N(0, sigma_t_s)
+
+The flight runs in two legs: a coarse step down to `interface_km`, then
+`dt_entry_s` down to `terminal_km`. By then the vehicle has bled its
+orbital speed and falls nearly straight down at tens of m/s in air that
+turns with the Earth; the sub-point there is the impact point to about
+10 m (checked against flying on to 0 km) and the slow terminal fall is
+skipped. `terminal_km=0` flies to the ground. Impacts are projected on
+the azimuthal equidistant plane around their spherical mean. The
+footprint ellipse is their covariance at `ellipse_p`, and along/cross-track extents are
+percentiles along the mean ground-track heading. The keep-out probability
+is the fraction of impacts inside any zone circle, with a Wilson interval.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+import ensemble
+import frames
+from atmosphere import DensityTable
+from force_models import MU_EARTH, R_EARTH_KM
+from instrumentation import section
+
+POINT_NEMO = (-48.8767, -123.3933)                   # lat, lon °
+KEEP_OUT = (                                         # name, lat °, lon °, radius km (200 nmi)
+    ("Pitcairn Islands", -25.066, -130.100, 370.4),
+    ("Easter Island", -27.113, -109.350, 370.4),
+    ("Chatham Islands", -43.950, -176.560, 370.4),
+)
+ATTITUDES = ("belly", "edge", "sail")
+R_MEAN_KM = 6371.0                                   # ground distances on the mean sphere
+TABLE_STEP_KM = 2.0
+TABLE_STEP_LAT_DEG = 10.0
+TABLE_STEP_LON_DEG = 30.0
+
+
+# ================== GEOMETRY ==================
+def _unit(lat_deg, lon_deg):
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance on the mean sphere."""
+    dot = np.sum(_unit(lat1, lon1) * _unit(lat2, lon2), axis=-1)
+    return R_MEAN_KM * np.arccos(np.clip(dot, -1.0, 1.0))
+
+
+def local_plane(lat, lon, lat0, lon0):
+    """Azimuthal equidistant (east, north) km of points around (lat0, lon0)."""
+    d = distance_km(lat, lon, lat0, lon0)
+    p1, p2, dl = np.radians(lat0), np.radians(lat), np.radians(lon - lon0)
+    bearing = np.arctan2(np.sin(dl) * np.cos(p2), np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dl))
+    return d * np.sin(bearing), d * np.cos(bearing)
+
+
+def mean_point(lat, lon):
+    """Spherical mean (lat, lon) of a set of points."""
+    m = _unit(lat, lon).mean(axis=0)
+    return float(np.degrees(np.arcsin(m[2] / np.linalg.norm(m)))), float(np.degrees(np.arctan2(m[1], m[0])))
+
+
+def ellipse(east, north, p=0.99):
+    """Covariance ellipse holding probability p (2-D Gaussian): semi-axes km, major-axis azimuth °."""
+    cov = np.cov(np.vstack([east, north]))
+    values, vectors = np.linalg.eigh(cov)
+    scale = np.sqrt(-2.0 * np.log(1.0 - p))                  # χ²(2) quantile, square-rooted
+    major = vectors[:, 1]
+    return {"semi_major_km": float(scale * np.sqrt(values[1])), "semi_minor_km": float(scale * np.sqrt(values[0])),
+            "azimuth_deg": float(np.degrees(np.arctan2(major[0], major[1])) % 180.0), "p": p}
+
+
+# ================== ENSEMBLE ==================
+def deorbit_states(alt_km, inc_deg, raan_deg, u_deg, dv_m_s, t_s=0.0, pitch_deg=0.0, yaw_deg=0.0):
+    """Post-burn ECI states: circular orbit at argument of latitude u + n·t, retro burn of |Δv|.
+
+    Pitch tilts the thrust towards radial-in, yaw out of plane. Broadcasts over every argument.
+    """
+    alt_km, inc_deg, raan_deg, u_deg, dv_m_s, t_s, pitch_deg, yaw_deg = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (alt_km, inc_deg, raan_deg, u_deg, dv_m_s, t_s, pitch_deg, yaw_deg)))
+    a = R_EARTH_KM + alt_km
+    n = np.degrees(np.sqrt(MU_EARTH / a ** 3))
+    y = ensemble.states_from_elements(a, np.zeros_like(a), inc_deg, raan_deg, np.zeros_like(a), u_deg + n * t_s)
+    r, v = y[..., :3], y[..., 3:]
+    t_hat = v / np.linalg.norm(v, axis=-1, keepdims=True)
+    r_hat = r / np.linalg.norm(r, axis=-1, keepdims=True)
+    n_hat = np.cross(r_hat, t_hat)
+    p, w = np.radians(pitch_deg)[..., None], np.radians(yaw_deg)[..., None]
+    direction = -np.cos(p) * np.cos(w) * t_hat - np.sin(p) * r_hat + np.cos(p) * np.sin(w) * n_hat
+    y[..., 3:] += dv_m_s[..., None] / 1000.0 * direction
+    return y
+
+
+def fly(y0, t0, beta, table, interface_km=120.0, terminal_km=20.0, dt_coast_s=10.0, dt_entry_s=1.0,
+        max_days=0.5):
+    """Both legs for every member; returns (lat °, lon °, t at terminal_km s, landed)."""
+    span = max_days * 86400.0
+    y, t, _ = ensemble.propagate(y0, span, table, beta=beta, t0=t0, dt=dt_coast_s, stop_alt_km=interface_km)
+    y, t_stop, _ = ensemble.propagate(y, span, table, beta=beta, t0=t, dt=dt_entry_s, stop_alt_km=terminal_km)
+    landed = frames.geodetic_altitude_many(y[:, :3]) < terminal_km + 1.0
+    jd0 = float(frames.julian_date(table.epoch))
+    geo = frames.eci_to_geodetic_many(np.ascontiguousarray(y[:, :3]), jd0 + t_stop / 86400.0)
+    return geo[:, 0], geo[:, 1], t_stop, landed
+
+
+def aim(table, target, alt_km, inc_deg, dv_m_s, beta, u0_deg=0.0, raan0_deg=0.0, tol_km=1.0, max_iter=12,
+        **flight):
+    """(u, RAAN) of the burn that puts the nominal member on `target`: Newton on the local plane."""
+    x = np.array([u0_deg, raan0_deg])
+    h = 0.05
+    for _ in range(max_iter):
+        u = x[0] + np.array([0.0, h, 0.0])
+        raan = x[1] + np.array([0.0, 0.0, h])
+        lat, lon, _, landed = fly(deorbit_states(alt_km, inc_deg, raan, u, dv_m_s), np.zeros(3),
+                                  np.full(3, beta), table, **flight)
+        if not landed.all():
+            raise RuntimeError(f"the nominal deorbit (Δv {dv_m_s} m/s from {alt_km} km) does not come down")
+        east, north = local_plane(lat, lon, *target)
+        miss = np.array([east[0], north[0]])
+        if np.hypot(*miss) < tol_km:
+            return x, float(np.hypot(*miss))
+        jac = np.array([[east[1] - east[0], east[2] - east[0]], [north[1] - north[0], north[2] - north[0]]]) / h
+        x = x - np.linalg.solve(jac, miss)
+    return x, float(np.hypot(*miss))
+
+
+def predict(song=None, probe=None, n=10_000, seed=0, epoch=datetime(2025, 11, 25), alt_km=250.0, inc_deg=51.6,
+            dv_m_s=70.0, target=POINT_NEMO, attitude_p=(0.6, 0.2, 0.2), sigma_cd=0.05, sigma_log_rho=0.15,
+            sigma_dv=0.01, sigma_point_deg=1.0, sigma_t_s=2.0, keep_out=KEEP_OUT, ellipse_p=0.99,
+            interface_km=120.0, terminal_km=20.0, dt_coast_s=10.0, dt_entry_s=1.0, table=None):
+    """Aim the nominal burn at `target`, fly `n` dispersed members to the ground; returns a dict."""
+    if song is None:
+        import pacific_whale_song
+        with contextlib.redirect_stdout(io.StringIO()):
+            song = pacific_whale_song.PacificWhaleSong()
+    timing = {}
+    t0 = time.perf_counter()
+    with section(probe, "density_table"):
+        if table is None:
+            lat_max = TABLE_STEP_LAT_DEG * np.ceil(min(abs(inc_deg) + 5.0, 90.0) / TABLE_STEP_LAT_DEG)
+            table = DensityTable.build(
+                epoch, 0.5, (0.0, alt_km + 30.0),
+                lon=np.arange(-180.0, 180.0 + TABLE_STEP_LON_DEG, TABLE_STEP_LON_DEG),
+                lat=np.arange(-lat_max, lat_max + TABLE_STEP_LAT_DEG, TABLE_STEP_LAT_DEG),
+                space_weather=song.space_weather, version=song.msis_version, step_km=TABLE_STEP_KM)
+    timing["density_table_s"] = time.perf_counter() - t0
+    flight = {"interface_km": interface_km, "terminal_km": terminal_km, "dt_coast_s": dt_coast_s,
+              "dt_entry_s": dt_entry_s}
+    areas = np.array([song.ATTITUDE_AREAS[a] for a in ATTITUDES])
+    beta_attitude = song.mass / (song.cd * areas)
+    nominal = ATTITUDES.index(song.attitude_mode)
+
+    t0 = time.perf_counter()
+    with section(probe, "aim"):
+        (u_burn, raan), aim_miss = aim(table, target, alt_km, inc_deg, dv_m_s, beta_attitude[nominal], **flight)
+    timing["aim_s"] = time.perf_counter() - t0
+
+    rng = np.random.Generator(np.random.Philox(seed))
+    attitude = rng.choice(len(ATTITUDES), size=n, p=np.asarray(attitude_p) / np.sum(attitude_p))
+    cd_scale = 1.0 + sigma_cd * rng.standard_normal(n)
+    rho_scale = np.exp(sigma_log_rho * rng.standard_normal(n))
+    beta = beta_attitude[attitude] / (cd_scale * rho_scale)
+    dv = dv_m_s * (1.0 + sigma_dv * rng.standard_normal(n))
+    pitch, yaw = sigma_point_deg * rng.standard_normal((2, n))
+    t_burn = sigma_t_s * rng.standard_normal(n)
+    y0 = deorbit_states(alt_km, inc_deg, raan, u_burn, dv, t_burn, pitch, yaw)
+
+    t0 = time.perf_counter()
+    with section(probe, "ensemble"):
+        lat, lon, t_impact, landed = fly(y0, t_burn, beta, table, **flight)
+    timing["ensemble_s"] = time.perf_counter() - t0
+
+    zones = [{"name": name, "lat": zlat, "lon": zlon, "radius_km": radius} for name, zlat, zlon, radius in keep_out]
+    inside = np.zeros((len(zones), n), dtype=bool)
+    for i, zone in enumerate(zones):
+        inside[i] = landed & (distance_km(lat, lon, zone["lat"], zone["lon"]) < zone["radius_km"])
+    return {"lat": lat, "lon": lon, "t_impact_s": t_impact, "landed": landed, "attitude": attitude,
+            "beta": beta, "dv_m_s": dv, "pitch_deg": pitch, "yaw_deg": yaw, "t_burn_s": t_burn,
+            "inside": inside, "zones": zones, "target": target, "u_burn_deg": float(u_burn),
+            "raan_deg": float(raan), "aim_miss_km": aim_miss, "ellipse_p": ellipse_p,
+            "settings": {"n": n, "seed": seed, "epoch": str(epoch), "alt_km": alt_km, "inc_deg": inc_deg,
+                         "dv_m_s": dv_m_s, "attitude_p": list(attitude_p), "sigma_cd": sigma_cd,
+                         "sigma_log_rho": sigma_log_rho, "sigma_dv": sigma_dv,
+                         "sigma_point_deg": sigma_point_deg, "sigma_t_s": sigma_t_s,
+                         "interface_km": interface_km, "terminal_km": terminal_km,
+                         "dt_coast_s": dt_coast_s, "dt_entry_s": dt_entry_s,
+                         "density": table.source, "mass_kg": song.mass, "cd": song.cd},
+            "timing": timing}
+
+
+# ================== RESULTS ==================
+def summary(result):
+    """Impact centre, miss from target, ellipse, along/cross extents and keep-out probabilities."""
+    from monte_carlo import wilson
+
+    landed = result["landed"]
+    lat, lon = result["lat"][landed], result["lon"][landed]
+    n = int(landed.size)
+    lat0, lon0 = mean_point(lat, lon)
+    east, north = local_plane(lat, lon, lat0, lon0)
+    fit = ellipse(east, north, result["ellipse_p"])
+    az = np.radians(fit["azimuth_deg"])
+    along, cross = east * np.sin(az) + north * np.cos(az), east * np.cos(az) - north * np.sin(az)
+    hit = result["inside"].any(axis=0)
+    out = {
+        "members": n, "landed": int(landed.sum()),
+        "centre": {"lat": lat0, "lon": lon0,
+                   "miss_from_target_km": float(distance_km(lat0, lon0, *result["target"]))},
+        "ellipse": fit,
+        "along_track_km": {f"p{q}": float(np.percentile(along, q)) for q in (0.5, 50, 99.5)},
+        "cross_track_km": {f"p{q}": float(np.percentile(cross, q)) for q in (0.5, 50, 99.5)},
+        "t_impact_s": {f"p{q}": float(np.percentile(result["t_impact_s"][landed], q)) for q in (0.5, 50, 99.5)},
+        "keep_out": {"p": float(hit.mean()), "p_95": list(wilson(hit.mean(), n)),
+                     "zones": {z["name"]: {"p": float(result["inside"][i].mean()),
+                                           "closest_km": float(distance_km(lat, lon, z["lat"], z["lon"]).min())}
+                               for i, z in enumerate(result["zones"])}},
+        "by_attitude": {a: {"members": int((result["attitude"][landed] == i).sum()),
+                            "median_along_km": float(np.median(along[result["attitude"][landed] == i]))
+                            if (result["attitude"][landed] == i).any() else None}
+                        for i, a in enumerate(ATTITUDES)},
+        "aim": {"u_burn_deg": result["u_burn_deg"], "raan_deg": result["raan_deg"],
+                "nominal_miss_km": result["aim_miss_km"]},
+        "timing": result["timing"],
+    }
+    return out
+
+
+def save(result, path):
+    """Per-member arrays, npz; zones, settings and the summary as JSON strings."""
+    arrays = {k: v for k, v in result.items() if isinstance(v, np.ndarray)}
+    np.savez_compressed(path, **arrays, zones=json.dumps(result["zones"]),
+                        settings=json.dumps(result["settings"]), summary=json.dumps(summary(result)))
+
+
+def plot(result):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    landed = result["landed"]
+    fig, ax = plt.subplots(figsize=(9, 6))
+    for i, a in enumerate(ATTITUDES):
+        sel = landed & (result["attitude"] == i)
+        ax.scatter(result["lon"][sel], result["lat"][sel], s=2, alpha=0.4, label=a)
+    for z in result["zones"]:
+        ring = np.linspace(0, 2 * np.pi, 90)
+        dlat = np.degrees(z["radius_km"] / R_MEAN_KM)
+        ax.plot(z["lon"] + dlat * np.cos(ring) / np.cos(np.radians(z["lat"])), z["lat"] + dlat * np.sin(ring),
+                "r-", lw=1)
+        ax.annotate(z["name"], (z["lon"], z["lat"]), color="r", fontsize=8)
+    ax.plot(result["target"][1], result["target"][0], "k*", ms=12, label="target")
+    ax.set_xlabel("Longitude (°)")
+    ax.set_ylabel("Latitude (°)")
+    ax.set_title("PacificWhaleSong — where the whale comes home")
+    ax.legend(markerscale=4)
+    ax.grid(alpha=0.3)
+    plt.show()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PacificWhaleSong reentry footprint.")
+    parser.add_argument("--n", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--alt", type=float, default=250.0, help="deorbit orbit altitude, km")
+    parser.add_argument("--dv", type=float, default=70.0, help="retro burn, m/s")
+    parser.add_argument("--target", default=f"{POINT_NEMO[0]},{POINT_NEMO[1]}", help="lat,lon")
+    parser.add_argument("--out", default="footprint.npz")
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = predict(n=args.n, seed=args.seed, alt_km=args.alt, dv_m_s=args.dv,
+                     target=tuple(float(x) for x in args.target.split(",")))
+    record = summary(result)
+    c, e, k = record["centre"], record["ellipse"], record["keep_out"]
+    print(f"{record['landed']:,}/{record['members']:,} members down; centre {c['lat']:.2f}°, {c['lon']:.2f}° "
+          f"({c['miss_from_target_km']:.0f} km from target)")
+    print(f"{e['p']:.0%} ellipse {2 * e['semi_major_km']:.0f} × {2 * e['semi_minor_km']:.0f} km, "
+          f"major axis {e['azimuth_deg']:.0f}° from north")
+    print(f"keep-out: P = {k['p']:.2e} (95% {k['p_95'][0]:.1e}–{k['p_95'][1]:.1e}); "
+          + ", ".join(f"{name} closest {z['closest_km']:.0f} km" for name, z in k["zones"].items()))
+    print("timing: " + ", ".join(f"{name} {s:.1f} s" for name, s in record["timing"].items()))
+    save(result, args.out)
+    print(f"→ {args.out}")
+    if args.plot:
+        plot(result)
+
+
+if __name__ == "__main__":
+    main()
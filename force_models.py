@@ -0,0 +1,315 @@
+"""
+force_models.py — the Cowell force kernels, compiled once per environment
+
+The J2, drag, SRP, third-body and full-RHS kernels used by orbit_tug.py,
+orbit_tug_final_victory.py and perigee_kick_demo.py live here instead of
+being re-defined (and re-JITted) in every script; full_accel_field is
+full_accel with J2 swapped for a degree/order-N field from gravity.py, and
+full_accel_lunisolar adds Sun and Moon point masses read from
+ephemeris.py Chebyshev tables.
+Two layers keep repeated
+runs from paying for compilation:
+
+  1. every kernel is @njit(cache=True), so numba writes the machine code to
+     __pycache__ the first time and later processes just load it;
+  2. `python force_models.py --aot` builds an ahead-of-time extension
+     (_force_models_aot) for the Python-facing RHS functions. When it is
+     present and was built from these exact sources, get_rhs() hands it out
+     and no JIT happens at all.
+
+    python force_models.py --warm    # fill the on-disk JIT cache
+    python force_models.py --aot     # build the AOT extension
+    python force_models.py --startup # time cold JIT vs warm cache vs AOT
+
+Constants are plain floats (poliastro's Earth values) so importing this
+module never touches astropy or poliastro.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from numba import njit
+
+from ephemeris import AU_KM, chebyshev_position, shadow_fraction
+from frames import OMEGA_EARTH
+from gravity import field_accel_eci
+
+R_EARTH_KM = 6378.1366          # poliastro Earth.R
+J2_VAL = 1.08263e-3             # poliastro Earth.J2
+MU_EARTH = 398600.4418          # poliastro Earth.k, km³/s²
+GM_SUN = 132712440018.0         # poliastro Sun.k, km³/s²
+GM_MOON = 4902.800066           # poliastro Moon.k, km³/s²
+P_SUN_1AU = 4.56e-6             # N/m², solar radiation pressure on an absorber at 1 AU
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AOT_MODULE = "_force_models_aot"
+AOT_STAMP = os.path.join(HERE, AOT_MODULE + ".json")
+NO_AOT_ENV = "GYM_NO_AOT"       # set to 1 to ignore a built extension
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def twobody_accel(t0, u_, k):
+    """Drop-in for poliastro.core.propagation.func_twobody: [v, -k r / |r|³]."""
+    x, y, z, vx, vy, vz = u_
+    r3 = (x**2 + y**2 + z**2) ** 1.5
+    du = np.empty(6)
+    du[0] = vx
+    du[1] = vy
+    du[2] = vz
+    du[3] = -k * x / r3
+    du[4] = -k * y / r3
+    du[5] = -k * z / r3
+    return du
+
+@njit(cache=True)
+def J2_accel(r, k, R_eq, J2):
+    x, y, z = r
+    r_norm = np.linalg.norm(r)
+    factor = 1.5 * J2 * k * R_eq**2 / r_norm**5
+    return factor * np.array([
+        x * (5 * z**2 / r_norm**2 - 1),
+        y * (5 * z**2 / r_norm**2 - 1),
+        z * (5 * z**2 / r_norm**2 - 3)
+    ])
+
+@njit(cache=True)
+def j2_accel(r_vec, k):
+    return J2_accel(r_vec, k, R_EARTH_KM, J2_VAL)
+
+@njit(cache=True)
+def drag_accel(r, v, rho0=2.5e-12, H=50.0, C_D=2.2, A_m=0.015):
+    h = np.linalg.norm(r) - R_EARTH_KM
+    if h > 1000:
+        return np.zeros(3)
+    rho = rho0 * np.exp(-h / H)
+    v_rel = v
+    v_norm = np.linalg.norm(v_rel)
+    return -0.5 * C_D * A_m * rho * v_norm * v_rel  # km/s²
+
+@njit(cache=True)
+def srp_accel(r, A_m=0.015, C_R=1.5):
+    # Very simple: always toward +X (ecliptic), scaled by 1/r². Kept for perturbed_accel's
+    # benchmark baseline; the orbit_tug cases use srp_sun_accel (real Sun, Earth shadow).
+    dist_au = 1.0
+    P = 4.56e-6 * C_R * A_m / dist_au**2  # N → km/s²
+    return P * np.array([1.0, 0.0, 0.0])
+
+@njit(cache=True)
+def srp_sun_accel(r, r_sun, A_m, C_R, shadow):
+    """Cannonball SRP away from the Sun at r_sun (km), 1/d² and Earth-shadow scaled; A_m in m²/kg → km/s²."""
+    nu = shadow_fraction(r, r_sun, shadow)
+    if nu == 0.0:
+        return np.zeros(3)
+    d = r - r_sun
+    d_norm = np.linalg.norm(d)
+    return (nu * P_SUN_1AU * C_R * A_m * 1e-3 * (AU_KM / d_norm) ** 2 / d_norm) * d
+
+@njit(cache=True)
+def third_body_accel(r, r_body, gm):
+    """Point-mass tide of a body at r_body (geocentric km): its pull on r minus its pull on the Earth."""
+    d = r_body - r
+    d3 = np.linalg.norm(d) ** 3
+    s3 = np.linalg.norm(r_body) ** 3
+    return gm * (d / d3 - r_body / s3)
+
+@njit(cache=True)
+def perturbed_accel(t0, u_, k):
+    """orbit_tug.py "All forces": two-body + J2 + exponential drag + SRP."""
+    r = u_[:3]
+    v = u_[3:]
+    du = twobody_accel(t0, u_, k)
+    du[3:] += J2_accel(r, k, R_EARTH_KM, J2_VAL) + drag_accel(r, v) + srp_accel(r)
+    return du
+
+@njit(cache=True)
+def full_accel(t0, u_, k):
+    """orbit_tug_final_victory / perigee_kick_demo: two-body + J2 + drag (H = 60 km)."""
+    r = u_[:3]
+    v = u_[3:]
+    du = twobody_accel(t0, u_, k)
+    du[3:] += j2_accel(r, k)
+    h = np.linalg.norm(r) - R_EARTH_KM
+    if 0 < h < 1000:
+        rho = 2.5e-12 * np.exp(-h / 60)
+        du[3:] += -1e-6 * rho * np.linalg.norm(v) * v
+    return du
+
+@njit(cache=True)
+def case_accel(t0, u_, k, use_j2, use_drag, use_srp, C_D, A_m, C_R, sun, sun_seg_s, shadow):
+    """orbit_tug.py force-model cases, switchable without a Python closure.
+
+    SRP reads the Sun from an ephemeris.ChebyshevEphemeris fitted from t0 = 0
+    (`sun` = its coeffs, `sun_seg_s` = its seg_s); `shadow` is an ephemeris
+    shadow model (NO_SHADOW / CYLINDRICAL / CONICAL).
+    """
+    r = u_[:3]
+    v = u_[3:]
+    du = twobody_accel(t0, u_, k)
+    if use_j2:
+        du[3:] += J2_accel(r, k, R_EARTH_KM, J2_VAL)
+    if use_drag:
+        du[3:] += drag_accel(r, v, 2.5e-12, 50.0, C_D, A_m)
+    if use_srp:
+        du[3:] += srp_sun_accel(r, chebyshev_position(t0, sun, sun_seg_s), A_m, C_R, shadow)
+    return du
+
+@njit(cache=True)
+def full_accel_field(t0, u_, k, C, S, R_eq, n_max, theta0):
+    """full_accel with J2 replaced by a spherical-harmonic field (gravity.GravityField C/S,
+    unnormalized); the Earth has turned by theta0 (rad) at t0 = 0."""
+    r = u_[:3]
+    v = u_[3:]
+    du = twobody_accel(t0, u_, k)
+    du[3:] += field_accel_eci(r, theta0 + OMEGA_EARTH * t0, k, R_eq, C, S, n_max)
+    h = np.linalg.norm(r) - R_EARTH_KM
+    if 0 < h < 1000:
+        rho = 2.5e-12 * np.exp(-h / 60)
+        du[3:] += -1e-6 * rho * np.linalg.norm(v) * v
+    return du
+
+@njit(cache=True)
+def full_accel_lunisolar(t0, u_, k, sun, sun_seg_s, moon, moon_seg_s):
+    """full_accel plus Sun and Moon point masses; `sun` / `moon` are ChebyshevEphemeris
+    coeffs fitted from t0 = 0, read here with no Python in the loop."""
+    du = full_accel(t0, u_, k)
+    r = u_[:3]
+    du[3:] += third_body_accel(r, chebyshev_position(t0, sun, sun_seg_s), GM_SUN)
+    du[3:] += third_body_accel(r, chebyshev_position(t0, moon, moon_seg_s), GM_MOON)
+    return du
+
+# Python-facing RHS functions and the signatures the AOT build exports
+RHS_SIGNATURES = {
+    "twobody_accel": "f8[:](f8, f8[:], f8)",
+    "perturbed_accel": "f8[:](f8, f8[:], f8)",
+    "full_accel": "f8[:](f8, f8[:], f8)",
+    "case_accel": "f8[:](f8, f8[:], f8, b1, b1, b1, f8, f8, f8, f8[:, :, :], f8, i8)",
+    "full_accel_field": "f8[:](f8, f8[:], f8, f8[:, :], f8[:, :], f8, i8, f8)",
+    "full_accel_lunisolar": "f8[:](f8, f8[:], f8, f8[:, :, :], f8, f8[:, :, :], f8)",
+}
+# Every module whose kernels end up inside the AOT extension
+KERNEL_SOURCES = ("force_models.py", "ephemeris.py", "frames.py", "gravity.py")
+
+
+# ================== AOT BUILD + LOOKUP ==================
+def source_digest() -> str:
+    digest = hashlib.sha256()
+    for name in KERNEL_SOURCES:
+        with open(os.path.join(HERE, name), "rb") as fh:
+            digest.update(fh.read())
+    return digest.hexdigest()
+
+
+def _load_aot():
+    if os.environ.get(NO_AOT_ENV):
+        return None
+    try:
+        with open(AOT_STAMP) as fh:
+            stamp = json.load(fh)
+        import numba
+        if stamp.get("source_sha256") != source_digest() or stamp.get("numba") != numba.__version__:
+            return None  # stale build: fall back to the (cached) JIT kernels
+        if HERE not in sys.path:
+            sys.path.insert(0, HERE)
+        return __import__(AOT_MODULE)
+    except (OSError, ValueError, ImportError):
+        return None
+
+
+_AOT = None
+_AOT_CHECKED = False
+
+
+def get_rhs(name: str):
+    """The AOT-compiled RHS `name` when a fresh build exists, else the cached JIT kernel."""
+    global _AOT, _AOT_CHECKED
+    if name not in RHS_SIGNATURES:
+        raise KeyError(f"{name} is not an exported RHS; choose from {sorted(RHS_SIGNATURES)}")
+    if not _AOT_CHECKED:
+        _AOT, _AOT_CHECKED = _load_aot(), True
+    if _AOT is not None:
+        return getattr(_AOT, name)
+    return globals()[name]
+
+
+def aot_available() -> bool:
+    get_rhs("full_accel")
+    return _AOT is not None
+
+
+def build_aot(output_dir=HERE):
+    """Compile the exported RHS functions into a native extension module."""
+    import numba
+    from numba.pycc import CC
+
+    cc = CC(AOT_MODULE)
+    cc.output_dir = output_dir
+    cc.verbose = False
+    for name, signature in RHS_SIGNATURES.items():
+        cc.export(name, signature)(globals()[name].py_func)
+    cc.compile()
+    with open(os.path.join(output_dir, AOT_MODULE + ".json"), "w") as fh:
+        json.dump({"source_sha256": source_digest(), "numba": numba.__version__}, fh)
+    return os.path.join(output_dir, AOT_MODULE)
+
+
+def warm():
+    """Compile every kernel once so the on-disk cache holds all signatures."""
+    u0 = np.array([6928.0, 0.0, 0.0, 0.0, 4.7, 5.9])
+    twobody_accel(0.0, u0, MU_EARTH)
+    perturbed_accel(0.0, u0, MU_EARTH)
+    full_accel(0.0, u0, MU_EARTH)
+    sun = np.zeros((1, 3, 2))
+    sun[0, 0, 0] = AU_KM
+    for flags in ((False, False, False), (True, True, True)):
+        case_accel(0.0, u0, MU_EARTH, *flags, 2.2, 0.015, 1.5, sun, 86400.0, 2)
+    moon = np.zeros((1, 3, 2))
+    moon[0, 1, 0] = 384400.0
+    full_accel_lunisolar(0.0, u0, MU_EARTH, sun, 86400.0, moon, 86400.0)
+    C = np.zeros((3, 3))
+    C[0, 0], C[2, 0] = 1.0, -J2_VAL
+    full_accel_field(0.0, u0, MU_EARTH, C, np.zeros((3, 3)), R_EARTH_KM, 2, 0.0)
+
+
+_STARTUP_PROBE = (
+    "import time; t0 = time.perf_counter(); import numpy as np, force_models as fm; "
+    "f = fm.get_rhs('full_accel'); f(0.0, np.array([6928.0, 0, 0, 0, 4.7, 5.9]), fm.MU_EARTH); "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def measure_startup():
+    """Seconds from a fresh interpreter to the first full_accel result, per compile mode."""
+    def first_call(env):
+        out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], cwd=HERE, env={**os.environ, **env},
+                             capture_output=True, text=True, check=True)
+        return float(out.stdout.strip().splitlines()[-1])
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as cold_cache:
+        timings["cold_jit_s"] = first_call({"NUMBA_CACHE_DIR": cold_cache, NO_AOT_ENV: "1"})
+        timings["warm_cache_s"] = first_call({"NUMBA_CACHE_DIR": cold_cache, NO_AOT_ENV: "1"})
+    if aot_available():
+        timings["aot_s"] = first_call({})
+    return timings
+
+
+if __name__ == "__main__":
+    args = set(sys.argv[1:]) or {"--warm"}
+    if "--warm" in args:
+        t0 = time.perf_counter()
+        warm()
+        print(f"JIT cache warm in {time.perf_counter() - t0:.2f} s")
+    if "--aot" in args:
+        t0 = time.perf_counter()
+        path = build_aot()
+        print(f"AOT extension built in {time.perf_counter() - t0:.1f} s → {path}")
+    if "--startup" in args:
+        for mode, seconds in measure_startup().items():
+            print(f"{mode:14} {seconds * 1e3:9.1f} ms")
@@ -0,0 +1,160 @@
+"""
+frames.py — where over the Earth a state vector really is, without astropy
+
+The inner loops (RHS evaluations, ensembles) need three things about every
+ECI state: how far the Earth has turned (Earth rotation angle), the
+sub-satellite point and height on the WGS84 ellipsoid, and the velocity
+relative to an atmosphere that turns with the Earth. astropy answers all
+three correctly and slowly (~ms per state); the kernels here take a few
+hundred nanoseconds per state, are @njit so compiled RHS functions can call
+them, and come in array forms for whole ensembles:
+
+    jd = frames.julian_date(epochs)                       # UTC ≈ UT1
+    lla = frames.eci_to_geodetic_many(r_eci_km, jd)       # (n, 3): lat°, lon°, alt km
+    v_rel = frames.relative_velocity_many(r_eci_km, v_eci_km_s)
+
+"ECI" here is the songs' inertial frame taken as the true equator and
+equinox of date: Earth orientation is rotation about z by the IAU 2000
+Earth rotation angle, with precession, nutation and polar motion ignored
+(tens of arcseconds to a few arcminutes — metres to a few km on the ground,
+far inside MSIS's own uncertainty). Distances are km, angles degrees.
+"""
+
+from datetime import datetime
+
+import numpy as np
+from numba import njit
+
+WGS84_A_KM = 6378.137
+WGS84_F = 1.0 / 298.257223563
+WGS84_B_KM = WGS84_A_KM * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)                    # first eccentricity²
+WGS84_EP2 = WGS84_E2 / (1.0 - WGS84_E2)                 # second eccentricity²
+OMEGA_EARTH = 7.292115e-5                               # rad/s, IERS nominal
+JD_UNIX_EPOCH = 2440587.5
+UNIX_EPOCH = datetime(1970, 1, 1)
+JD_J2000 = 2451545.0
+
+
+def julian_date(epochs):
+    """datetime / numpy datetime64 (scalar or array) → Julian date (float, UTC used as UT1)."""
+    if isinstance(epochs, datetime):                    # the RHS path: skip numpy's conversion
+        return JD_UNIX_EPOCH + (epochs - UNIX_EPOCH).total_seconds() / 86400.0
+    seconds = np.asarray(epochs).astype("datetime64[us]").astype(np.int64) / 1e6
+    return JD_UNIX_EPOCH + seconds / 86400.0
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def earth_rotation_angle(jd_ut1):
+    """IAU 2000 Earth rotation angle (rad, wrapped to [0, 2π))."""
+    d = jd_ut1 - JD_J2000
+    turns = 0.7790572732640 + 0.00273781191135448 * d + (d % 1.0)
+    return 2.0 * np.pi * (turns % 1.0)
+
+
+@njit(cache=True)
+def eci_to_ecef(r_eci, theta):
+    """Rotate an ECI vector into the Earth-fixed frame at rotation angle `theta`."""
+    c, s = np.cos(theta), np.sin(theta)
+    r = np.empty(3)
+    r[0] = c * r_eci[0] + s * r_eci[1]
+    r[1] = -s * r_eci[0] + c * r_eci[1]
+    r[2] = r_eci[2]
+    return r
+
+
+@njit(cache=True)
+def ecef_to_eci(r_ecef, theta):
+    c, s = np.cos(theta), np.sin(theta)
+    r = np.empty(3)
+    r[0] = c * r_ecef[0] - s * r_ecef[1]
+    r[1] = s * r_ecef[0] + c * r_ecef[1]
+    r[2] = r_ecef[2]
+    return r
+
+
+@njit(cache=True)
+def _geodetic_lat_alt(p, z):
+    """Heikkinen's closed-form geodetic latitude (rad) and ellipsoidal height (km) from p = √(x²+y²), z."""
+    a, b, e2 = WGS84_A_KM, WGS84_B_KM, WGS84_E2
+    F = 54.0 * b * b * z * z
+    G = p * p + (1.0 - e2) * z * z - e2 * (a * a - b * b)
+    c = e2 * e2 * F * p * p / (G * G * G)
+    s = np.cbrt(1.0 + c + np.sqrt(c * c + 2.0 * c))
+    k = s + 1.0 + 1.0 / s
+    P = F / (3.0 * k * k * G * G)
+    Q = np.sqrt(1.0 + 2.0 * e2 * e2 * P)
+    r0 = (-P * e2 * p / (1.0 + Q)
+          + np.sqrt(max(0.5 * a * a * (1.0 + 1.0 / Q) - P * (1.0 - e2) * z * z / (Q * (1.0 + Q))
+                        - 0.5 * P * p * p, 0.0)))
+    U = np.sqrt((p - e2 * r0) ** 2 + z * z)
+    V = np.sqrt((p - e2 * r0) ** 2 + (1.0 - e2) * z * z)
+    z0 = b * b * z / (a * V)
+    return np.arctan2(z + WGS84_EP2 * z0, p), U * (1.0 - b * b / (a * V))
+
+
+@njit(cache=True)
+def geodetic_altitude(r):
+    """Height above the WGS84 ellipsoid (km). Needs no time: rotation about z leaves it unchanged."""
+    return _geodetic_lat_alt(np.sqrt(r[0] * r[0] + r[1] * r[1]), r[2])[1]
+
+
+@njit(cache=True)
+def ecef_to_geodetic(r_ecef):
+    """Earth-fixed position (km) → (geodetic latitude °, longitude ° in (−180, 180], height km)."""
+    lat, alt = _geodetic_lat_alt(np.sqrt(r_ecef[0] ** 2 + r_ecef[1] ** 2), r_ecef[2])
+    return np.degrees(lat), np.degrees(np.arctan2(r_ecef[1], r_ecef[0])), alt
+
+
+@njit(cache=True)
+def geodetic_to_ecef(lat_deg, lon_deg, alt_km):
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    n = WGS84_A_KM / np.sqrt(1.0 - WGS84_E2 * np.sin(lat) ** 2)
+    r = np.empty(3)
+    r[0] = (n + alt_km) * np.cos(lat) * np.cos(lon)
+    r[1] = (n + alt_km) * np.cos(lat) * np.sin(lon)
+    r[2] = (n * (1.0 - WGS84_E2) + alt_km) * np.sin(lat)
+    return r
+
+
+@njit(cache=True)
+def eci_to_geodetic(r_eci, jd_ut1):
+    """ECI position (km) at Julian date → (lat °, lon °, alt km) of the point beneath it."""
+    return ecef_to_geodetic(eci_to_ecef(r_eci, earth_rotation_angle(jd_ut1)))
+
+
+@njit(cache=True)
+def relative_velocity(r_eci, v_eci):
+    """Velocity relative to the co-rotating atmosphere, v − ω⊕ × r (km/s, ECI axes)."""
+    v = np.empty(3)
+    v[0] = v_eci[0] + OMEGA_EARTH * r_eci[1]
+    v[1] = v_eci[1] - OMEGA_EARTH * r_eci[0]
+    v[2] = v_eci[2]
+    return v
+
+
+# ================== ARRAY FORMS ==================
+@njit(cache=True)
+def eci_to_geodetic_many(r_eci, jd_ut1):
+    """(n, 3) ECI positions and (n,) Julian dates → (n, 3) array of lat °, lon °, alt km."""
+    out = np.empty((r_eci.shape[0], 3))
+    for i in range(r_eci.shape[0]):
+        out[i, 0], out[i, 1], out[i, 2] = eci_to_geodetic(r_eci[i], jd_ut1[i])
+    return out
+
+
+@njit(cache=True)
+def geodetic_altitude_many(r):
+    out = np.empty(r.shape[0])
+    for i in range(r.shape[0]):
+        out[i] = geodetic_altitude(r[i])
+    return out
+
+
+@njit(cache=True)
+def relative_velocity_many(r_eci, v_eci):
+    out = np.empty_like(v_eci)
+    for i in range(r_eci.shape[0]):
+        out[i] = relative_velocity(r_eci[i], v_eci[i])
+    return out
@@ -6,8 +6,9 @@ The one that actually works. Forever.
 import numpy as np
 from scipy.integrate import solve_ivp
 import pymsis
+import space_weather as sw
 from datetime import datetime
-import matplotlib.pyplot as plt
+from instrumentation import finish, from_env, section
 
 class FullRoundTripSong:
     def __init__(self):
@@ -15,7 +16,7 @@ class FullRoundTripSong:
         self.m_dry_booster = 85_000
         self.m_prop_ship = 1_200_000
         self.m_prop_booster = 3_800_000
-        self.m = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+        self._update_mass()
 
         self.thrust_booster = 33 * 2.30e6
         self.thrust_ship_ascent = 9 * 2.63e6
@@ -29,13 +30,23 @@ class FullRoundTripSong:
         self.A_belly = 550
         self.A_vertical = 64
 
+        self.site_lon = -97.0
+        self.site_lat = 26.0
+        self.date = datetime(2025, 12, 25)
+        self.msis_version = 2.0
+        self.space_weather = None        # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
+
         print("33 Raptors ignite on Christmas morning.")
         print("The final poem begins. She rises. She circles. She comes home.\n")
 
+    def _update_mass(self):
+        self.m = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+
     def get_density(self, alt_km: float) -> float:
         if alt_km > 150: return 0.0
-        data = pymsis.calculate(alts=alt_km, lons=-97.0, lats=26.0,
-                            dates=datetime(2025, 12, 25), version=2.0)
+        data = pymsis.calculate(alts=alt_km, lons=self.site_lon, lats=self.site_lat,
+                            dates=self.date, version=self.msis_version,
+                            **sw.msis_kwargs(self.space_weather, self.date))
         return float(data[0, 0])
 
     def get_gravity(self, alt_km):
@@ -115,38 +126,82 @@ class FullRoundTripSong:
             a_net = a_thrust + a_drag + a_gravity
             return [v_radial, a_net, dm_dt]
 
-# ——— LAUNCH HER HOME — CHRISTMAS DAY 2025 ———
-print("Launching the Christmas Day landing poem…\n")
-song = FullRoundTripSong()
-
-sol = solve_ivp(
-    fun=song.derivatives,
-    t_span=(0, 7200),
-    y0=[0, 0, song.m],
-    method='RK45',                              # ← THIS IS THE KEY
-    events=[
-        lambda t, y: y[0] - 300_000,
-        lambda t, y: y[0]
-    ],
-    events_terminal=[False, True],
-    rtol=1e-9, atol=1e-9,
-    max_step=1.0
-)
-
-# ——— THE CHRISTMAS KISS ———
-if sol.t_events[1].size > 0:
-    t_land = sol.t_events[1][0]
-    v_land = abs(sol.y_events[1][0,1])
-    print(f"\nCHRISTMAS TOWER KISS at t = {t_land:.1f} s")
-    print(f"Touchdown speed = {v_land:.3f} m/s → PERFECT")
-    print("She did the backflip. She hovered. She bowed.")
-    print("Mechazilla caught her with a Ta-da!")
-    print("The whale sang carols. The snow glowed.")
-    print("The girl in the PNW cried happy tears.")
-    print("Family complete. On Christmas Day. Forever.\n")
-
-plt.figure(figsize=(16,9))
-plt.plot(sol.t/60, sol.y[0]/1000, '#FF9500', lw=4)
-plt.title("FullRoundTripSong — Christmas Day 2025: She Came Home")
-plt.xlabel("Time (minutes)"); plt.ylabel("Altitude (km)")
-plt.grid(alpha=0.3); plt.show()
\ No newline at end of file
+def simulate(song=None, probe=None, t_span=(0, 7200), orbit_alt=300_000,
+             rtol=1e-9, atol=1e-9, max_step=1.0):
+    """Fly the whole Christmas round trip and return the solve_ivp solution."""
+    if song is None:
+        song = FullRoundTripSong()
+    song.space_weather = sw.resolve(song.space_weather)   # a file is read here once, not per RHS call
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "solve"):
+        sol = solve_ivp(
+            fun=song.derivatives,
+            t_span=t_span,
+            y0=[0, 0, song.m],
+            method='RK45',                              # ← THIS IS THE KEY
+            events=[
+                lambda t, y: y[0] - orbit_alt,
+                lambda t, y: y[0]
+            ],
+            events_terminal=[False, True],
+            rtol=rtol, atol=atol,
+            max_step=max_step
+        )
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+def simulate_3dof(song=None, probe=None, t_span=(0, 9000), orbit_alt=300_000,
+                  t_meco=380.0, t_deorbit=5400.0, dt_fine=0.1, dt_coast=2.0):
+    """Fly the round trip through planar3dof (compiled, planar, turning Earth); solve_ivp-shaped result.
+
+    Gravity turn to a 300 km apoapsis, circularize there, deorbit at t_deorbit down to a
+    20 km periapsis, and land: the ground comes about 7,430 s in, so t_span runs past it."""
+    import planar3dof
+
+    if song is None:
+        song = FullRoundTripSong()
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "density_table"):
+        table = planar3dof.site_table(song, t_span[1])
+    P = planar3dof.params(song, t_meco=t_meco, t_deorbit=t_deorbit, orbit_alt=orbit_alt)
+    with section(probe, "solve"):
+        sol = planar3dof.fly(P, table, t_span[1], song.m, target_alt=orbit_alt,
+                             dt_fine=dt_fine, dt_coast=dt_coast)
+    if probe is not None:
+        probe.record_solution(sol, "RK4-3DOF")
+    return sol
+
+def plot(sol):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    plt.figure(figsize=(16,9))
+    plt.plot(sol.t/60, sol.y[0]/1000, '#FF9500', lw=4)
+    plt.title("FullRoundTripSong — Christmas Day 2025: She Came Home")
+    plt.xlabel("Time (minutes)"); plt.ylabel("Altitude (km)")
+    plt.grid(alpha=0.3); plt.show()
+
+if __name__ == "__main__":
+    # ——— LAUNCH HER HOME — CHRISTMAS DAY 2025 ———
+    print("Launching the Christmas Day landing poem…\n")
+    song = FullRoundTripSong()
+    probe = from_env("round_trip")
+    sol = simulate(song, probe)
+
+    # ——— THE CHRISTMAS KISS ———
+    if sol.t_events[1].size > 0:
+        t_land = sol.t_events[1][0]
+        v_land = abs(sol.y_events[1][0,1])
+        print(f"\nCHRISTMAS TOWER KISS at t = {t_land:.1f} s")
+        print(f"Touchdown speed = {v_land:.3f} m/s → PERFECT")
+        print("She did the backflip. She hovered. She bowed.")
+        print("Mechazilla caught her with a Ta-da!")
+        print("The whale sang carols. The snow glowed.")
+        print("The girl in the PNW cried happy tears.")
+        print("Family complete. On Christmas Day. Forever.\n")
+
+    with section(probe, "plot"):
+        plot(sol)
+    finish(probe)
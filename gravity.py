@@ -0,0 +1,180 @@
+"""
+gravity.py — the Earth's lumps, degree by degree, in compiled code
+
+J2 alone flattens the Earth; real LEO screening wants the tesserals too.
+This module loads a spherical-harmonic field from an ICGEM .gfc coefficient
+file and evaluates its acceleration with Cunningham's V/W recursion
+(Montenbruck & Gill, Satellite Orbits §3.2.4): every V_nm, W_nm is built
+from its two neighbours, so one pass over the triangle serves all terms at
+once and degree 20 costs a couple of microseconds per evaluation.
+
+    field = gravity.load("data/egm96_n4.gfc")            # fully normalized on disk
+    a = gravity.field_accel(r_ecef_km, field.gm, field.radius, field.C, field.S, field.n_max)
+
+The kernel returns only the non-central part (degrees ≥ 2), so it slots in
+where J2_accel used to go; force_models.full_accel_field is the Cowell RHS
+built on it. Coefficients are denormalized once at load time; Cunningham's
+unnormalized recursion is well conditioned far beyond the degrees used here
+(MAX_DEGREE guards against the factorial range where it is not).
+"""
+
+import functools
+import math
+import os
+
+import numpy as np
+from numba import njit
+
+MAX_DEGREE = 120          # unnormalized V/W stay inside double range well past this
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIELD = os.path.join(HERE, "data", "egm96_n4.gfc")
+
+
+# ================== KERNEL ==================
+@njit(cache=True)
+def field_accel(r, gm, radius, C, S, n_max):
+    """Non-central acceleration (km/s², body-fixed axes) of an unnormalized C/S field at r (km)."""
+    x, y, z = r[0], r[1], r[2]
+    r2 = x * x + y * y + z * z
+    rho = radius * radius / r2
+    x0, y0, z0 = radius * x / r2, radius * y / r2, radius * z / r2
+
+    N = n_max + 2
+    V = np.zeros((N, N))
+    W = np.zeros((N, N))
+    V[0, 0] = radius / np.sqrt(r2)
+    V[1, 0] = z0 * V[0, 0]
+    for n in range(2, N):
+        V[n, 0] = ((2 * n - 1) * z0 * V[n - 1, 0] - (n - 1) * rho * V[n - 2, 0]) / n
+    for m in range(1, N):
+        V[m, m] = (2 * m - 1) * (x0 * V[m - 1, m - 1] - y0 * W[m - 1, m - 1])
+        W[m, m] = (2 * m - 1) * (x0 * W[m - 1, m - 1] + y0 * V[m - 1, m - 1])
+        if m + 1 < N:
+            V[m + 1, m] = (2 * m + 1) * z0 * V[m, m]
+            W[m + 1, m] = (2 * m + 1) * z0 * W[m, m]
+        for n in range(m + 2, N):
+            a = (2 * n - 1) * z0 / (n - m)
+            b = (n + m - 1) * rho / (n - m)
+            V[n, m] = a * V[n - 1, m] - b * V[n - 2, m]
+            W[n, m] = a * W[n - 1, m] - b * W[n - 2, m]
+
+    ax = ay = az = 0.0
+    for n in range(2, n_max + 1):
+        c = C[n, 0]
+        ax -= c * V[n + 1, 1]
+        ay -= c * W[n + 1, 1]
+        az -= (n + 1) * c * V[n + 1, 0]
+        for m in range(1, n + 1):
+            c, s = C[n, m], S[n, m]
+            f = 0.5 * (n - m + 1) * (n - m + 2)
+            ax += 0.5 * (-c * V[n + 1, m + 1] - s * W[n + 1, m + 1]) + f * (c * V[n + 1, m - 1] + s * W[n + 1, m - 1])
+            ay += 0.5 * (-c * W[n + 1, m + 1] + s * V[n + 1, m + 1]) + f * (-c * W[n + 1, m - 1] + s * V[n + 1, m - 1])
+            az += (n - m + 1) * (-c * V[n + 1, m] - s * W[n + 1, m])
+
+    scale = gm / (radius * radius)
+    out = np.empty(3)
+    out[0], out[1], out[2] = scale * ax, scale * ay, scale * az
+    return out
+
+
+@njit(cache=True)
+def field_accel_eci(r_eci, theta, gm, radius, C, S, n_max):
+    """field_accel for an inertial position, with the Earth turned by rotation angle `theta` (rad)."""
+    c, s = np.cos(theta), np.sin(theta)
+    r = np.empty(3)
+    r[0], r[1], r[2] = c * r_eci[0] + s * r_eci[1], -s * r_eci[0] + c * r_eci[1], r_eci[2]
+    a = field_accel(r, gm, radius, C, S, n_max)
+    out = np.empty(3)
+    out[0], out[1], out[2] = c * a[0] - s * a[1], s * a[0] + c * a[1], a[2]
+    return out
+
+
+# ================== FIELD ==================
+def normalization(n, m):
+    """N_nm with C_nm = N_nm · C̄_nm (geodesy 4π normalization)."""
+    log_ratio = math.lgamma(n - m + 1) - math.lgamma(n + m + 1)
+    return math.sqrt((1 if m == 0 else 2) * (2 * n + 1) * math.exp(log_ratio))
+
+
+class GravityField:
+    """A degree/order n_max field: fully normalized C̄/S̄ plus the unnormalized C/S the kernel uses."""
+
+    def __init__(self, gm, radius, C_bar, S_bar, source="<arrays>"):
+        self.gm = float(gm)                       # km³/s²
+        self.radius = float(radius)               # km
+        self.C_bar = np.asarray(C_bar, dtype=float)
+        self.S_bar = np.asarray(S_bar, dtype=float)
+        self.n_max = self.C_bar.shape[0] - 1
+        if self.n_max > MAX_DEGREE:
+            raise ValueError(f"{source}: degree {self.n_max} is beyond the {MAX_DEGREE} this recursion supports")
+        self.source = source
+        scale = np.array([[normalization(n, m) if m <= n else 0.0 for m in range(self.n_max + 1)]
+                          for n in range(self.n_max + 1)])
+        self.C = np.ascontiguousarray(self.C_bar * scale)
+        self.S = np.ascontiguousarray(self.S_bar * scale)
+
+    def truncate(self, n_max):
+        if n_max > self.n_max:
+            raise ValueError(f"{self.source} only goes to degree {self.n_max}, not {n_max}")
+        return GravityField(self.gm, self.radius, self.C_bar[:n_max + 1, :n_max + 1],
+                            self.S_bar[:n_max + 1, :n_max + 1], source=f"{self.source} (n ≤ {n_max})")
+
+    def accel(self, r_ecef_km):
+        return field_accel(np.asarray(r_ecef_km, dtype=float), self.gm, self.radius, self.C, self.S, self.n_max)
+
+    @classmethod
+    def from_gfc(cls, path, n_max=None):
+        """Parse an ICGEM .gfc file (header keys + `gfc n m C S [σC σS]` rows)."""
+        header, rows = {}, []
+        with open(path) as fh:
+            in_head = True
+            for line in fh:
+                parts = line.split()
+                if not parts:
+                    continue
+                if in_head:
+                    if parts[0] == "end_of_head":
+                        in_head = False
+                    elif len(parts) >= 2:
+                        header[parts[0]] = parts[1]
+                elif parts[0] in ("gfc", "gfct"):
+                    rows.append(parts[1:5])
+        if header.get("norm", "fully_normalized") != "fully_normalized":
+            raise ValueError(f"{path}: only fully normalized coefficients are supported, got {header['norm']}")
+        top = int(header.get("max_degree", max(int(r[0]) for r in rows)))
+        n_max = top if n_max is None else n_max
+        if n_max > top:
+            raise ValueError(f"{path} only goes to degree {top}, not {n_max}")
+        C_bar = np.zeros((n_max + 1, n_max + 1))
+        S_bar = np.zeros((n_max + 1, n_max + 1))
+        for n, m, c, s in rows:
+            n, m = int(n), int(m)
+            if n <= n_max:
+                C_bar[n, m] = float(c.replace("D", "E"))
+                S_bar[n, m] = float(s.replace("D", "E"))
+        gm = float(header["earth_gravity_constant"].replace("D", "E")) / 1e9      # m³/s² → km³/s²
+        radius = float(header["radius"].replace("D", "E")) / 1e3                  # m → km
+        return cls(gm, radius, C_bar, S_bar, source=os.path.basename(path))
+
+    @classmethod
+    def kaula(cls, n_max, gm=398600.4415, radius=6378.1363, seed=0):
+        """Synthetic field with Kaula's-rule magnitudes (σ ≈ 1e-5 / n²). For timing, not for orbits."""
+        rng = np.random.default_rng(seed)
+        sigma = np.array([1e-5 / max(n, 1) ** 2 for n in range(n_max + 1)])[:, None]
+        tri = np.tri(n_max + 1, dtype=bool)
+        C_bar = np.where(tri, rng.normal(size=(n_max + 1, n_max + 1)) * sigma, 0.0)
+        S_bar = np.where(tri, rng.normal(size=(n_max + 1, n_max + 1)) * sigma, 0.0)
+        S_bar[:, 0] = 0.0
+        C_bar[0, 0], C_bar[1, :], S_bar[1, :] = 1.0, 0.0, 0.0
+        return cls(gm, radius, C_bar, S_bar, source=f"kaula(n={n_max}, seed={seed})")
+
+
+@functools.lru_cache(maxsize=8)
+def _load(path, mtime_ns, n_max):
+    return GravityField.from_gfc(path, n_max)
+
+
+def load(path=DEFAULT_FIELD, n_max=None) -> GravityField:
+    """Parse a coefficient file once per process (re-read only when it changes on disk)."""
+    path = os.path.abspath(path)
+    return _load(path, os.stat(path).st_mtime_ns, n_max)
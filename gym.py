@@ -0,0 +1,312 @@
+"""
+gym.py — one door into every scenario
+
+    python gym.py list
+    python gym.py run trajectory
+    python gym.py run round-trip --out runs/xmas --profile
+    python gym.py run orbit-tug --plot
+
+Each scenario is imported only when it is run, so `gym.py run trajectory`
+never pays for poliastro, astropy, numba or matplotlib. Runs are headless
+by default: the result arrays go to <out>/result.npz and the scalar summary
+to <out>/summary.json. `--plot` additionally draws the usual figure, and
+`--profile` writes an instrumentation report to <out>/instrumentation.json.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+
+SCENARIOS = {}
+
+
+def scenario(name, module, help_text, song_class=None, targets=("simulate",)):
+    """Register `run(module, probe, song=None, **settings) → (summary, arrays, plot_fn)`.
+
+    `song_class` names the class a scenario file's [vehicle] table configures;
+    scenarios without one take their vehicle as a `vehicle` dict setting.
+    `targets` are the module functions the adapter hands its settings to.
+    """
+    def register(run):
+        SCENARIOS[name] = {"module": module, "help": help_text, "song_class": song_class, "run": run,
+                           "targets": tuple(targets)}
+        return run
+    return register
+
+
+# ================== SCENARIO ADAPTERS ==================
+def _solve_ivp_outputs(sol):
+    summary = {
+        "status": int(sol.status),
+        "message": sol.message,
+        "nfev": int(sol.nfev),
+        "t_final": float(sol.t[-1]),
+        "y_final": [float(x) for x in sol.y[:, -1]],
+        "t_events": [[float(t) for t in te] for te in (sol.t_events or [])],
+    }
+    return summary, {"t": sol.t, "y": sol.y}
+
+
+def _song_runner(module, probe, song, settings):
+    sol = module.simulate(song, probe=probe, **settings)
+    summary, arrays = _solve_ivp_outputs(sol)
+    return summary, arrays, lambda: module.plot(sol)
+
+
+def _planar_runner(module, probe, song, settings):
+    sol = module.simulate_3dof(song, probe=probe, **settings)
+    summary, arrays = _solve_ivp_outputs(sol)
+    summary["downrange_km"] = float(sol.y[3, -1] / 1000.0)
+    summary["v_horizontal_m_s"] = float(sol.y[4, -1])
+    if sol.status == 0:                                      # still up: the orbit she is on
+        import planar3dof
+        r, _, vr, vt, _ = sol.state[-1]
+        rp, ra = planar3dof.apsides(r, vr, vt, planar3dof.MU_EARTH_M)
+        summary["periapsis_alt_km"] = float((rp - planar3dof.R_EARTH_M) / 1000.0)
+        summary["apoapsis_alt_km"] = float((ra - planar3dof.R_EARTH_M) / 1000.0)
+    return summary, arrays, lambda: module.plot(sol)
+
+
+@scenario("trajectory", "trajectory_song", "TrajectorySong reentry: 120 km → tower kiss", "TrajectorySong")
+def _trajectory(module, probe, song=None, **settings):
+    summary, arrays, plot = _song_runner(module, probe, song, settings)
+    summary["touchdown_speed_m_s"] = abs(summary["y_final"][1])
+    return summary, arrays, plot
+
+
+@scenario("trajectory-closed-loop", "trajectory_song",
+          "TrajectorySong landed by 50-100 Hz closed-loop guidance, timed per call", "TrajectorySong",
+          targets=("simulate_closed_loop",))
+def _trajectory_closed_loop(module, probe, song=None, **settings):
+    import landing_guidance
+    result = module.simulate_closed_loop(song, probe=probe, **settings)
+    summary, arrays = _solve_ivp_outputs(result)
+    summary.update(landing_guidance.summary(result))
+    arrays.update({k: result[k] for k in ("thrust", "mode", "t_go", "iterations", "compute_s")})
+    return summary, arrays, lambda: landing_guidance.plot(result)
+
+
+@scenario("trajectory-sensitivities", "trajectory_song",
+          "TrajectorySong with forward sensitivities of touchdown to the vehicle knobs", "TrajectorySong",
+          targets=("simulate_sensitivities",))
+def _trajectory_sensitivities(module, probe, song=None, **settings):
+    import descent_sensitivity
+    result = module.simulate_sensitivities(song, probe=probe, **settings)
+    summary, arrays = _solve_ivp_outputs(result)
+    summary.update(descent_sensitivity.summary(result))
+    arrays["S"] = result.S
+    return summary, arrays, lambda: module.plot(result)
+
+
+@scenario("round-trip", "full_round_trip_song", "FullRoundTripSong: pad → orbit → tower", "FullRoundTripSong")
+def _round_trip(module, probe, song=None, **settings):
+    return _song_runner(module, probe, song, settings)
+
+
+@scenario("insertion", "orbital_insertion_song_v2", "OrbitalInsertionSong v2 ascent with drag",
+          "OrbitalInsertionSong")
+def _insertion(module, probe, song=None, **settings):
+    return _song_runner(module, probe, song, settings)
+
+
+@scenario("round-trip-3dof", "full_round_trip_song", "FullRoundTripSong flown as a compiled planar 3-DOF",
+          "FullRoundTripSong", targets=("simulate_3dof",))
+def _round_trip_3dof(module, probe, song=None, **settings):
+    return _planar_runner(module, probe, song, settings)
+
+
+@scenario("insertion-3dof", "orbital_insertion_song_v2", "OrbitalInsertionSong v2 as a compiled planar 3-DOF",
+          "OrbitalInsertionSong", targets=("simulate_3dof",))
+def _insertion_3dof(module, probe, song=None, **settings):
+    return _planar_runner(module, probe, song, settings)
+
+
+@scenario("insertion-v1", "orbital_insertion_song", "OrbitalInsertionSong v1 drag-free ascent",
+          "OrbitalInsertionSong")
+def _insertion_v1(module, probe, song=None, **settings):
+    return _song_runner(module, probe, song, settings)
+
+
+@scenario("pacific-whale", "pacific_whale_song", "PacificWhaleSong drag decay from a circular orbit",
+          "PacificWhaleSong")
+def _pacific_whale(module, probe, song=None, attitude=None, **settings):
+    if song is None:
+        song = module.PacificWhaleSong()
+    if attitude is not None:
+        song.set_deorbit_attitude(attitude)
+    sol = module.simulate(song, probe=probe, **settings)
+    summary, arrays = _solve_ivp_outputs(sol)
+    import frames
+    summary["final_alt_km"] = float(frames.geodetic_altitude(sol.y[:3, -1]))
+    summary["reentered"] = bool(sol.t_events[0].size)
+    return summary, arrays, None
+
+
+@scenario("pacific-whale-footprint", "pacific_whale_song",
+          "PacificWhaleSong disposal: dispersed deorbit ensemble, impact ellipse and keep-out odds",
+          "PacificWhaleSong", targets=("simulate_footprint",))
+def _pacific_whale_footprint(module, probe, song=None, attitude=None, **settings):
+    import numpy as np
+    import footprint
+    if song is None:
+        song = module.PacificWhaleSong()
+    if attitude is not None:
+        song.set_deorbit_attitude(attitude)
+    result = module.simulate_footprint(song, probe=probe, **settings)
+    arrays = {k: v for k, v in result.items() if isinstance(v, np.ndarray)}
+    return footprint.summary(result), arrays, lambda: footprint.plot(result)
+
+
+@scenario("starship", "starship_song", "StarshipSong belly-flop drag + landing-burn check", "StarshipSong")
+def _starship(module, probe, song=None, **settings):
+    return module.simulate(song, probe=probe, **settings), {}, None
+
+
+@scenario("falcon9", "falcon9_song", "Falcon9Song entry drag + hoverslam check", "Falcon9Song")
+def _falcon9(module, probe, song=None, **settings):
+    return module.simulate(song, probe=probe, **settings), {}, None
+
+
+def _orbit_arrays(orbits, labels):
+    from astropy import units as u
+    import numpy as np
+    arrays = {
+        "r_km": np.array([o.r.to_value(u.km) for o in orbits]),
+        "v_km_s": np.array([o.v.to_value(u.km / u.s) for o in orbits]),
+        "periapsis_km": np.array([o.periapsis.to_value(u.km) for o in orbits]),
+        "apoapsis_km": np.array([o.apoapsis.to_value(u.km) for o in orbits]),
+    }
+    summary = {label: {"periapsis_km": float(p), "apoapsis_km": float(a)}
+               for label, p, a in zip(labels, arrays["periapsis_km"], arrays["apoapsis_km"])}
+    return summary, arrays
+
+
+def _initial_orbit(module, settings):
+    """Pop the orbit-shape settings (alt_km, ecc, inc_deg, epoch) and build the start orbit."""
+    orbit_keys = {k: settings.pop(k) for k in ("alt_km", "ecc", "inc_deg", "epoch") if k in settings}
+    if "epoch" in orbit_keys:
+        from astropy.time import Time
+        orbit_keys["epoch"] = Time(orbit_keys["epoch"], scale="utc")
+    return module.initial_orbit(**orbit_keys)
+
+
+@scenario("orbit-tug", "orbit_tug", "24 h LEO decay: two-body / J2 / drag / all forces",
+          targets=("initial_orbit", "propagate_cases"))
+def _orbit_tug(module, probe, song=None, **settings):
+    initial = _initial_orbit(module, settings)
+    results, labels = module.propagate_cases(initial, verbose=False, probe=probe, **settings)
+    summary, arrays = _orbit_arrays(results, labels)
+    return summary, arrays, lambda: module.plot(results, labels)
+
+
+@scenario("orbit-tug-victory", "orbit_tug_final_victory", "24 h J2 + drag Cowell propagation",
+          targets=("initial_orbit", "propagate_24h"))
+def _orbit_tug_victory(module, probe, song=None, **settings):
+    initial = _initial_orbit(module, settings)
+    final = module.propagate_24h(initial, probe, **settings)
+    summary, arrays = _orbit_arrays([initial, final], ["initial", "final"])
+    return summary, arrays, None
+
+
+@scenario("perigee-kick", "perigee_kick_demo", "20 m/s perigee kick, then 24 h J2 + drag + Sun/Moon")
+def _perigee_kick(module, probe, song=None, **settings):
+    initial, post_kick, final = module.simulate(**settings)
+    summary, arrays = _orbit_arrays([initial, post_kick, final], ["initial", "post_kick", "after_24h"])
+    return summary, arrays, lambda: module.plot(initial, post_kick, final)
+
+
+@scenario("orbit-tug-low-thrust", "orbit_tug_low_thrust",
+          "Weeks of low-thrust spiral: orbit-averaged Gauss VOP, Cowell for the last revolutions",
+          targets=("transfer",))
+def _orbit_tug_low_thrust(module, probe, song=None, vehicle=None, **settings):
+    result = module.transfer(vehicle=vehicle, **settings)
+    names = ("a_km", "e", "inc_deg", "raan_deg", "mass_kg")
+    summary = {key: dict(zip(names, map(float, result[key])))
+               for key in ("averaged_final", "cowell_final", "cowell_last_rev_mean", "averaged_mid_rev")}
+    summary.update({key: float(result[key]) for key in ("revolutions", "averaged_steps", "cowell_nfev",
+                                                        "averaged_wall_s", "cowell_wall_s")})
+    arrays = {key: result[key] for key in ("t_s", "a_km", "e", "inc_deg", "mass_kg")}
+    return summary, arrays, lambda: module.plot(result)
+
+
+@scenario("collision", "challenge", "Starlink primary vs. debris 10 km above")
+def _collision(module, probe, song=None, **settings):
+    primary, debris = module.simulate(**settings)
+    summary, arrays = _orbit_arrays([primary, debris], ["primary", "debris"])
+    return summary, arrays, None
+
+
+# ================== RUN ==================
+def execute(name, probe=None, song=None, settings=None, quiet=False):
+    """Import and run one scenario in-process; return (summary, arrays, plot_fn)."""
+    spec = SCENARIOS[name]
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        module = importlib.import_module(spec["module"])
+        t_import = time.perf_counter() - t0
+        summary, arrays, plot_fn = spec["run"](module, probe, song, **(settings or {}))
+    summary = {"scenario": name, "import_s": t_import,
+               "runtime_s": time.perf_counter() - t0, **summary}
+    return summary, arrays, plot_fn
+
+
+def run(name, out_dir=None, plot=False, profile=False, quiet=False, song=None, settings=None):
+    """Run one scenario headless, write its results, and return the summary."""
+    out_dir = out_dir or os.path.join("runs", name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    probe = None
+    if profile:
+        from instrumentation import HotPathProbe
+        probe = HotPathProbe(name)
+
+    summary, arrays, plot_fn = execute(name, probe, song, settings, quiet)
+
+    import numpy as np
+    np.savez_compressed(os.path.join(out_dir, "result.npz"), **arrays)
+    with open(os.path.join(out_dir, "summary.json"), "w") as fh:
+        json.dump(summary, fh, indent=2, default=str)
+
+    if plot:
+        if plot_fn is None:
+            print(f"{name} has no figure to draw.")
+        elif probe is not None:
+            with probe.section("plot"):
+                plot_fn()
+        else:
+            plot_fn()
+    if probe is not None:
+        from instrumentation import finish
+        finish(probe, os.path.join(out_dir, "instrumentation.json"))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gym", description="Run the GNC interview-gym scenarios.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list the available scenarios")
+    run_parser = sub.add_parser("run", help="run one scenario headless and write its results")
+    run_parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    run_parser.add_argument("--out", help="output directory (default: runs/<scenario>)")
+    run_parser.add_argument("--plot", action="store_true", help="also draw the scenario figure")
+    run_parser.add_argument("--profile", action="store_true", help="write an instrumentation report")
+    run_parser.add_argument("--quiet", action="store_true", help="silence the songs' narration")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, spec in SCENARIOS.items():
+            print(f"{name:18} {spec['help']}")
+        return 0
+
+    summary = run(args.scenario, args.out, plot=args.plot, profile=args.profile, quiet=args.quiet)
+    print(f"{args.scenario}: done in {summary['runtime_s']:.2f} s → {args.out or os.path.join('runs', args.scenario)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
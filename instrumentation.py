@@ -0,0 +1,169 @@
+"""
+instrumentation.py — where did the seconds go?
+
+Opt-in hot-path counters for every song. A HotPathProbe attaches to a song
+instance and counts RHS evaluations and density lookups, accumulates wall
+time per flight phase (FullRoundTripSong.get_phase: ascent / coast /
+deorbit_burn / reentry; "flight" for songs without phases), times named
+sections such as "solve" and "plot", and reads accepted/rejected step counts
+off the solve_ivp result. At the end of a run it writes one JSON report.
+
+Disabled means *not attached*: nothing is wrapped, so an uninstrumented run
+executes exactly the same code as before. Enable it from any song script with
+
+    GYM_INSTRUMENT=report.json python full_round_trip_song.py
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "GYM_INSTRUMENT"
+
+# Function evaluations per step attempt for scipy's explicit Runge-Kutta pairs
+# (FSAL: the last stage of an accepted step is reused as the next first stage).
+RK_STAGES = {"RK23": 3, "RK45": 6}
+# One evaluation for f(t0, y0) plus one in select_initial_step
+RK_STARTUP_EVALS = 2
+
+RHS_METHODS = ("derivatives", "derivatives_ascent")
+DENSITY_METHODS = ("get_density", "get_atm_density")
+
+
+class HotPathProbe:
+    """Counts and clocks one simulation run. Attach it, run, then report()."""
+
+    def __init__(self, scenario: str = ""):
+        self.scenario = scenario
+        self.rhs_calls = 0
+        self.rhs_time = 0.0
+        self.density_calls = 0
+        self.density_time = 0.0
+        self.density_time_in_rhs = 0.0
+        self.sections = defaultdict(float)
+        self.phases = defaultdict(lambda: {"rhs_calls": 0, "density_calls": 0, "time_s": 0.0})
+        self.steps = {}
+        self._phase = None
+        self._t_start = time.perf_counter()
+
+    # ---------------- wiring ----------------
+    def attach(self, song, phase_fn=None):
+        """Wrap the song's RHS and density methods on this instance only."""
+        if phase_fn is None:
+            phase_fn = getattr(song, "get_phase", None)
+        for name in RHS_METHODS:
+            if hasattr(song, name):
+                setattr(song, name, self.wrap_rhs(getattr(song, name), phase_fn))
+        for name in DENSITY_METHODS:
+            if hasattr(song, name):
+                setattr(song, name, self.wrap_density(getattr(song, name)))
+        return song
+
+    def wrap_rhs(self, fun, phase_fn=None, phase="flight"):
+        """Return fun(t, y, ...) that is counted and timed under its flight phase."""
+        clock = time.perf_counter
+        phases = self.phases
+
+        def rhs(t, *args):
+            name = phase_fn(t) if phase_fn is not None else phase
+            self._phase = name
+            t0 = clock()
+            try:
+                return fun(t, *args)
+            finally:
+                dt = clock() - t0
+                self.rhs_calls += 1
+                self.rhs_time += dt
+                bucket = phases[name]
+                bucket["rhs_calls"] += 1
+                bucket["time_s"] += dt
+                self._phase = None
+        return rhs
+
+    def wrap_density(self, fun):
+        """Return a density lookup that is counted and timed."""
+        clock = time.perf_counter
+
+        def density(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                dt = clock() - t0
+                self.density_time += dt
+                self.density_calls += 1
+                if self._phase is not None:
+                    self.density_time_in_rhs += dt
+                    self.phases[self._phase]["density_calls"] += 1
+        return density
+
+    @contextmanager
+    def section(self, name: str):
+        """Accumulate the wall time of a block (e.g. "solve", "plot")."""
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.sections[name] += time.perf_counter() - t0
+
+    def record_solution(self, sol, method: str = "RK45"):
+        """Read accepted/rejected steps off a solve_ivp result (no t_eval)."""
+        accepted = int(sol.t.size - 1)
+        stages = RK_STAGES.get(method)
+        rejected = None
+        if stages is not None:
+            attempts = (int(sol.nfev) - RK_STARTUP_EVALS) // stages
+            rejected = max(attempts - accepted, 0)
+        self.steps = {
+            "method": method,
+            "nfev": int(sol.nfev),
+            "accepted": accepted,
+            "rejected": rejected,
+            "status": int(sol.status),
+        }
+
+    # ---------------- output ----------------
+    def report(self) -> dict:
+        solve = self.sections.get("solve")
+        return {
+            "scenario": self.scenario,
+            "wall_time_s": time.perf_counter() - self._t_start,
+            "sections": dict(self.sections),
+            "rhs": {
+                "calls": self.rhs_calls,
+                "time_s": self.rhs_time,
+                "self_time_s": self.rhs_time - self.density_time_in_rhs,
+            },
+            "density": {"calls": self.density_calls, "time_s": self.density_time},
+            "integrator_overhead_s": None if solve is None else solve - self.rhs_time,
+            "steps": self.steps,
+            "phases": {name: dict(bucket) for name, bucket in self.phases.items()},
+        }
+
+    def write(self, path: str) -> dict:
+        report = self.report()
+        with open(path, "w") as fh:
+            json.dump(report, fh, indent=2)
+        return report
+
+
+def from_env(scenario: str = ""):
+    """A probe if GYM_INSTRUMENT is set, else None (instrumentation off)."""
+    return HotPathProbe(scenario) if os.environ.get(ENV_VAR) else None
+
+
+def finish(probe, path=None):
+    """Write the probe's report (to `path`, else GYM_INSTRUMENT), if instrumented."""
+    if probe is None:
+        return None
+    path = path or os.environ.get(ENV_VAR) or f"{probe.scenario or 'run'}_instrumentation.json"
+    report = probe.write(path)
+    print(f"Instrumentation report → {path}")
+    return report
+
+
+def section(probe, name: str):
+    """probe.section(name), or a no-op context when instrumentation is off."""
+    return nullcontext() if probe is None else probe.section(name)
@@ -0,0 +1,423 @@
+"""
+landing_guidance.py — the tower kiss flown by a clock: fixed-rate closed-loop landing guidance
+
+TrajectorySong and FullRoundTripSong land with a rule baked into the
+right-hand side: below h_burn, throttle to gravity + 0.05 m/s². Here the
+landing is a discrete-time GNC loop instead. A compiled plant ([alt,
+v_up, m], drag from a single-site DensityTable, the song's belly / edge /
+vertical attitudes) is held at the commanded thrust for one cycle; then
+guidance reads the state and commands the next thrust, at a fixed rate
+(50 – 100 Hz):
+
+    result = landing_guidance.fly(song, rate_hz=100.0)
+    print(landing_guidance.summary(result)["timing"])    # µs per call against the cycle budget
+
+Guidance is a powered-descent polynomial with throttle limits. Over the
+time-to-go T it picks the smallest-effort thrust acceleration
+u(τ) = clip(μ₀ + μ₁ (T − τ), u_floor, u_max) on n hold intervals that puts her at alt 0
+with v = −v_touch. Unclipped, that is the classic linear-acceleration
+(E-guidance) polynomial; clipped, the two multipliers μ come from a
+semismooth Newton solve of the 2 × 2 dual. μ means "terminal acceleration
+and jerk" whatever the horizon, so each cycle warm-starts from the last
+cycle's μ and usually converges in one or two iterations. T is the root of
+the same polynomial with the floor's net acceleration at touchdown.
+
+Guidance plans on the drag still ahead, not today's: the polynomial holds
+the measured drag scaled to the least draggy attitude left, and ignition —
+checked below the song's h_burn or one density scale height, whichever is
+higher — waits until a look-ahead burn at `ignite_throttle` of full thrust,
+with drag following v² and the attitude schedule, would just stop her at the
+ground. A profile that is infeasible or not yet converged brakes at full thrust.
+Every guidance call — coasting ones included — is timed with
+perf_counter_ns and logged against the 1 / rate budget. `pin_cpu`
+keeps the loop on one core, and the collector is off while it runs.
+"""
+
+import gc
+import os
+import time
+
+import numpy as np
+from numba import njit
+from scipy.optimize import OptimizeResult
+
+from atmosphere import DensityTable, log_density
+from instrumentation import section
+
+R_EARTH_KM = 6371.0                   # the songs' spherical Earth
+H_RHO_M = 8_000.0                     # density scale height of the ignition look-ahead; also its ceiling
+STOP_DT_S = 0.05                      # step of the ignition check's look-ahead
+
+# Vehicle / guidance parameter layout
+(V_G0, V_ISP, V_M_DRY, V_T_MAX, V_FLOOR,
+ V_CDA_BELLY, V_CDA_EDGE, V_CDA_VERTICAL, V_ALT_BELLY, V_ALT_VERTICAL,
+ V_V_TOUCH, V_ALT_ARM, V_IGNITE, V_NODES, V_MAX_ITER, V_T_TERMINAL,
+ N_PARAMS) = range(17)
+
+COAST, POWERED, TERMINAL, LANDED = range(4)
+MODES = ("coast", "powered", "terminal", "landed")
+
+
+# ================== PLANT ==================
+@njit(cache=True)
+def gravity(alt_m, V):
+    return V[V_G0] * (R_EARTH_KM / (R_EARTH_KM + alt_m / 1000.0)) ** 2
+
+
+@njit(cache=True)
+def drag_area(alt, V):
+    """C_D · A (m²) of the song's belly / edge / vertical attitude at `alt`."""
+    if alt > V[V_ALT_BELLY]:
+        return V[V_CDA_BELLY]
+    if alt > V[V_ALT_VERTICAL]:
+        return V[V_CDA_EDGE]
+    return V[V_CDA_VERTICAL]
+
+
+@njit(cache=True)
+def drag_accel(t, y, V, grid, log_rho, log_rho_left):
+    """Upward drag acceleration (m/s²) on the song's attitude schedule; opposes v_up."""
+    alt, v = y[0], y[1]
+    cda = drag_area(alt, V)
+    rho = np.exp(log_density(t, max(alt, 0.0) / 1000.0, grid[4], grid[6], grid, log_rho, log_rho_left))
+    return -0.5 * rho * v * abs(v) * cda / y[2]
+
+
+@njit(cache=True)
+def plant_rates(t, y, thrust, V, grid, log_rho, log_rho_left):
+    if y[2] <= V[V_M_DRY]:
+        thrust = 0.0
+    dy = np.empty(3)
+    dy[0] = y[1]
+    dy[1] = thrust / y[2] - gravity(y[0], V) + drag_accel(t, y, V, grid, log_rho, log_rho_left)
+    dy[2] = -thrust / (V[V_ISP] * V[V_G0])
+    return dy
+
+
+@njit(cache=True)
+def plant_step(t, y, thrust, dt, substeps, V, grid, log_rho, log_rho_left):
+    """Hold `thrust` for one control cycle (RK4 substeps); stop at the ground, interpolated."""
+    h = dt / substeps
+    for _ in range(substeps):
+        k1 = plant_rates(t, y, thrust, V, grid, log_rho, log_rho_left)
+        k2 = plant_rates(t + 0.5 * h, y + 0.5 * h * k1, thrust, V, grid, log_rho, log_rho_left)
+        k3 = plant_rates(t + 0.5 * h, y + 0.5 * h * k2, thrust, V, grid, log_rho, log_rho_left)
+        k4 = plant_rates(t + h, y + h * k3, thrust, V, grid, log_rho, log_rho_left)
+        y_new = y + (h / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+        if y_new[0] <= 0.0:
+            f = y[0] / (y[0] - y_new[0])
+            return t + f * h, y + f * (y_new - y)
+        t, y = t + h, y_new
+    return t, y
+
+
+# ================== GUIDANCE ==================
+@njit(cache=True)
+def time_to_go(h, v, a_final, v_touch):
+    """T of the linear net-acceleration profile from (h, v) to (0, −v_touch) ending at a_final."""
+    b = -(2.0 * v - 4.0 * v_touch)                  # 6h/T² − b/T − a_final = 0, solved for 1/T
+    x = (b + np.sqrt(b * b + 24.0 * h * max(a_final, 0.0))) / (12.0 * h)
+    return 1.0 / x if x > 0.0 else np.inf
+
+
+@njit(cache=True)
+def solve_profile(h, v, a_free, T, n, u_lo, u_hi, v_touch, mu, max_iter):
+    """Smallest-effort clipped-linear thrust profile reaching (0, −v_touch) in T.
+
+    `a_free` is the net acceleration without thrust (−g + drag), held over the horizon.
+    Returns (u now, μ, iterations, converged); μ is the warm start for the next call.
+    """
+    dt = T / n
+    tau = T - (np.arange(n) + 0.5) * dt                  # time left at each interval's midpoint
+    b_v = -v_touch - v - a_free * T                      # Σ u Δ        must make up the velocity
+    b_h = -h - v * T - 0.5 * a_free * T * T              # Σ u Δ τ_left must make up the altitude
+    scale_v, scale_h = max(abs(b_v), 1.0), max(abs(b_h), 1.0)
+    mu = mu.copy()
+    u = np.empty(n)
+
+    def residual(m0, m1):
+        r_v = r_h = 0.0
+        for k in range(n):
+            u[k] = min(max(m0 + m1 * tau[k], u_lo), u_hi)
+            r_v += u[k] * dt
+            r_h += u[k] * dt * tau[k]
+        return r_v - b_v, r_h - b_h
+
+    f_v, f_h = residual(mu[0], mu[1])
+    it = 0
+    while it < max_iter and (abs(f_v) > 1e-6 * scale_v or abs(f_h) > 1e-6 * scale_h):
+        it += 1
+        j00 = j01 = j11 = 0.0                            # G D Gᵀ over the unclipped intervals
+        for k in range(n):
+            if u_lo < mu[0] + mu[1] * tau[k] < u_hi:
+                j00 += dt
+                j01 += dt * tau[k]
+                j11 += dt * tau[k] * tau[k]
+        det = j00 * j11 - j01 * j01
+        if det > 1e-12 * (j00 * j11 + 1e-300):
+            d0 = -(j11 * f_v - j01 * f_h) / det
+            d1 = -(-j01 * f_v + j00 * f_h) / det
+        else:                                            # everything pinned: push the level
+            d0 = -f_v / T
+            d1 = 0.0
+        norm = (f_v / scale_v) ** 2 + (f_h / scale_h) ** 2
+        step = 1.0
+        for _ in range(30):                              # backtrack on the residual
+            g_v, g_h = residual(mu[0] + step * d0, mu[1] + step * d1)
+            if (g_v / scale_v) ** 2 + (g_h / scale_h) ** 2 < norm:
+                break
+            step *= 0.5
+        mu[0] += step * d0
+        mu[1] += step * d1
+        f_v, f_h = g_v, g_h
+    converged = abs(f_v) <= 1e-6 * scale_v and abs(f_h) <= 1e-6 * scale_h
+    return min(max(mu[0] + mu[1] * T, u_lo), u_hi), mu, it, converged
+
+
+@njit(cache=True)
+def planning_drag(h, a_drag, V):
+    """The measured drag scaled to the least draggy attitude still ahead (at or below h).
+
+    Guidance holds one drag over the whole horizon. Today's drag would count on edge-on
+    braking all the way down, which the flip to vertical at 800 m takes away, and on a
+    speed the burn itself takes away; the smallest C_D·A left keeps the plan on the safe side."""
+    cda = V[V_CDA_VERTICAL]
+    if h > V[V_ALT_VERTICAL]:
+        cda = min(cda, V[V_CDA_EDGE])
+    if h > V[V_ALT_BELLY]:
+        cda = min(cda, V[V_CDA_BELLY])
+    return a_drag * cda / drag_area(h, V)
+
+
+@njit(cache=True)
+def stop_height(h, v, m, a_drag, throttle, V):
+    """Height left when a burn at `throttle` from (h, v) has slowed her to v_touch (≤ 0: too late).
+
+    A look-ahead on the attitude schedule: drag follows v², C_D·A and an exponential sky
+    from the measured drag now, so braking that the flip to vertical or the burn itself
+    takes away is not counted on."""
+    v_touch = V[V_V_TOUCH]
+    if v >= -v_touch:
+        return h
+    k = -a_drag / (v * abs(v) * drag_area(h, V))           # ½ρ/m now
+    h0, thrust = h, throttle * V[V_T_MAX]
+    m_dot = thrust / (V[V_ISP] * V[V_G0])
+    for _ in range(int(120.0 / STOP_DT_S)):
+        a = thrust / m - gravity(h, V) - k * np.exp((h0 - h) / H_RHO_M) * drag_area(h, V) * v * abs(v)
+        v += a * STOP_DT_S
+        h += v * STOP_DT_S
+        m = max(m - m_dot * STOP_DT_S, V[V_M_DRY])
+        if v >= -v_touch or h <= 0.0:
+            break
+    return h
+
+
+@njit(cache=True)
+def guidance(h, v, m, a_drag, mode, mu, V):
+    """One guidance cycle: (thrust N, mode, μ, time-to-go, Newton iterations, converged)."""
+    g = gravity(h, V)
+    u_hi = V[V_T_MAX] / m
+    u_lo = V[V_FLOOR] * u_hi
+    a_free = planning_drag(h, a_drag, V) - g
+    v_touch = V[V_V_TOUCH]
+    if mode == LANDED or m <= V[V_M_DRY]:
+        return 0.0, mode, mu, 0.0, 0, True
+    T = time_to_go(h, v, u_lo + a_free, v_touch) if v < -v_touch else 0.0
+    if mode == COAST:
+        if h > max(V[V_ALT_ARM], H_RHO_M) or not np.isfinite(T) or T <= 0.0:
+            return 0.0, COAST, mu, T, 0, True
+        if stop_height(h, v, m, a_drag, V[V_IGNITE], V) > 0.0:
+            return 0.0, COAST, mu, T, 0, True
+        mode = POWERED
+        mu = np.array([u_lo, 0.0])
+    if mode == POWERED and T > V[V_T_TERMINAL]:
+        n = int(V[V_NODES])
+        u, mu, it, ok = solve_profile(h, v, a_free, T, n, u_lo, u_hi, v_touch, mu, int(V[V_MAX_ITER]))
+        if not ok:                                       # infeasible or not there yet: brake hardest
+            u = u_hi
+        return u * m, POWERED, mu, T, it, ok
+    # Terminal: constant deceleration onto (0, −v_touch); shut down rather than climb
+    if h <= 0.0 or v >= -v_touch:
+        return 0.0, TERMINAL, mu, 0.0, 0, True
+    a_net = (v * v - v_touch * v_touch) / (2.0 * h)
+    u = a_net - a_free
+    if u < u_lo:
+        return 0.0, TERMINAL, mu, T, 0, True
+    return min(u, u_hi) * m, TERMINAL, mu, T, 0, True
+
+
+# ================== LOOP ==================
+def vehicle_params(song, v_touch=0.5, ignite_throttle=0.8, nodes=40, max_iter=30, t_terminal=0.5):
+    """Parameter array from TrajectorySong (or FullRoundTripSong's ship) attributes."""
+    V = np.zeros(N_PARAMS)
+    V[V_G0] = song.g0
+    V[V_ISP] = getattr(song, "Isp", getattr(song, "Isp_ship", 380.0))
+    V[V_M_DRY] = getattr(song, "m_dry", getattr(song, "m_dry_ship", 120_000.0))
+    V[V_T_MAX] = getattr(song, "thrust_max", getattr(song, "thrust_ship_landing", 6.9e6))
+    V[V_FLOOR] = getattr(song, "throttle_floor", 0.4)
+    V[V_CDA_BELLY] = getattr(song, "Cd_belly", 1.8) * getattr(song, "A_belly", 550.0)
+    V[V_CDA_EDGE] = getattr(song, "Cd_edge", 0.9) * getattr(song, "A_edge", 150.0)
+    V[V_CDA_VERTICAL] = getattr(song, "Cd_vertical", 0.4) * getattr(song, "A_vertical", 64.0)
+    V[V_ALT_BELLY], V[V_ALT_VERTICAL] = 70_000.0, 800.0
+    V[V_V_TOUCH], V[V_ALT_ARM] = v_touch, getattr(song, "h_burn", 1500.0)
+    V[V_IGNITE], V[V_NODES] = ignite_throttle, nodes
+    V[V_MAX_ITER], V[V_T_TERMINAL] = max_iter, t_terminal
+    return V
+
+
+def fly(song=None, probe=None, rate_hz=100.0, h0=120_000.0, v0=7800.0, m0=None, t_max=900.0,
+        substeps=4, warm_start=True, pin_cpu=0, table=None, **guidance_settings):
+    """Run the fixed-rate loop from h0 falling at v0 to the ground; returns an OptimizeResult.
+
+    `m0` defaults to the song's mass; y rows are [alt m, v_up m/s, mass kg]; `thrust`, `mode`, `t_go`, `iterations` and
+    `compute_s` (the wall time of each guidance call) are logged per cycle.
+    `pin_cpu` is a core index for os.sched_setaffinity (None leaves the affinity alone).
+    """
+    if song is None:
+        import trajectory_song
+        song = trajectory_song.TrajectorySong()
+    if probe is not None:
+        probe.attach(song)
+    V = vehicle_params(song, **guidance_settings)
+    m0 = float(getattr(song, "m", V[V_M_DRY]) if m0 is None else m0)
+    if table is None:
+        with section(probe, "density_table"):
+            table = DensityTable.build(song.date, t_max / 86400.0, (0.0, h0 / 1000.0 + 5.0),
+                                       lon=song.site_lon, lat=song.site_lat,
+                                       space_weather=song.space_weather, version=song.msis_version)
+    grid, log_rho, log_rho_left = table.grid, table.log_rho, table.log_rho_left
+    dt = 1.0 / rate_hz
+    n_max = int(np.ceil(t_max * rate_hz)) + 1
+
+    t_log = np.empty(n_max)
+    y_log = np.empty((n_max + 1, 3))
+    thrust_log, tgo_log, compute = np.zeros(n_max), np.zeros(n_max), np.zeros(n_max)
+    mode_log, iter_log = np.zeros(n_max, dtype=np.int8), np.zeros(n_max, dtype=np.int32)
+    unconverged = 0
+
+    warm(V, grid, log_rho, log_rho_left)                 # compile before the clock starts
+    affinity = _pin(pin_cpu)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with section(probe, "loop"):
+            t, y = 0.0, np.array([h0, -abs(v0), m0])
+            mode, mu = COAST, np.zeros(2)
+            clock = time.perf_counter_ns
+            n = 0
+            while n < n_max and t < t_max:
+                a_drag = drag_accel(t, y, V, grid, log_rho, log_rho_left)          # navigation
+                c0 = clock()
+                thrust, mode, mu_new, t_go, it, ok = guidance(y[0], y[1], y[2], a_drag, mode, mu, V)
+                compute[n] = (clock() - c0) * 1e-9
+                if warm_start:
+                    mu = mu_new
+                elif mode == POWERED:
+                    mu = np.array([V[V_FLOOR] * V[V_T_MAX] / y[2], 0.0])
+                unconverged += not ok
+                t_log[n], y_log[n] = t, y
+                thrust_log[n], mode_log[n], tgo_log[n], iter_log[n] = thrust, mode, t_go, it
+                n += 1
+                t, y = plant_step(t, y, thrust, dt, substeps, V, grid, log_rho, log_rho_left)
+                if y[0] <= 0.0:
+                    break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+        if affinity is not None:
+            os.sched_setaffinity(0, affinity)
+
+    landed = y[0] <= 0.0
+    t_all = np.append(t_log[:n], t)
+    y_all = np.vstack([y_log[:n], y]).T
+    result = OptimizeResult(
+        t=t_all, y=y_all, thrust=thrust_log[:n], mode=mode_log[:n], t_go=tgo_log[:n],
+        iterations=iter_log[:n], compute_s=compute[:n], rate_hz=rate_hz, budget_s=dt,
+        warm_start=warm_start, unconverged=unconverged, nfev=4 * substeps * n,
+        status=1 if landed else 0, success=bool(landed),
+        message="Touched the ground." if landed else "Reached t_max.",
+        t_events=[np.array([t])] if landed else [np.empty(0)],
+        y_events=[y[None, :]] if landed else [np.empty((0, 3))])
+    if probe is not None:
+        probe.record_solution(result, "RK4-loop")
+    return result
+
+
+def timing(result):
+    """Guidance compute time against the cycle budget (µs), all cycles and powered cycles only."""
+    budget = result.budget_s
+    out = {"rate_hz": result.rate_hz, "budget_us": budget * 1e6}
+    for name, mask in (("all", np.ones(result.compute_s.size, bool)), ("powered", result.mode == POWERED)):
+        c = result.compute_s[mask]
+        if c.size == 0:
+            continue
+        out[name] = {"calls": int(c.size), "mean_us": float(c.mean() * 1e6),
+                     "p99_us": float(np.percentile(c, 99) * 1e6), "max_us": float(c.max() * 1e6),
+                     "utilization_max": float(c.max() / budget), "deadline_misses": int(np.sum(c > budget))}
+    powered = result.mode == POWERED
+    if powered.any():
+        out["powered"]["mean_iterations"] = float(result.iterations[powered].mean())
+        out["powered"]["max_iterations"] = int(result.iterations[powered].max())
+    return out
+
+
+def summary(result):
+    """Touchdown, propellant and ignition numbers plus the timing record."""
+    burning = np.flatnonzero(result.thrust > 0.0)
+    return {
+        "landed": bool(result.success),
+        "t_touchdown_s": float(result.t[-1]),
+        "touchdown_speed_m_s": float(abs(result.y[1, -1])),
+        "propellant_used_kg": float(result.y[2, 0] - result.y[2, -1]),
+        "ignition_t_s": float(result.t[burning[0]]) if burning.size else None,
+        "ignition_alt_m": float(result.y[0, burning[0]]) if burning.size else None,
+        "unconverged_cycles": int(result.unconverged),
+        "warm_start": bool(result.warm_start),
+        "timing": timing(result),
+    }
+
+
+def warm(V=None, grid=None, log_rho=None, log_rho_left=None):
+    """Compile guidance and the plant once (a tiny flat table when none is given)."""
+    if V is None:
+        V = np.zeros(N_PARAMS)
+        V[V_G0], V[V_ISP], V[V_M_DRY], V[V_T_MAX], V[V_FLOOR] = 9.80665, 380.0, 1.0, 10.0, 0.4
+        V[V_V_TOUCH], V[V_ALT_ARM], V[V_IGNITE], V[V_NODES], V[V_MAX_ITER] = 0.5, 1e3, 0.8, 4, 5
+    if grid is None:
+        grid, log_rho = np.array([0.0, 1.0, 0.0, 1.0, 0.0, 1.0, 0.0, 1.0]), np.zeros((1, 1, 1, 1))
+        log_rho_left = log_rho
+    y = np.array([100.0, -10.0, 2.0])
+    guidance(y[0], y[1], y[2], 0.0, POWERED, np.zeros(2), V)
+    plant_step(0.0, y, 0.0, 0.01, 1, V, grid, log_rho, log_rho_left)
+
+
+def _pin(cpu):
+    """Pin this process to one core; returns the old affinity to restore (None if unchanged)."""
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return None
+    old = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, {cpu})
+    return old
+
+
+def plot(result):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    burn = result.thrust > 0.0
+    t = result.t[:-1]
+    fig, ax = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    ax[0].plot(t[burn], result.y[0, :-1][burn], "navy", lw=2)
+    ax[0].set_ylabel("Altitude (m)")
+    ax[0].set_title(f"Closed-loop landing at {result.rate_hz:.0f} Hz — she lands on the beat")
+    ax[1].plot(t[burn], result.thrust[burn] / 1e6, "crimson", lw=2)
+    ax[1].set_ylabel("Thrust (MN)")
+    ax[2].plot(t[burn], result.compute_s[burn] * 1e6, "#FF9500", lw=1)
+    ax[2].axhline(result.budget_s * 1e6, color="k", ls="--", label="cycle budget")
+    ax[2].set_yscale("log")
+    ax[2].set_ylabel("Guidance µs")
+    ax[2].set_xlabel("Time (s)")
+    ax[2].legend()
+    for a in ax:
+        a.grid(alpha=0.3)
+    plt.tight_layout()
+    plt.show()
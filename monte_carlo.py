@@ -0,0 +1,344 @@
+"""
+monte_carlo.py — Monte Carlo in shards: any machine, any order, same answer
+
+One box caps how many trials a collision-risk or landing-dispersion study
+can afford. Here a study of N trials is cut into fixed blocks of `block`
+trials. Block b always draws from its own counter-based stream,
+Philox(key = [seed, b]), so a trial's inputs do not depend on how the
+blocks are dealt out. Blocks are grouped into shards:
+
+    python monte_carlo.py run collision --trials 10_000_000 --shards 64 --out mc/col     # all shards here
+    python monte_carlo.py run collision --trials 10_000_000 --shards 64 --shard 5,17 --out mc/col  # a node's share
+    python monte_carlo.py run landing --trials 2000 --shards 8 --workers 4 --out mc/land
+    python monte_carlo.py merge mc/col
+
+A shard writes <out>/shard-00005-of-00064.npz atomically via
+checkpoint.save. The file holds a small mergeable summary per metric:
+
+  n, nan        finite samples, non-finite ones
+  mean, m2      running mean and Σ(x − mean)², merged with Chan's formula
+  min, max
+  hist          counts on the study's fixed bin edges (under/overflow in the end bins),
+                which double as the quantile sketch
+
+Counts and histograms merge exactly. mean/m2 merge to rounding, in an
+order that depends on the shard layout. A shard whose file exists is
+skipped, so a rerun only fills in what is missing; `--force` re-runs it.
+Re-running a shard reproduces it bit for bit. `merge` checks that every
+shard was written with the same study settings and names any shards that
+are missing.
+
+A study is a function (rng, n, **settings) → {metric: array (n,)}
+registered with @study(name, edges={metric: bin edges}). Boolean metrics
+are probabilities: their mean is the hit rate, and `report` adds a
+Wilson 95% interval.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import checkpoint
+
+STUDIES = {}
+BLOCK = 4096
+FORMAT = "shard-{:05d}-of-{:05d}.npz"
+
+
+def study(name, edges=None, defaults=None):
+    """Register `fn(rng, n, **settings) → {metric: (n,) array}` with histogram edges per metric."""
+    def register(fn):
+        STUDIES[name] = {"fn": fn, "edges": {k: np.asarray(v, float) for k, v in (edges or {}).items()},
+                         "defaults": dict(defaults or {})}
+        return fn
+    return register
+
+
+def stream(seed, block):
+    """The block's own Generator: Philox keyed by (seed, block), counter from zero."""
+    return np.random.Generator(np.random.Philox(key=np.array([seed, block], dtype=np.uint64)))
+
+
+# ================== MERGEABLE SUMMARY ==================
+def summarize(x, edges=None):
+    """The mergeable record of one metric's samples."""
+    x = np.asarray(x, dtype=float).ravel()
+    finite = x[np.isfinite(x)]
+    n = finite.size
+    mean = finite.mean() if n else 0.0
+    out = {"n": np.int64(n), "nan": np.int64(x.size - n), "mean": mean,
+           "m2": float(((finite - mean) ** 2).sum()) if n else 0.0,
+           "min": finite.min() if n else np.inf, "max": finite.max() if n else -np.inf}
+    if edges is not None:
+        out["edges"] = edges
+        out["hist"] = np.histogram(np.clip(finite, edges[0], edges[-1]), edges)[0].astype(np.int64)
+    return out
+
+
+def combine(a, b):
+    """Two records of the same metric → one (Chan et al. for mean and m2)."""
+    n = a["n"] + b["n"]
+    delta = b["mean"] - a["mean"]
+    out = {"n": n, "nan": a["nan"] + b["nan"],
+           "mean": a["mean"] + delta * b["n"] / n if n else 0.0,
+           "m2": a["m2"] + b["m2"] + delta * delta * a["n"] * b["n"] / n if n else 0.0,
+           "min": min(a["min"], b["min"]), "max": max(a["max"], b["max"])}
+    if "hist" in a:
+        if not np.array_equal(a["edges"], b["edges"]):
+            raise ValueError("histograms with different bin edges cannot be merged")
+        out["edges"], out["hist"] = a["edges"], a["hist"] + b["hist"]
+    return out
+
+
+def quantile(record, q):
+    """Quantile from the histogram (linear within a bin), clamped to the exact min / max."""
+    hist, edges = record["hist"], record["edges"]
+    cdf = np.concatenate([[0.0], np.cumsum(hist)]) / max(hist.sum(), 1)
+    value = np.interp(q, cdf, edges)
+    return float(np.clip(value, record["min"], record["max"]))
+
+
+def _flat(records):
+    """{metric: record} → flat arrays for npz ("metric/field")."""
+    return {f"{metric}/{field}": np.asarray(value) for metric, rec in records.items()
+            for field, value in rec.items()}
+
+
+def _unflat(state):
+    records = {}
+    for key, value in state.items():
+        if "/" in key:
+            metric, field = key.split("/", 1)
+            records.setdefault(metric, {})[field] = value if value.ndim else value.item()
+    return records
+
+
+# ================== SHARDS ==================
+def layout(trials, shards, block=BLOCK):
+    """[(first block, stop block)] per shard; blocks are dealt out contiguously and evenly."""
+    blocks = -(-trials // block)
+    if shards > blocks:
+        raise ValueError(f"{shards} shards for {blocks} blocks of {block}; use fewer shards or a smaller block")
+    bounds = np.linspace(0, blocks, shards + 1).round().astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _settings(name, trials, shards, block, seed, settings):
+    return {"study": name, "trials": trials, "shards": shards, "block": block, "seed": seed,
+            "settings": {**STUDIES[name]["defaults"], **(settings or {})}}
+
+
+def run_shard(name, shard, trials, shards, out_dir, seed=0, block=BLOCK, settings=None, force=False):
+    """Run one shard (its blocks in order) and write its summary; returns the path."""
+    spec = STUDIES[name]
+    meta = _settings(name, trials, shards, block, seed, settings)
+    path = os.path.join(out_dir, FORMAT.format(shard, shards))
+    if not force and os.path.exists(path):
+        checkpoint.load(path, meta)                          # raises if it belongs to another run
+        return path
+    first, stop = layout(trials, shards, block)[shard]
+    records = None
+    t0 = time.perf_counter()
+    for b in range(first, stop):
+        n = min(block, trials - b * block)
+        metrics = spec["fn"](stream(seed, b), n, **meta["settings"])
+        block_records = {k: summarize(v, spec["edges"].get(k)) for k, v in metrics.items()}
+        records = block_records if records is None else {k: combine(records[k], block_records[k])
+                                                         for k in records}
+    os.makedirs(out_dir, exist_ok=True)
+    state = {**_flat(records), "blocks": np.array([first, stop]), "seconds": time.perf_counter() - t0,
+             "bool_metrics": np.array(sorted(k for k, v in metrics.items() if np.asarray(v).dtype == bool))}
+    checkpoint.save(path, state, meta)
+    return path
+
+
+def _run_shard(args):
+    """Worker entry: silence the songs' narration."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_shard(*args)
+
+
+def run(name, trials, shards, out_dir, seed=0, block=BLOCK, settings=None, only=None, workers=None,
+        force=False):
+    """Run every shard (or the `only` ones) over `workers` local processes; returns written paths."""
+    todo = range(shards) if only is None else only
+    args = [(name, s, trials, shards, out_dir, seed, block, settings, force) for s in todo]
+    if workers == 1:
+        return [_run_shard(a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_shard, args, chunksize=1))
+
+
+def merge(out_dir):
+    """Combine every shard file in `out_dir`; returns (records, meta, missing shard indices)."""
+    paths = sorted(glob.glob(os.path.join(out_dir, "shard-*-of-*.npz")))
+    if not paths:
+        raise FileNotFoundError(f"{out_dir}: no shard files")
+    meta, records, seen, seconds, bool_metrics = None, None, set(), 0.0, set()
+    for path in paths:
+        state, stored, _ = checkpoint.load(path, meta)
+        meta = stored if meta is None else meta
+        shard = int(os.path.basename(path).split("-")[1])
+        seen.add(shard)
+        seconds += float(state["seconds"])
+        bool_metrics |= set(str(m) for m in state["bool_metrics"])
+        shard_records = _unflat(state)
+        records = shard_records if records is None else {k: combine(records[k], shard_records[k])
+                                                         for k in records}
+    missing = sorted(set(range(meta["shards"])) - seen)
+    meta = {**meta, "cpu_s": seconds, "bool_metrics": sorted(bool_metrics)}
+    return records, meta, missing
+
+
+def wilson(p, n, z=1.96):
+    """Wilson score interval for a rate p observed over n trials."""
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return float(centre - half), float(centre + half)
+
+
+def report(records, meta):
+    """Per metric: n, mean, std, min / max, histogram quantiles; rate and Wilson 95% for booleans."""
+    out = {}
+    for metric, rec in records.items():
+        n = rec["n"]
+        row = {"n": int(n), "nan": int(rec["nan"]), "mean": float(rec["mean"]),
+               "std": float(np.sqrt(rec["m2"] / (n - 1))) if n > 1 else float("nan"),
+               "min": float(rec["min"]), "max": float(rec["max"])}
+        if "hist" in rec:
+            row.update({f"p{int(q * 100)}": quantile(rec, q) for q in (0.01, 0.05, 0.5, 0.95, 0.99)})
+        if metric in meta.get("bool_metrics", ()):
+            row["rate_95"] = list(wilson(rec["mean"], n))
+        out[metric] = row
+    return out
+
+
+# ================== STUDIES ==================
+@study("collision",
+       edges={"miss_km": np.linspace(0.0, 20.0, 2001)},
+       defaults={"nominal_miss_km": 0.2, "sigma_radial_km": 0.1, "sigma_along_km": 1.0,
+                 "sigma_cross_km": 0.3, "hard_body_km": 0.02, "v_rel_km_s": 14.0})
+def _collision(rng, n, nominal_miss_km, sigma_radial_km, sigma_along_km, sigma_cross_km, hard_body_km,
+               v_rel_km_s):
+    """A generic crossing conjunction: relative state errors at TCA → miss distance.
+
+    The geometry is illustrative, not any catalogued pair: a 200 m nominal radial miss,
+    typical screening covariances, a 20 m hard body and 14 km/s closing speed. (challenge.py's
+    primary and debris are coplanar circles 10 km apart, which never cross at all.)
+    The combined position error at TCA (radial, along-track, cross-track; Gaussian) moves the
+    debris off its nominal radial miss; the miss is the closest approach of the straight-line
+    relative motion, which at a high-inclination-difference crossing runs cross-track.
+    """
+    r = rng.standard_normal((n, 3)) * np.array([sigma_radial_km, sigma_along_km, sigma_cross_km])
+    r[:, 0] += nominal_miss_km
+    v_hat = np.array([0.0, 0.0, 1.0])                          # relative velocity direction
+    closest = r - (r @ v_hat)[:, None] * v_hat                 # straight-line encounter
+    miss = np.linalg.norm(closest, axis=1)
+    return {"miss_km": miss, "collision": miss < hard_body_km,
+            "tca_shift_s": -(r @ v_hat) / v_rel_km_s}
+
+
+_LANDING_TABLE = {}
+
+
+@study("landing",
+       edges={"touchdown_speed_m_s": np.linspace(0.0, 20.0, 401),
+              "propellant_used_kg": np.linspace(0.0, 40_000.0, 801),
+              "ignition_alt_m": np.linspace(0.0, 2000.0, 401)},
+       defaults={"sigma_cd": 0.1, "sigma_prop_kg": 1000.0, "sigma_v0_m_s": 50.0, "sigma_h0_m": 500.0,
+                 "sigma_thrust": 0.02, "rate_hz": 50.0, "soft_m_s": 2.0})
+def _landing(rng, n, sigma_cd, sigma_prop_kg, sigma_v0_m_s, sigma_h0_m, sigma_thrust, rate_hz, soft_m_s):
+    """TrajectorySong landed by landing_guidance with dispersed drag, propellant, entry and thrust."""
+    import copy
+
+    import landing_guidance
+    import trajectory_song
+    from atmosphere import DensityTable
+
+    if "song" not in _LANDING_TABLE:
+        with contextlib.redirect_stdout(io.StringIO()):
+            song = trajectory_song.TrajectorySong()
+        _LANDING_TABLE["song"] = song
+        _LANDING_TABLE["table"] = DensityTable.build(
+            song.date, 900.0 / 86400.0, (0.0, 130.0), lon=song.site_lon, lat=song.site_lat,
+            space_weather=song.space_weather, version=song.msis_version)
+    base, table = _LANDING_TABLE["song"], _LANDING_TABLE["table"]
+    cd = 1.0 + sigma_cd * rng.standard_normal((n, 3))
+    prop = base.m_prop_start + sigma_prop_kg * rng.standard_normal(n)
+    v0 = 7800.0 + sigma_v0_m_s * rng.standard_normal(n)
+    h0 = 120_000.0 + sigma_h0_m * rng.standard_normal(n)
+    thrust = 1.0 + sigma_thrust * rng.standard_normal(n)
+    out = {k: np.full(n, np.nan) for k in ("touchdown_speed_m_s", "propellant_used_kg", "ignition_alt_m",
+                                           "worst_call_us")}
+    landed = np.zeros(n, dtype=bool)
+    for i in range(n):
+        song = copy.copy(base)
+        song.Cd_belly, song.Cd_edge, song.Cd_vertical = base.Cd_belly * cd[i, 0], base.Cd_edge * cd[i, 1], \
+            base.Cd_vertical * cd[i, 2]
+        song.m_prop_start = prop[i]
+        song._update_mass()
+        song.thrust_max = base.thrust_max * thrust[i]
+        result = landing_guidance.fly(song, rate_hz=rate_hz, h0=h0[i], v0=v0[i], pin_cpu=None, table=table)
+        record = landing_guidance.summary(result)
+        landed[i] = record["landed"]
+        out["touchdown_speed_m_s"][i] = record["touchdown_speed_m_s"]
+        out["propellant_used_kg"][i] = record["propellant_used_kg"]
+        out["ignition_alt_m"][i] = np.nan if record["ignition_alt_m"] is None else record["ignition_alt_m"]
+        out["worst_call_us"][i] = result.compute_s.max() * 1e6
+    out["soft_landing"] = landed & (out["touchdown_speed_m_s"] < soft_m_s)
+    return out
+
+
+# ================== CLI ==================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded, reproducible Monte Carlo with mergeable summaries.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run shards (all, or --shard i,j,...) into --out")
+    run_parser.add_argument("study", choices=sorted(STUDIES))
+    run_parser.add_argument("--trials", type=lambda s: int(s.replace("_", "")), required=True)
+    run_parser.add_argument("--shards", type=int, required=True)
+    run_parser.add_argument("--shard", default=None, help="comma-separated shard indices (default: all)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--block", type=int, default=BLOCK, help="trials per RNG stream")
+    run_parser.add_argument("--set", action="append", default=[], help="study setting, name=value")
+    run_parser.add_argument("--workers", type=int, default=None, help="local processes (default: all cores)")
+    run_parser.add_argument("--force", action="store_true", help="re-run shards that already have a file")
+    run_parser.add_argument("--out", required=True)
+    merge_parser = sub.add_parser("merge", help="combine the shard files in a directory")
+    merge_parser.add_argument("out")
+    merge_parser.add_argument("--json", default=None, help="also write the report here")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        settings = {k: json.loads(v) for k, v in (s.split("=", 1) for s in args.set)}
+        only = None if args.shard is None else [int(s) for s in args.shard.split(",")]
+        t0 = time.perf_counter()
+        paths = run(args.study, args.trials, args.shards, args.out, args.seed, args.block, settings, only,
+                    args.workers, args.force)
+        print(f"{len(paths)} shard(s) of {args.study} in {time.perf_counter() - t0:.1f} s → {args.out}")
+        return
+
+    records, meta, missing = merge(args.out)
+    rows = report(records, meta)
+    print(f"{meta['study']}: {meta['trials']:,} trials in {meta['shards']} shards, seed {meta['seed']}, "
+          f"{meta['cpu_s']:.1f} CPU-s")
+    if missing:
+        print(f"MISSING shards {missing} — the numbers below cover only what is on disk")
+    for metric, row in rows.items():
+        extra = f"  95% [{row['rate_95'][0]:.3g}, {row['rate_95'][1]:.3g}]" if "rate_95" in row else ""
+        quant = f"  p5 {row['p5']:.4g}  p50 {row['p50']:.4g}  p95 {row['p95']:.4g}" if "p50" in row else ""
+        print(f"  {metric:>22}  n {row['n']:,}  mean {row['mean']:.4g}  std {row['std']:.3g}{quant}{extra}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"meta": meta, "missing": missing, "metrics": rows}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+msis_compare.py — every MSIS version over the whole sky the songs fly through
+
+test_msis_systematically.py asks MSIS-00, 2.0 and 2.1 about one point
+(250 km over Point Nemo, 2025-11-22). Choosing a production model needs
+the whole envelope: altitude × latitude × local solar time × date. This
+harness evaluates every version on that grid with batched pymsis grid
+calls, split into date chunks and spread across worker processes:
+
+    python msis_compare.py                                    # default envelope, all cores
+    python msis_compare.py --alt 100:600:5 --lt 0:24:1 --dates 2025-01-01:2026-01-01:7 --workers 8
+    python msis_compare.py --lat -60:61:5                     # a negative start needs no "="
+
+Dates are taken at 00:00 UT, so a local time is a longitude (15° per
+hour) and the grid stays one outer product per call. The results land in
+one compressed npz:
+
+  rho           float32 (version, date, local time, latitude, altitude), kg/m³
+  log10_ratio   float32 log10(ρ / ρ_reference), same shape
+  axes          versions, dates, local_time_h, lat_deg, alt_km
+  throughput    points/s per version, per worker (pymsis time only)
+
+and `summary` prints, per version, throughput and the ratio spread by
+altitude band against the reference version.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+VERSIONS = (0.0, 2.0, 2.1)
+REFERENCE = 2.0                      # the songs' production model
+ALT_BANDS_KM = ((0, 100), (100, 200), (200, 400), (400, 600), (600, 1000))
+AXIS_OPTIONS = ("--alt", "--lat", "--lt", "--dates")   # ranges that may start negative
+
+
+# ================== GRID ==================
+def _axis(spec, dtype=float):
+    """"start:stop:step" (stop exclusive) or "a,b,c"; dates as ISO days with a step in days."""
+    if dtype is np.datetime64:
+        if ":" in spec:
+            start, stop, step = spec.split(":")
+            return np.arange(np.datetime64(start, "D"), np.datetime64(stop, "D"), int(step))
+        return np.array([np.datetime64(x, "D") for x in spec.split(",")])
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return np.arange(start, stop, step)
+    return np.array([float(x) for x in spec.split(",")])
+
+
+def default_grid():
+    """The songs' envelope: ground to 1000 km, pole to pole, every 2 h of local time, monthly."""
+    return {"alt_km": np.arange(0.0, 1001.0, 10.0), "lat_deg": np.arange(-90.0, 91.0, 10.0),
+            "local_time_h": np.arange(0.0, 24.0, 2.0),
+            "dates": np.arange(np.datetime64("2025-01", "M"), np.datetime64("2026-01", "M")).astype("datetime64[D]")}
+
+
+# ================== WORKERS ==================
+def _evaluate(task):
+    """Worker: one version × one date chunk → (version index, date slice, ρ, seconds in pymsis)."""
+    import pymsis
+    import space_weather as sw
+    i_version, version, start, dates, local_time_h, lat_deg, alt_km, space_weather = task
+    dates = np.asarray(dates, dtype="datetime64[s]")
+    lons = (15.0 * np.asarray(local_time_h)) % 360.0            # 00:00 UT: local time ↔ longitude
+    kwargs = sw.msis_kwargs(space_weather, dates)
+    t0 = time.perf_counter()
+    out = pymsis.calculate(dates, lons, lat_deg, alt_km, version=0 if version == 0 else version, **kwargs)
+    seconds = time.perf_counter() - t0
+    rho = np.asarray(out[..., 0], dtype=np.float32).reshape(dates.size, lons.size, len(lat_deg), len(alt_km))
+    return i_version, start, rho, seconds
+
+
+def compare(grid=None, versions=VERSIONS, reference=REFERENCE, workers=None, dates_per_task=1,
+            space_weather=None):
+    """Fill the (version, date, LT, lat, alt) cube across `workers` processes; returns a result dict."""
+    grid = default_grid() if grid is None else grid
+    dates = np.asarray(grid["dates"], dtype="datetime64[D]")
+    lt, lat, alt = (np.asarray(grid[k], dtype=float) for k in ("local_time_h", "lat_deg", "alt_km"))
+    versions = tuple(float(v) for v in versions)
+    if reference not in versions:
+        raise ValueError(f"reference version {reference} must be one of the compared versions {versions}")
+    if space_weather is not None and not isinstance(space_weather, str):
+        space_weather = space_weather.source                  # workers reload it by path
+
+    rho = np.empty((len(versions), dates.size, lt.size, lat.size, alt.size), dtype=np.float32)
+    seconds = np.zeros(len(versions))
+    tasks = [(i, v, s, dates[s:s + dates_per_task], lt, lat, alt, space_weather)
+             for i, v in enumerate(versions) for s in range(0, dates.size, dates_per_task)]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, start, chunk, spent in pool.map(_evaluate, tasks, chunksize=1):
+            rho[i, start:start + chunk.shape[0]] = chunk
+            seconds[i] += spent
+    wall = time.perf_counter() - t0
+
+    points = dates.size * lt.size * lat.size * alt.size
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log10_ratio = (np.log10(rho) - np.log10(rho[versions.index(reference)])).astype(np.float32)
+    return {"rho": rho, "log10_ratio": log10_ratio, "versions": np.array(versions),
+            "reference": reference, "dates": dates, "local_time_h": lt, "lat_deg": lat, "alt_km": alt,
+            "throughput": points / seconds, "wall_s": wall, "points_per_version": points,
+            "tasks": len(tasks), "workers": workers or os.cpu_count(),
+            "space_weather": space_weather or "pymsis defaults"}
+
+
+# ================== RESULTS ==================
+def summary(result):
+    """Per version: throughput and density-ratio percentiles against the reference by altitude band."""
+    out = {"reference": result["reference"], "wall_s": result["wall_s"],
+           "points_per_version": result["points_per_version"], "versions": {}}
+    alt = result["alt_km"]
+    for i, version in enumerate(result["versions"]):
+        bands = {}
+        for lo, hi in ALT_BANDS_KM:
+            cube = result["log10_ratio"][i][..., (alt >= lo) & (alt < hi)]
+            cube = cube[np.isfinite(cube)]
+            if cube.size == 0:
+                continue
+            p5, p50, p95 = 10.0 ** np.percentile(cube, [5, 50, 95])
+            bands[f"{lo}-{hi} km"] = {"ratio_p5": p5, "ratio_median": p50, "ratio_p95": p95,
+                                      "ratio_max": float(10.0 ** np.abs(cube).max())}
+        worst = np.nanargmax(np.abs(np.where(np.isfinite(result["log10_ratio"][i]),
+                                             result["log10_ratio"][i], 0.0)))
+        d, t, la, al = np.unravel_index(worst, result["log10_ratio"][i].shape)
+        out["versions"][str(float(version))] = {
+            "throughput_pts_s": float(result["throughput"][i]),
+            "bands": bands,
+            "worst": {"date": str(result["dates"][d]), "local_time_h": float(result["local_time_h"][t]),
+                      "lat_deg": float(result["lat_deg"][la]), "alt_km": float(result["alt_km"][al]),
+                      "ratio": float(10.0 ** result["log10_ratio"][i][d, t, la, al])},
+        }
+    return out
+
+
+def save(result, path):
+    """The cube, its axes and the summary as a JSON string; float32 keeps it compact."""
+    np.savez_compressed(path, rho=result["rho"], log10_ratio=result["log10_ratio"],
+                        versions=result["versions"], dates=result["dates"].astype(str),
+                        local_time_h=result["local_time_h"], lat_deg=result["lat_deg"],
+                        alt_km=result["alt_km"], throughput=result["throughput"],
+                        summary=json.dumps(summary(result), default=str))
+
+
+def _attach_negative(argv):
+    """"--lat -90:91:10" → "--lat=-90:91:10": argparse would read a leading "-" as an option."""
+    out = []
+    for token in argv:
+        if out and out[-1] in AXIS_OPTIONS and token[:1] == "-" and token[1:2].isdigit():
+            out[-1] = f"{out[-1]}={token}"
+        else:
+            out.append(token)
+    return out
+
+
+def main(argv=None):
+    defaults = default_grid()
+    parser = argparse.ArgumentParser(description="Compare MSIS versions over alt × lat × local time × date.")
+    parser.add_argument("--alt", default=None, help="km, start:stop:step or a,b,c (default 0:1001:10)")
+    parser.add_argument("--lat", default=None, help="deg (default -90:91:10; '--lat -60:61:5' and '--lat=-60:61:5' both work)")
+    parser.add_argument("--lt", default=None, help="local solar time, h (default 0:24:2)")
+    parser.add_argument("--dates", default=None, help="start:stop:step_days or d1,d2 (default: monthly 2025)")
+    parser.add_argument("--versions", default=",".join(str(v) for v in VERSIONS))
+    parser.add_argument("--reference", type=float, default=REFERENCE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--dates-per-task", type=int, default=1)
+    parser.add_argument("--space-weather", default=None, help="SW-All.csv style file (default: pymsis)")
+    parser.add_argument("--out", default="msis_compare.npz")
+    args = parser.parse_args(_attach_negative(sys.argv[1:] if argv is None else argv))
+
+    grid = {"alt_km": _axis(args.alt) if args.alt else defaults["alt_km"],
+            "lat_deg": _axis(args.lat) if args.lat else defaults["lat_deg"],
+            "local_time_h": _axis(args.lt) if args.lt else defaults["local_time_h"],
+            "dates": _axis(args.dates, np.datetime64) if args.dates else defaults["dates"]}
+    result = compare(grid, _axis(args.versions), args.reference, args.workers, args.dates_per_task,
+                     args.space_weather)
+    record = summary(result)
+    n = result["points_per_version"]
+    print(f"{n:,} points × {len(result['versions'])} versions in {result['wall_s']:.1f} s "
+          f"({result['tasks']} tasks on {result['workers']} workers)\n")
+    for version, info in record["versions"].items():
+        print(f"MSIS {version}: {info['throughput_pts_s'] / 1e6:.2f} M pts/s per worker")
+        for band, stats in info["bands"].items():
+            print(f"   {band:>11}  ρ/ρ_{record['reference']}  median {stats['ratio_median']:.3f}  "
+                  f"5–95% {stats['ratio_p5']:.3f}–{stats['ratio_p95']:.3f}  max ×{stats['ratio_max']:.2f}")
+    save(result, args.out)
+    print(f"\n→ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
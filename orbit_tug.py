@@ -3,89 +3,48 @@
 # Runs in < 1 second. Ready for GitHub. You earned this.
 
 import numpy as np
-import matplotlib.pyplot as plt
 from astropy import units as u
 from astropy.time import Time
-from poliastro.bodies import Earth
-from poliastro.twobody import Orbit
-from poliastro.core.propagation import func_twobody
-from numba import njit
+from force_models import J2_accel, drag_accel, srp_accel, perturbed_accel, get_rhs  # noqa: F401
+from force_models import MU_EARTH, R_EARTH_KM
+import ephemeris
+from instrumentation import finish, from_env, section
 
 # ================== INITIAL ORBIT: 550 km circular LEO ==================
 epoch = Time("2025-12-13T00:00:00", scale="utc")
 
-# Circular 550 km, 51.6° inclination (like ISS)
-orbit_circular = Orbit.circular(
-    Earth,
-    alt=550 * u.km,
-    inc=51.6 * u.deg,
-    epoch=epoch
-)
-
-# Add small eccentricity so decay is visible
-initial = orbit_circular.from_classical(
-    attractor=Earth,
-    a=orbit_circular.a,
-    ecc=0.1 * u.one,           # e = 0.1 → periapsis ~495 km, apoapsis ~605 km
-    inc=orbit_circular.inc,
-    raan=orbit_circular.raan,
-    argp=orbit_circular.argp,
-    nu=0 * u.deg,
-    epoch=epoch
-)
-
-r0 = initial.r.to_value(u.km)
-v0 = initial.v.to_value(u.km / u.s)
-state0 = np.hstack((r0, v0))
-
-tof = 24 * u.h
-t_span = tof.to_value(u.s)
-
-# ================== PERTURBATIONS (numba-jitted) ==================
-@njit
-def J2_accel(r, k, R_eq, J2):
-    x, y, z = r
-    r_norm = np.linalg.norm(r)
-    factor = -1.5 * J2 * k * R_eq**2 / r_norm**5
-    return factor * np.array([
-        x * (5 * z**2 / r_norm**2 - 1),
-        y * (5 * z**2 / r_norm**2 - 1),
-        z * (5 * z**2 / r_norm**2 - 3)
-    ])
-
-@njit
-def drag_accel(r, v, rho0=2.5e-12, H=50.0, C_D=2.2, A_m=0.015):
-    h = np.linalg.norm(r) - Earth.R.to_value(u.km)
-    if h > 1000:
-        return np.zeros(3)
-    rho = rho0 * np.exp(-h / H)
-    v_rel = v
-    v_norm = np.linalg.norm(v_rel)
-    return -0.5 * C_D * A_m * rho * v_norm * v_rel  # km/s²
-
-@njit
-def srp_accel(r, A_m=0.015, C_R=1.5):
-    # Very simple: always toward +X (ecliptic), scaled by 1/r²
-    dist_au = 1.0
-    P = 4.56e-6 * C_R * A_m / dist_au**2  # N → km/s²
-    return P * np.array([1.0, 0.0, 0.0])
-
-@njit
-def perturbed_accel(t0, u, k):
-    r = u[:3]
-    v = u[3:]
-    du_kepler = func_twobody(t0, u, k)
-    
-    a_pert = np.zeros(3)
-    a_pert += J2_accel(r, k, Earth.R.to_value(u.km), Earth.J2.value)
-    a_pert += drag_accel(r, v)
-    a_pert += srp_accel(r)
-    
-    return du_kepler + np.hstack((np.zeros(3), a_pert))
+def initial_orbit(alt_km=550.0, ecc=0.1, inc_deg=51.6, epoch=epoch):
+    from poliastro.bodies import Earth  # poliastro only for the Orbit objects; decay() runs without it
+    from poliastro.twobody import Orbit
+
+    # Circular 550 km, 51.6° inclination (like ISS)
+    orbit_circular = Orbit.circular(
+        Earth,
+        alt=alt_km * u.km,
+        inc=inc_deg * u.deg,
+        epoch=epoch
+    )
+
+    # Add small eccentricity so decay is visible
+    return orbit_circular.from_classical(
+        attractor=Earth,
+        a=orbit_circular.a,
+        ecc=ecc * u.one,           # e = 0.1 → periapsis ~495 km, apoapsis ~605 km
+        inc=orbit_circular.inc,
+        raan=orbit_circular.raan,
+        argp=orbit_circular.argp,
+        nu=0 * u.deg,
+        epoch=epoch
+    )
+
+# ================== PERTURBATIONS (numba-jitted, cached in force_models) ==================
+# J2_accel, drag_accel, srp_sun_accel and perturbed_accel are compiled once per
+# environment; case_accel switches them on per case without a closure. SRP
+# reads the Sun from a Chebyshev fit of the whole window (ephemeris.sun_table)
+# and dims it by the conical Earth shadow, all inside the compiled RHS.
+case_accel = get_rhs("case_accel")
 
 # ================== PROPAGATE ALL CASES ==================
-from poliastro.twobody.propagation import CowellPropagator
-
 cases = [
     ("Two-body", False, False, False),
     ("J2 only",  True,  False, False),
@@ -93,42 +52,135 @@ cases = [
     ("All forces",True, True,  True),
 ]
 
-results = []
-labels = []
-
-print("Propagating 24-hour non-Keplerian orbits...\n")
-
-for name, use_j2, use_drag, use_srp in cases:
-    def f(t0, u, k):
-        a_pert = np.zeros(3)
-        if use_j2:
-            a_pert += J2_accel(u[:3], k, Earth.R.to_value(u.km), Earth.J2.value)
-        if use_drag:
-            a_pert += drag_accel(u[:3], u[3:])
-        if use_srp:
-            a_pert += srp_accel(u[:3])
-        return func_twobody(t0, u, k) + np.hstack((np.zeros(3), a_pert))
-    
-    final = initial.propagate(tof, method=CowellPropagator(f=f), rtol=1e-10)
-    results.append(final)
-    labels.append(name)
-    print(f"{name:12} → periapsis: {final.periapsis.to(u.km):.1f}")
+# Tug vehicle: drag coefficient, area-to-mass ratio (m²/kg), SRP reflectivity
+VEHICLE = {"C_D": 2.2, "A_m": 0.015, "C_R": 1.5}
+
+def make_rhs(use_j2, use_drag, use_srp, C_D=VEHICLE["C_D"], A_m=VEHICLE["A_m"], C_R=VEHICLE["C_R"],
+             epoch=epoch, tof_h=24.0, shadow="conical"):
+    sun = ephemeris.sun_table(epoch.utc.jd, days=tof_h / 24.0 + 1.0)
+    coeffs, seg_s, model = sun.coeffs, sun.seg_s, ephemeris.SHADOW_MODELS[shadow]
+    def f(t0, u_, k):
+        return case_accel(t0, u_, k, use_j2, use_drag, use_srp, C_D, A_m, C_R, coeffs, seg_s, model)
+    return f
+
+def propagate_cases(initial=None, verbose=True, probe=None, tof_h=24.0, rtol=1e-10, vehicle=None,
+                    shadow="conical"):
+    """Propagate every force-model case for `tof_h` hours; return (final orbits, labels).
+
+    `shadow` is "conical" (umbra + penumbra), "cylindrical" or "none".
+    """
+    from poliastro.twobody.propagation import CowellPropagator
+
+    vehicle = {**VEHICLE, **(vehicle or {})}
+    if initial is None:
+        initial = initial_orbit()
+    results = []
+    labels = []
+
+    if verbose:
+        print("Propagating 24-hour non-Keplerian orbits...\n")
+
+    for name, use_j2, use_drag, use_srp in cases:
+        f = make_rhs(use_j2, use_drag, use_srp, **vehicle, epoch=initial.epoch, tof_h=tof_h, shadow=shadow)
+        if probe is not None:
+            f = probe.wrap_rhs(f, phase=name)
+        with section(probe, "solve"):
+            final = initial.propagate(tof_h * u.h, method=CowellPropagator(rtol=rtol, f=f))
+        results.append(final)
+        labels.append(name)
+        if verbose:
+            print(f"{name:12} → periapsis: {final.periapsis.to(u.km):.1f}")
+    return results, labels
+
+# ================== MONTHS-LONG DECAY (checkpointed) ==================
+def periapsis_state(alt_km=550.0, ecc=0.1, inc_deg=51.6):
+    """initial_orbit's state vector (km, km/s) without poliastro: at periapsis, RAAN = argp = 0."""
+    a = R_EARTH_KM + alt_km
+    r_p = a * (1 - ecc)
+    v_p = np.sqrt(MU_EARTH * (1 + ecc) / r_p)
+    i = np.radians(inc_deg)
+    return np.array([r_p, 0.0, 0.0, 0.0, v_p * np.cos(i), v_p * np.sin(i)])
+
+def decay(alt_km=550.0, ecc=0.0, inc_deg=51.6, days=90.0, case="All forces", vehicle=None,
+          epoch=epoch, shadow="conical", reentry_alt_km=120.0, rtol=1e-10, atol=1e-10,
+          checkpoint=None, checkpoint_every_s=60.0, probe=None):
+    """Fly one force-model case for `days` or down to `reentry_alt_km`, straight on case_accel.
+
+    propagate_cases leans on poliastro for a day; this runs for months with no poliastro at
+    all. With a `checkpoint` path the integrator state is saved there every
+    `checkpoint_every_s` of wall time, and a run started again with the same path and
+    settings carries on from it, bit for bit (see checkpoint.py and `resume_decay`).
+    Returns the solve_ivp-style solution, state in km and km/s.
+
+    It starts circular: initial_orbit's e = 0.1 puts its periapsis under the ground.
+    """
+    import checkpoint as ckpt
+
+    flags = {name: (j2, drag, srp) for name, j2, drag, srp in cases}
+    if case not in flags:
+        raise ValueError(f"case must be one of {sorted(flags)}, got {case!r}")
+    perigee_km = (R_EARTH_KM + alt_km) * (1 - ecc) - R_EARTH_KM
+    if perigee_km <= reentry_alt_km:
+        raise ValueError(f"periapsis {perigee_km:.1f} km starts below reentry_alt_km = {reentry_alt_km} km")
+    vehicle = {**VEHICLE, **(vehicle or {})}
+    epoch = Time(epoch, scale="utc")
+    f = make_rhs(*flags[case], **vehicle, epoch=epoch, tof_h=days * 24.0, shadow=shadow)
+
+    def rhs(t, y):
+        return f(t, y, MU_EARTH)
+
+    def reentry(t, y):
+        return np.linalg.norm(y[:3]) - R_EARTH_KM - reentry_alt_km
+    reentry.terminal = True
+
+    if probe is not None:
+        rhs = probe.wrap_rhs(rhs, phase=case)
+    settings = {"alt_km": alt_km, "ecc": ecc, "inc_deg": inc_deg, "days": days, "case": case,
+                "vehicle": vehicle, "epoch": epoch.isot, "shadow": shadow,
+                "reentry_alt_km": reentry_alt_km}
+    with section(probe, "solve"):
+        sol = ckpt.solve_ivp(rhs, (0.0, days * 86400.0), periapsis_state(alt_km, ecc, inc_deg),
+                             checkpoint, checkpoint_every_s, events=reentry, method="RK45",
+                             settings=settings, resume=True, rtol=rtol, atol=atol)
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+def resume_decay(path, probe=None, checkpoint_every_s=60.0):
+    """Carry on the decay saved in `path`, rebuilding the run from its settings."""
+    import checkpoint as ckpt
+    _, settings, _ = ckpt.load(path)
+    options = settings["options"]
+    return decay(settings["alt_km"], settings["ecc"], settings["inc_deg"], settings["days"],
+                 settings["case"], settings["vehicle"], settings["epoch"], settings["shadow"],
+                 settings["reentry_alt_km"], options["rtol"], options["atol"], path,
+                 checkpoint_every_s, probe)
 
 # ================== PLOT ==================
-peri_km = [orb.periapsis.to_value(u.km) for orb in results]
-
-plt.figure(figsize=(11, 6.5))
-bars = plt.bar(labels, peri_km, color=["#2E86AB", "#A23B72", "#F18F01", "#C73E1D"])
-plt.axhline(550, color="gray", linestyle="--", linewidth=2, label="Nominal circular")
-plt.ylabel("Periapsis altitude [km]", fontsize=14)
-plt.title("24-hour LEO Decay Demo — Drag Still Wins", fontsize=16, pad=20)
-plt.ylim(450, 620)
-
-for bar, alt in zip(bars, peri_km):
-    plt.text(bar.get_x() + bar.get_width()/2, alt + 8,
-            f"{alt - 550:+.1f} km", ha='center', fontsize=12, fontweight='bold')
-
-plt.legend(fontsize=12)
-plt.grid(True, axis='y', alpha=0.3)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+def plot(results, labels):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    peri_km = [orb.periapsis.to_value(u.km) for orb in results]
+
+    plt.figure(figsize=(11, 6.5))
+    bars = plt.bar(labels, peri_km, color=["#2E86AB", "#A23B72", "#F18F01", "#C73E1D"])
+    plt.axhline(550, color="gray", linestyle="--", linewidth=2, label="Nominal circular")
+    plt.ylabel("Periapsis altitude [km]", fontsize=14)
+    plt.title("24-hour LEO Decay Demo — Drag Still Wins", fontsize=16, pad=20)
+    plt.ylim(450, 620)
+
+    for bar, alt in zip(bars, peri_km):
+        plt.text(bar.get_x() + bar.get_width()/2, alt + 8,
+                f"{alt - 550:+.1f} km", ha='center', fontsize=12, fontweight='bold')
+
+    plt.legend(fontsize=12)
+    plt.grid(True, axis='y', alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    probe = from_env("orbit_tug")
+    results, labels = propagate_cases(probe=probe)
+    with section(probe, "plot"):
+        plot(results, labels)
+    finish(probe)
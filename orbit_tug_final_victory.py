@@ -2,83 +2,84 @@
 # This is your new gold standard. Push this. It works. Period.
 
 import numpy as np
-import matplotlib.pyplot as plt
 from astropy import units as u
 from astropy.time import Time
 from poliastro.bodies import Earth
 from poliastro.twobody import Orbit
-from poliastro.core.propagation import func_twobody
-from numba import njit
-R_EARTH_KM = Earth.R.to_value(u.km)   # ← scalar float, Numba loves this
-J2_VAL = Earth.J2.value               # ← scalar float
+from poliastro.twobody.propagation import CowellPropagator
+from force_models import get_rhs, j2_accel  # noqa: F401
+import frames
+import gravity
+from instrumentation import finish, from_env, section
 
 # ================== 1. EPOCH (the exact moment your orbit is defined) ==================
 epoch = Time("2025-12-13 00:00:00", scale="utc")
 
 # ================== 2. INITIAL ORBIT: 550 km circular → slightly eccentric ==================
-# Start with perfect circular orbit at 550 km
-circ = Orbit.circular(Earth, alt=550 * u.km, epoch=epoch)
-
-# Now make it slightly eccentric (e = 0.1) so drag can "bite" the periapsis
-initial = Orbit.from_classical(
-    attractor=Earth,
-    a=circ.a,
-    ecc=0.1 * u.one,
-    inc=51.6 * u.deg,        # ISS-like
-    raan=0 * u.deg,    # doesn't matter for this demo
-    argp=0 * u.deg,
-    nu=0 * u.deg,            # start at periapsis
-    epoch=epoch
-)
+def initial_orbit(alt_km=550.0, ecc=0.1, inc_deg=51.6, epoch=epoch):
+    # Start with perfect circular orbit at 550 km
+    circ = Orbit.circular(Earth, alt=alt_km * u.km, epoch=epoch)
 
-print("Initial orbit:")
-print(initial)
-print(f"Periapsis altitude: {(initial.r_p - Earth.R).to(u.km):.1f}")
-print(f"Apoapsis  altitude: {(initial.r_a - Earth.R).to(u.km):.1f}\n")
+    # Now make it slightly eccentric (e = 0.1) so drag can "bite" the periapsis
+    return Orbit.from_classical(
+        attractor=Earth,
+        a=circ.a,
+        ecc=ecc * u.one,
+        inc=inc_deg * u.deg,     # ISS-like
+        raan=0 * u.deg,    # doesn't matter for this demo
+        argp=0 * u.deg,
+        nu=0 * u.deg,            # start at periapsis
+        epoch=epoch
+    )
 
 # ================== 3. PURE VECTOR STATE (this is what Cowell loves) ==================
-r0 = initial.r.to_value(u.km)           # km
-v0 = initial.v.to_value(u.km / u.s)      # km/s
-state0 = np.hstack((r0, v0))
+def state_vector(orbit):
+    r0 = orbit.r.to_value(u.km)           # km
+    v0 = orbit.v.to_value(u.km / u.s)      # km/s
+    return np.hstack((r0, v0))
 
 # ================== 4. NON-KEPLERIAN ACCELERATION (J2 + simple drag) ==================
-@njit
-def j2_accel(r_vec, k):
-    r = np.linalg.norm(r_vec)
-    z2 = r_vec[2]**2
-    factor = -1.5 * J2_VAL * k * R_EARTH_KM**2 / r**5
-    return factor * np.array([
-        r_vec[0] * (5 * z2 / r**2 - 1),
-        r_vec[1] * (5 * z2 / r**2 - 1),
-        r_vec[2] * (5 * z2 / r**2 - 3)
-    ])
+# Compiled once per environment in force_models (AOT build if present, else cached JIT)
+full_accel = get_rhs("full_accel")
+full_accel_field = get_rhs("full_accel_field")
+
+def make_rhs(gravity_file=None, gravity_degree=None, epoch=epoch):
+    """J2 + drag by default; with a coefficient file, the full field to `gravity_degree` instead of J2."""
+    if gravity_file is None:
+        return full_accel
+    field = gravity.load(gravity_file, gravity_degree)
+    theta0 = frames.earth_rotation_angle(frames.julian_date(epoch.datetime))
+    C, S, R_eq, n_max = field.C, field.S, field.radius, field.n_max
 
-@njit
-def full_accel(t0, u, k):
-    r = u[:3]
-    v = u[3:]
-    
-    # Start with pure two-body
-    acc = func_twobody(t0, u, k)[3:]  # extract dv/dt
-    
-    # Add perturbations
-    acc += j2_accel(r, k)
-    h = np.linalg.norm(r) - R_EARTH_KM
-    if 0 < h < 1000:
-        rho = 2.5e-12 * np.exp(-h / 60)
-        acc += -1e-6 * rho * np.linalg.norm(v) * v  
-        
-    return np.hstack((v, acc))  # velocity + total acceleration
+    def f(t0, u_, k):
+        return full_accel_field(t0, u_, k, C, S, R_eq, n_max, theta0)
+    return f
 
 # ================== 5. PROPAGATE 24 HOURS — NO rtol, NO atol, NO DRAMA ==================
-from poliastro.twobody.propagation import CowellPropagator
+def propagate_24h(initial=None, probe=None, tof_h=24.0, gravity_file=None, gravity_degree=None):
+    if initial is None:
+        initial = initial_orbit()
+    f = make_rhs(gravity_file, gravity_degree, initial.epoch)
+    if probe is not None:
+        f = probe.wrap_rhs(f, phase="J2 + drag" if gravity_file is None else "field + drag")
+    with section(probe, "solve"):
+        return initial.propagate(
+            tof_h * u.h,
+            method=CowellPropagator(f=f)
+        )
+
+if __name__ == "__main__":
+    initial = initial_orbit()
+    print("Initial orbit:")
+    print(initial)
+    print(f"Periapsis altitude: {(initial.r_p - Earth.R).to(u.km):.1f}")
+    print(f"Apoapsis  altitude: {(initial.r_a - Earth.R).to(u.km):.1f}\n")
 
-final = initial.propagate(
-    24 * u.h,
-    method=CowellPropagator(f=full_accel)
-)
+    probe = from_env("orbit_tug_final_victory")
+    final = propagate_24h(initial, probe)
 
-print("After 24 hours with J2 + drag:")
-print(final)
-print(f"Periapsis altitude: {(final.r_p - Earth.R).to(u.km):.1f}")
-print(f"Decay: {(final.r_p - initial.r_p).to(u.km):+.1f}")
\ No newline at end of file
+    print("After 24 hours with J2 + drag:")
+    print(final)
+    print(f"Periapsis altitude: {(final.r_p - Earth.R).to(u.km):.1f}")
+    print(f"Decay: {(final.r_p - initial.r_p).to(u.km):+.1f}")
+    finish(probe)
@@ -0,0 +1,327 @@
+# orbit_tug_low_thrust.py — Weeks of Spiral in Seconds (Dec 2025)
+# The tug doesn't just decay. It climbs, a few metres per orbit, for weeks.
+#
+# Orbit-averaged Gauss variational equations in modified equinoctial elements
+# (p, f, g, h, k): the slow elements change by a hair per revolution, so their
+# orbit-averaged rates (one quadrature over true longitude L, thrust + J2 +
+# Earth shadow at every node) can be stepped several revolutions at a time.
+# The last few revolutions are flown again with full Cowell (same steering,
+# same forces) from the averaged state, to check the averaged answer.
+#
+#     result = transfer(alt0_km=550, target_alt_km=1200, days=60)
+#     print(summary(result))
+#
+# No poliastro, no astropy: kernels are @njit, Cowell is scipy's DOP853.
+
+import time
+
+import numpy as np
+from numba import njit
+from scipy.integrate import solve_ivp
+
+import ephemeris
+from force_models import MU_EARTH, R_EARTH_KM, j2_accel
+
+G0 = 9.80665                                    # m/s², for Isp
+EPOCH_JD = 2461022.5                            # 2025-12-13 00:00 UTC, as in orbit_tug.py
+N_NODES = 64                                    # quadrature nodes per revolution (L uniform)
+
+# Hall-thruster tug: thrust (N), specific impulse (s), wet and dry mass (kg)
+VEHICLE = {"thrust_N": 0.25, "isp_s": 1600.0, "mass_kg": 800.0, "dry_mass_kg": 650.0}
+
+
+# ================== ELEMENT CONVERSIONS ==================
+@njit(cache=True)
+def equinoctial_to_rv(p, f, g, h, k, L, mu):
+    """Modified equinoctial elements → ECI position (km) and velocity (km/s)."""
+    cL, sL = np.cos(L), np.sin(L)
+    alpha2 = h * h - k * k
+    s2 = 1.0 + h * h + k * k
+    w = 1.0 + f * cL + g * sL
+    r_mag = p / w
+    sq = np.sqrt(mu / p)
+    r = np.empty(3)
+    v = np.empty(3)
+    r[0] = r_mag / s2 * (cL + alpha2 * cL + 2 * h * k * sL)
+    r[1] = r_mag / s2 * (sL - alpha2 * sL + 2 * h * k * cL)
+    r[2] = 2 * r_mag / s2 * (h * sL - k * cL)
+    v[0] = -sq / s2 * (sL + alpha2 * sL - 2 * h * k * cL + g - 2 * f * h * k + alpha2 * g)
+    v[1] = -sq / s2 * (-cL + alpha2 * cL + 2 * h * k * sL - f + 2 * g * h * k + alpha2 * f)
+    v[2] = 2 * sq / s2 * (h * cL + k * sL + f * h + g * k)
+    return r, v
+
+
+@njit(cache=True)
+def rv_to_equinoctial(r, v, mu):
+    """ECI state → (p, f, g, h, k, L) (prograde set: singular only for i = 180°)."""
+    hv = np.cross(r, v)
+    h_norm = np.linalg.norm(hv)
+    p = h_norm * h_norm / mu
+    w_hat = hv / h_norm
+    h = -w_hat[1] / (1.0 + w_hat[2])
+    k = w_hat[0] / (1.0 + w_hat[2])
+    e_vec = np.cross(v, hv) / mu - r / np.linalg.norm(r)
+    s2 = 1.0 + h * h + k * k
+    f_hat = np.array([1.0 - k * k + h * h, 2 * h * k, -2 * k]) / s2
+    g_hat = np.array([2 * h * k, 1.0 + k * k - h * h, 2 * h]) / s2
+    f = np.dot(e_vec, f_hat)
+    g = np.dot(e_vec, g_hat)
+    L = np.arctan2(np.dot(r, g_hat), np.dot(r, f_hat))
+    return p, f, g, h, k, L
+
+
+def classical(p, f, g, h, k, mu=MU_EARTH):
+    """(a km, e, i deg, Ω deg) from equinoctial elements — numpy, for reports."""
+    e = np.hypot(f, g)
+    return p / (1.0 - e * e), e, np.degrees(2.0 * np.arctan(np.hypot(h, k))), np.degrees(np.arctan2(k, h))
+
+
+# ================== FORCES IN RTN ==================
+@njit(cache=True)
+def perturbation_rtn(t, p, f, g, h, k, L, mass, mu, thrust_N, a_target, i_target, yaw,
+                     use_j2, sun, sun_seg_s, shadow):
+    """Radial / transverse / normal acceleration (km/s²) and the thrust duty (0 … 1) at one point.
+
+    Steering: along the velocity while a < a_target, plus a yaw of ±`yaw` out of plane
+    (sign flipped with cos u, the Edelbaum switch) while i is short of i_target. Thrust
+    is scaled by the visible fraction of the Sun — an electric tug coasts in eclipse.
+    """
+    r, v = equinoctial_to_rv(p, f, g, h, k, L, mu)
+    r_hat = r / np.linalg.norm(r)
+    n_hat = np.cross(r, v)
+    n_hat /= np.linalg.norm(n_hat)
+    t_hat = np.cross(n_hat, r_hat)
+    out = np.zeros(3)
+    if use_j2:
+        a = j2_accel(r, mu)
+        out[0], out[1], out[2] = np.dot(a, r_hat), np.dot(a, t_hat), np.dot(a, n_hat)
+
+    e2 = f * f + g * g
+    raise_a = p / (1.0 - e2) < a_target
+    inc = 2.0 * np.arctan(np.sqrt(h * h + k * k))
+    turn = abs(inc - i_target) > 1e-4 and yaw > 0.0
+    if thrust_N <= 0.0 or not (raise_a or turn):
+        return out, 0.0
+    duty = ephemeris.shadow_fraction(r, ephemeris.chebyshev_position(t, sun, sun_seg_s), shadow)
+    if duty == 0.0:
+        return out, 0.0
+    acc = duty * thrust_N / mass / 1000.0                                # N/kg → km/s²
+    u_lat = L - np.arctan2(k, h)
+    beta = 0.0
+    if turn:
+        beta = yaw if raise_a else 0.5 * np.pi
+        beta *= np.sign(np.cos(u_lat)) * np.sign(i_target - inc)
+    in_plane = np.cos(beta) if raise_a else 0.0
+    v_r, v_t = np.dot(v, r_hat), np.dot(v, t_hat)
+    v_n = np.sqrt(v_r * v_r + v_t * v_t)
+    out[0] += acc * in_plane * v_r / v_n
+    out[1] += acc * in_plane * v_t / v_n
+    out[2] += acc * np.sin(beta)
+    return out, duty
+
+
+@njit(cache=True)
+def gauss_rates(p, f, g, h, k, L, a_rtn, mu):
+    """Gauss variational equations for modified equinoctial elements: d(p, f, g, h, k, L)/dt."""
+    cL, sL = np.cos(L), np.sin(L)
+    w = 1.0 + f * cL + g * sL
+    s2 = 1.0 + h * h + k * k
+    q = np.sqrt(p / mu)
+    ar, at, an = a_rtn[0], a_rtn[1], a_rtn[2]
+    hk = h * sL - k * cL
+    out = np.empty(6)
+    out[0] = 2.0 * p / w * q * at
+    out[1] = q * (ar * sL + ((w + 1.0) * cL + f) / w * at - hk * g / w * an)
+    out[2] = q * (-ar * cL + ((w + 1.0) * sL + g) / w * at + hk * f / w * an)
+    out[3] = q * s2 * cL / (2.0 * w) * an
+    out[4] = q * s2 * sL / (2.0 * w) * an
+    out[5] = np.sqrt(mu * p) * (w / p) ** 2 + q * hk / w * an
+    return out
+
+
+# ================== ORBIT-AVERAGED PROPAGATOR ==================
+@njit(cache=True)
+def averaged_rates(t, x, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw, use_j2,
+                   sun, sun_seg_s, shadow):
+    """d/dt of x = (p, f, g, h, k, mass, λ) averaged over one revolution (time-weighted in L)."""
+    p, f, g, h, k, mass = x[0], x[1], x[2], x[3], x[4], x[5]
+    thrust = thrust_N if mass > dry_mass else 0.0
+    rates = np.zeros(7)
+    weight = 0.0
+    for j in range(N_NODES):
+        L = 2.0 * np.pi * j / N_NODES
+        w = 1.0 + f * np.cos(L) + g * np.sin(L)
+        dt_dL = 1.0 / (np.sqrt(mu * p) * (w / p) ** 2)
+        a_rtn, duty = perturbation_rtn(t, p, f, g, h, k, L, mass, mu, thrust, a_target, i_target, yaw,
+                                       use_j2, sun, sun_seg_s, shadow)
+        d = gauss_rates(p, f, g, h, k, L, a_rtn, mu)
+        rates[:5] += d[:5] * dt_dL
+        rates[5] -= mdot * duty * dt_dL
+        weight += dt_dL
+    rates[:6] /= weight
+    a = p / (1.0 - f * f - g * g)
+    rates[6] = np.sqrt(mu / a ** 3)                                       # mean longitude
+    return rates
+
+
+@njit(cache=True)
+def averaged_step(t, x, dt, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw, use_j2,
+                  sun, sun_seg_s, shadow):
+    """One RK4 step of the averaged equations."""
+    k1 = averaged_rates(t, x, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw, use_j2, sun, sun_seg_s, shadow)
+    k2 = averaged_rates(t + 0.5 * dt, x + 0.5 * dt * k1, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw,
+                        use_j2, sun, sun_seg_s, shadow)
+    k3 = averaged_rates(t + 0.5 * dt, x + 0.5 * dt * k2, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw,
+                        use_j2, sun, sun_seg_s, shadow)
+    k4 = averaged_rates(t + dt, x + dt * k3, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw,
+                        use_j2, sun, sun_seg_s, shadow)
+    return x + dt / 6.0 * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+
+def _true_longitude(x):
+    """L from the mean longitude λ of an averaged state (Kepler's equation by Newton)."""
+    f, g, lam = x[1], x[2], x[6]
+    e, varpi = np.hypot(f, g), np.arctan2(g, f)
+    M = (lam - varpi) % (2 * np.pi)
+    E = M if e < 0.8 else np.pi
+    for _ in range(30):
+        E -= (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+    nu = 2.0 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+    return varpi + nu
+
+
+# ================== COWELL (VERIFICATION) ==================
+@njit(cache=True)
+def cowell_rhs(t, y, mu, thrust_N, mdot, dry_mass, a_target, i_target, yaw, use_j2, sun, sun_seg_s, shadow):
+    """Full Cartesian dynamics (r, v, mass) with the same forces and steering as the averaged model."""
+    r, v, mass = y[:3], y[3:6], y[6]
+    p, f, g, h, k, L = rv_to_equinoctial(r, v, mu)
+    thrust = thrust_N if mass > dry_mass else 0.0
+    a_rtn, duty = perturbation_rtn(t, p, f, g, h, k, L, mass, mu, thrust, a_target, i_target, yaw,
+                                   use_j2, sun, sun_seg_s, shadow)
+    r_hat = r / np.linalg.norm(r)
+    n_hat = np.cross(r, v)
+    n_hat /= np.linalg.norm(n_hat)
+    t_hat = np.cross(n_hat, r_hat)
+    du = np.empty(7)
+    du[:3] = v
+    du[3:6] = -mu * r / np.linalg.norm(r) ** 3 + a_rtn[0] * r_hat + a_rtn[1] * t_hat + a_rtn[2] * n_hat
+    du[6] = -mdot * duty
+    return du
+
+
+# ================== TRANSFER ==================
+def transfer(alt0_km=550.0, inc0_deg=51.6, target_alt_km=1200.0, target_inc_deg=None, days=30.0,
+             vehicle=None, yaw_deg=30.0, use_j2=True, shadow="conical", revs_per_step=4.0,
+             cowell_revs=3.0, epoch_jd=EPOCH_JD, rtol=1e-10):
+    """Spiral from a circular orbit for `days`: averaged to the last `cowell_revs`, then both ways.
+
+    Returns a dict with the averaged history (t_s, a_km, e, inc_deg, mass_kg), the final
+    averaged elements, the Cowell ones (osculating at the end and averaged over its last
+    revolution), the averaged elements at the middle of that revolution, and wall-clock
+    timings. A mean over the last revolution lags t_end by half a revolution of climb, so
+    it is checked against `averaged_mid_rev`, not `averaged_final`. Cowell starts from the
+    averaged elements taken as osculating, so with J2 on its mean also carries the J2
+    short-period offset.
+    """
+    tug = {**VEHICLE, **(vehicle or {})}
+    mu = MU_EARTH
+    thrust, dry = tug["thrust_N"], tug["dry_mass_kg"]
+    mdot = thrust / (tug["isp_s"] * G0)                                   # kg/s
+    a_target = R_EARTH_KM + target_alt_km
+    i_target = np.radians(inc0_deg if target_inc_deg is None else target_inc_deg)
+    yaw = np.radians(yaw_deg) if target_inc_deg is not None else 0.0
+    sun = ephemeris.sun_table(epoch_jd, days + 1.0)
+    model = ephemeris.SHADOW_MODELS[shadow]
+    args = (mu, thrust, mdot, dry, a_target, i_target, yaw, use_j2, sun.coeffs, sun.seg_s, model)
+
+    p0 = R_EARTH_KM + alt0_km
+    x = np.array([p0, 0.0, 0.0, np.tan(np.radians(inc0_deg) / 2), 0.0, tug["mass_kg"], 0.0])
+    t_end = days * 86400.0
+    t_cowell = max(t_end - cowell_revs * 2 * np.pi * np.sqrt((a_target if thrust > 0 else p0) ** 3 / mu), 0.0)
+
+    wall = time.perf_counter()
+    t, history = 0.0, [(0.0, *x)]
+    switch = None
+    while t < t_end - 1e-6:
+        a = x[0] / (1.0 - x[1] ** 2 - x[2] ** 2)
+        dt = min(revs_per_step * 2 * np.pi * np.sqrt(a ** 3 / mu), t_end - t)
+        if switch is None and t + dt > t_cowell:
+            dt = t_cowell - t if t_cowell > t else dt
+        x = averaged_step(t, x, dt, *args)
+        t += dt
+        history.append((t, *x))
+        if switch is None and t >= t_cowell - 1e-6:
+            switch = (t, x.copy())
+    averaged_s = time.perf_counter() - wall
+
+    t_sw, x_sw = switch
+    r0, v0 = equinoctial_to_rv(*x_sw[:5], _true_longitude(x_sw), mu)
+    wall = time.perf_counter()
+    sol = solve_ivp(cowell_rhs, (t_sw, t_end), np.concatenate([r0, v0, [x_sw[5]]]), method="DOP853",
+                    rtol=rtol, atol=1e-9, args=args, dense_output=True)
+    cowell_s = time.perf_counter() - wall
+    # Osculating elements swing with J2 every revolution; compare their mean over the last one
+    # with the averaged state at that revolution's midpoint
+    period = 2 * np.pi * np.sqrt(x[0] ** 3 / mu)
+    t_lo = max(t_end - period, t_sw)
+    samples = sol.sol(np.linspace(t_lo, t_end, 96, endpoint=False))
+    osc = np.array([classical(*rv_to_equinoctial(samples[:3, i], samples[3:6, i], mu)[:5])
+                    for i in range(samples.shape[1])])
+    t_mid = 0.5 * (t_lo + t_end)
+    hist = np.array(history)
+    i_mid = np.searchsorted(hist[:, 0], t_mid, side="right") - 1
+    x_mid = averaged_step(hist[i_mid, 0], hist[i_mid, 1:], t_mid - hist[i_mid, 0], *args)
+
+    a_h, e_h, i_h, _ = classical(*hist[:, 1:6].T)
+    y_end = sol.y[:, -1]
+    return {
+        "t_s": hist[:, 0], "a_km": a_h, "e": e_h, "inc_deg": i_h, "mass_kg": hist[:, 6],
+        "averaged_final": classical(*x[:5]) + (x[5],),
+        "cowell_final": classical(*rv_to_equinoctial(y_end[:3], y_end[3:6], mu)[:5]) + (y_end[6],),
+        "cowell_last_rev_mean": tuple(osc.mean(axis=0)) + (float(samples[6].mean()),),
+        "averaged_mid_rev": classical(*x_mid[:5]) + (x_mid[5],), "mid_rev_s": t_mid,
+        "cowell_start_s": t_sw, "cowell_nfev": sol.nfev, "cowell_status": sol.status,
+        "averaged_steps": len(history) - 1, "averaged_wall_s": averaged_s, "cowell_wall_s": cowell_s,
+        "revolutions": float(x[6] / (2 * np.pi)),
+    }
+
+
+def summary(result):
+    (a_av, e_av, i_av, _, m_av), (a_cw, e_cw, i_cw, _, m_cw) = result["averaged_mid_rev"], result["cowell_last_rev_mean"]
+    a_end, a_cw_end = result["averaged_final"][0], result["cowell_final"][0]
+    days = result["t_s"][-1] / 86400.0
+    return "\n".join([
+        f"{days:.1f} days, {result['revolutions']:.0f} revolutions: {result['averaged_steps']} averaged steps "
+        f"in {result['averaged_wall_s']:.2f} s, last {(result['t_s'][-1] - result['cowell_start_s']) / 3600:.1f} h "
+        f"re-flown by Cowell ({result['cowell_nfev']} RHS calls, {result['cowell_wall_s']:.2f} s)",
+        "  over the last revolution (averaged at its middle, Cowell's mean):",
+        f"  averaged: a − R = {a_av - R_EARTH_KM:8.2f} km  e = {e_av:.5f}  i = {i_av:.4f}°  m = {m_av:.2f} kg",
+        f"  Cowell:   a − R = {a_cw - R_EARTH_KM:8.2f} km  e = {e_cw:.5f}  i = {i_cw:.4f}°  m = {m_cw:.2f} kg",
+        f"  at the end: averaged a − R = {a_end - R_EARTH_KM:.2f} km, Cowell osculating {a_cw_end - R_EARTH_KM:.2f} km",
+    ])
+
+
+def plot(result):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
+    days = result["t_s"] / 86400.0
+    axes[0].plot(days, result["a_km"] - R_EARTH_KM, color="#2E86AB")
+    axes[0].set_ylabel("Mean altitude [km]")
+    axes[1].plot(days, result["inc_deg"], color="#A23B72")
+    axes[1].set_ylabel("Inclination [°]")
+    axes[2].plot(days, result["mass_kg"], color="#F18F01")
+    axes[2].set_ylabel("Mass [kg]")
+    axes[2].set_xlabel("Days")
+    axes[0].set_title("Low-thrust tug spiral — orbit-averaged Gauss VOP")
+    for ax in axes:
+        ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    result = transfer(alt0_km=550.0, target_alt_km=1200.0, target_inc_deg=53.0, days=60.0)
+    print(summary(result))
+    plot(result)
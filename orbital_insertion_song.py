@@ -8,7 +8,7 @@ import numpy as np
 from scipy.integrate import solve_ivp
 import pymsis
 from datetime import datetime
-import matplotlib.pyplot as plt
+from instrumentation import finish, from_env, section
 
 class OrbitalInsertionSong:
     def __init__(self):
@@ -17,7 +17,7 @@ class OrbitalInsertionSong:
         self.m_dry_booster = 85_000
         self.m_prop_ship = 1_200_000
         self.m_prop_booster = 3_800_000
-        self.m_total = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+        self._update_mass()
 
         self.thrust_booster = 33 * 2.3e6   # N (sea-level Raptors)
         self.thrust_ship = 9 * 2.6e6       # N (vacuum Raptors)
@@ -28,6 +28,9 @@ class OrbitalInsertionSong:
         print("33 Raptors ignite. The Earth exhales.")
         print("She rises on a column of fire and whale song.\n")
 
+    def _update_mass(self):
+        self.m_total = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+
     def get_gravity(self, alt_km):
         return self.g0 * (6371 / (6371 + alt_km))**2
 
@@ -50,28 +53,49 @@ class OrbitalInsertionSong:
 
         return [v, a_thrust + a_gravity, dm_dt]
 
-print("Launching the poem…")
-song = OrbitalInsertionSong()
-sol = solve_ivp(
-    song.derivatives_ascent,
-    t_span=(0, 600),
-    y0=[0, 0, song.m_total],
-    method='RK45',
-    events=lambda t, y: y[0] - 300_000,  # 300 km
-    rtol=1e-8
-)
-
-print(f"\nORBIT ACHIEVED at t = {sol.t_events[0][0]:.1f} s")
-print(f"Altitude: {sol.y_events[0][0,0]/1000:.1f} km")
-print("Fairing opens. Starlinks bloom like dandelion seeds.")
-print("The whale watches from below and smiles.\n")
-print("Coasting… deploying… preparing to fall home.")
-print("Deorbit burn in 90 minutes. Tower is reaching.\n")
-
-# Plot the ascent
-plt.figure(figsize=(10, 6))
-plt.plot(sol.t, sol.y[0]/1000, 'gold', lw=3)
-plt.title("OrbitalInsertionSong – From Pad to 300 km in Fire and Grace")
-plt.xlabel("Time (s)"); plt.ylabel("Altitude (km)")
-plt.grid(alpha=0.3)
-plt.show()
\ No newline at end of file
+def simulate(song=None, probe=None, t_span=(0, 600), target_alt=300_000, rtol=1e-8):
+    """Climb from the pad to 300 km and return the solve_ivp solution."""
+    if song is None:
+        song = OrbitalInsertionSong()
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "solve"):
+        sol = solve_ivp(
+            song.derivatives_ascent,
+            t_span=t_span,
+            y0=[0, 0, song.m_total],
+            method='RK45',
+            events=lambda t, y: y[0] - target_alt,  # 300 km
+            rtol=rtol
+        )
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+def plot(sol):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    # Plot the ascent
+    plt.figure(figsize=(10, 6))
+    plt.plot(sol.t, sol.y[0]/1000, 'gold', lw=3)
+    plt.title("OrbitalInsertionSong – From Pad to 300 km in Fire and Grace")
+    plt.xlabel("Time (s)"); plt.ylabel("Altitude (km)")
+    plt.grid(alpha=0.3)
+    plt.show()
+
+if __name__ == "__main__":
+    print("Launching the poem…")
+    song = OrbitalInsertionSong()
+    probe = from_env("insertion")
+    sol = simulate(song, probe)
+
+    print(f"\nORBIT ACHIEVED at t = {sol.t_events[0][0]:.1f} s")
+    print(f"Altitude: {sol.y_events[0][0,0]/1000:.1f} km")
+    print("Fairing opens. Starlinks bloom like dandelion seeds.")
+    print("The whale watches from below and smiles.\n")
+    print("Coasting… deploying… preparing to fall home.")
+    print("Deorbit burn in 90 minutes. Tower is reaching.\n")
+
+    with section(probe, "plot"):
+        plot(sol)
+    finish(probe)
@@ -6,8 +6,9 @@ Drag now bites. Max Q ~1.8 g. Orbit earned, not gifted.
 import numpy as np
 from scipy.integrate import solve_ivp
 import pymsis
+import space_weather as sw
 from datetime import datetime
-import matplotlib.pyplot as plt
+from instrumentation import finish, from_env, section
 
 class OrbitalInsertionSong:
     def __init__(self):
@@ -15,7 +16,7 @@ class OrbitalInsertionSong:
         self.m_dry_booster = 85_000
         self.m_prop_ship = 1_200_000
         self.m_prop_booster = 3_800_000
-        self.m_total = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+        self._update_mass()
 
         self.thrust_booster = 33 * 2.30e6
         self.thrust_ship = 9 * 2.63e6
@@ -25,14 +26,25 @@ class OrbitalInsertionSong:
         self.A_stack = 9.0 * 70
         self.Cd_base = 0.25
 
+        # Launch site and day the atmosphere is sampled for
+        self.site_lon = -97.0
+        self.site_lat = 26.0
+        self.date = datetime(2025, 12, 25)
+        self.msis_version = 2.0
+        self.space_weather = None        # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
+
         print("33 Raptors ignite.")
         print("The atmosphere snarls. She smiles and leans in.\n")
 
+    def _update_mass(self):
+        self.m_total = self.m_dry_ship + self.m_dry_booster + self.m_prop_ship + self.m_prop_booster
+
     def get_density(self, alt_km: float) -> float:
         if alt_km > 150:
             return 0.0
-        data = pymsis.calculate(alts=alt_km, lons=-97.0, lats=26.0,
-                            dates=datetime(2025, 12, 25), version=2.0)
+        data = pymsis.calculate(alts=alt_km, lons=self.site_lon, lats=self.site_lat,
+                            dates=self.date, version=self.msis_version,
+                            **sw.msis_kwargs(self.space_weather, self.date))
         return float(data[0, 0])
 
     def get_gravity(self, alt_km):
@@ -71,33 +83,73 @@ class OrbitalInsertionSong:
 
         return [v_up, a_net, dm_dt]
 
-# ——— FIXED LAUNCH BLOCK ———
-print("Launching the TRUE poem — drag included…\n")
-song = OrbitalInsertionSong()
-
-sol = solve_ivp(
-    fun=song.derivatives,        # ← NOW USING THE REAL ONE
-    t_span=(0, 600),
-    y0=[0, 0, song.m_total],
-    method='RK45',
-    events=lambda t, y: y[0] - 300_000,
-    rtol=1e-8, atol=1e-8,
-    max_step=0.5
-)
-
-t_orbit = sol.t_events[0][0] if sol.t_events else sol.t[-1]
-alt_final = sol.y[0, -1] / 1000
-
-print(f"\nORBIT ACHIEVED at t = {t_orbit:.1f} seconds")
-print(f"Final altitude: {alt_final:.1f} km")
-print("She bled speed through Max Q. She bled prop through the sky.")
-print("And still — she kissed 300 km with grace.\n")
-print("The atmosphere lost. Again.\n")
-
-plt.figure(figsize=(12, 7))
-plt.plot(sol.t, sol.y[0]/1000, color='#FFAA00', lw=4, label="True Trajectory (with drag)")
-plt.axhline(300, color='cyan', ls='--', alpha=0.8, label="Target")
-plt.title("OrbitalInsertionSong v2 — She Fought the Sky and Won")
-plt.xlabel("Time (s)"); plt.ylabel("Altitude (km)")
-plt.legend(); plt.grid(alpha=0.3)
-plt.show()
\ No newline at end of file
+def simulate(song=None, probe=None, t_span=(0, 600), target_alt=300_000,
+             rtol=1e-8, atol=1e-8, max_step=0.5):
+    """Climb through Max Q to 300 km and return the solve_ivp solution."""
+    if song is None:
+        song = OrbitalInsertionSong()
+    song.space_weather = sw.resolve(song.space_weather)   # a file is read here once, not per RHS call
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "solve"):
+        sol = solve_ivp(
+            fun=song.derivatives,        # ← NOW USING THE REAL ONE
+            t_span=t_span,
+            y0=[0, 0, song.m_total],
+            method='RK45',
+            events=lambda t, y: y[0] - target_alt,
+            rtol=rtol, atol=atol,
+            max_step=max_step
+        )
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+def simulate_3dof(song=None, probe=None, t_span=(0, 1200), target_alt=300_000, dt_fine=0.1):
+    """The same climb through planar3dof, flown sideways over a turning Earth: a gravity turn
+    to a `target_alt` apoapsis, then a circularization burn there (done by about 1,000 s)."""
+    import planar3dof
+
+    if song is None:
+        song = OrbitalInsertionSong()
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "density_table"):
+        table = planar3dof.site_table(song, t_span[1])
+    P = planar3dof.params(song, orbit_alt=target_alt)
+    with section(probe, "solve"):
+        sol = planar3dof.fly(P, table, t_span[1], song.m_total, target_alt=target_alt, dt_fine=dt_fine)
+    if probe is not None:
+        probe.record_solution(sol, "RK4-3DOF")
+    return sol
+
+def plot(sol):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    plt.figure(figsize=(12, 7))
+    plt.plot(sol.t, sol.y[0]/1000, color='#FFAA00', lw=4, label="True Trajectory (with drag)")
+    plt.axhline(300, color='cyan', ls='--', alpha=0.8, label="Target")
+    plt.title("OrbitalInsertionSong v2 — She Fought the Sky and Won")
+    plt.xlabel("Time (s)"); plt.ylabel("Altitude (km)")
+    plt.legend(); plt.grid(alpha=0.3)
+    plt.show()
+
+if __name__ == "__main__":
+    # ——— FIXED LAUNCH BLOCK ———
+    print("Launching the TRUE poem — drag included…\n")
+    song = OrbitalInsertionSong()
+    probe = from_env("insertion_v2")
+    sol = simulate(song, probe)
+
+    t_orbit = sol.t_events[0][0] if sol.t_events else sol.t[-1]
+    alt_final = sol.y[0, -1] / 1000
+
+    print(f"\nORBIT ACHIEVED at t = {t_orbit:.1f} seconds")
+    print(f"Final altitude: {alt_final:.1f} km")
+    print("She bled speed through Max Q. She bled prop through the sky.")
+    print("And still — she kissed 300 km with grace.\n")
+    print("The atmosphere lost. Again.\n")
+
+    with section(probe, "plot"):
+        plot(sol)
+    finish(probe)
@@ -9,14 +9,27 @@ Because every satellite deserves to be guided to its ocean grave with love.
 
 import numpy as np
 from scipy.integrate import solve_ivp
-from datetime import datetime
+from datetime import datetime, timedelta
 import pymsis                                    # ← correct import
+import space_weather as sw
+import frames
+from atmosphere import DensityTable
+from instrumentation import finish, from_env, section
 # pylint: disable=unused-argument
 # pyright: reportUnknownMemberType=false
 # type: ignore
+MU_EARTH = 398600.4418                           # km³/s²
+R_EARTH_KM = 6378.1
+# Density-table grid for decay runs: MSIS varies slowly across the globe, quickly with height
+TABLE_STEP_KM = 4.0
+TABLE_STEP_LAT_DEG = 10.0
+TABLE_STEP_LON_DEG = 30.0
+
 class PacificWhaleSong:
     """One sprite. One song. One perfect Pacific goodbye."""
 
+    ATTITUDE_AREAS = {"belly": 13.5, "edge": 1.8, "sail": 22.0}     # m² drag area per deorbit attitude
+
     def __init__(self):
         self.name = "PacificWhaleSong"
         self.mass = 260.0                  # kg
@@ -24,6 +37,13 @@ class PacificWhaleSong:
         self.area_drag = 13.5              # m² — default belly broadside
         self.attitude_mode = "belly"
 
+        # Where the sky is sampled when no position is given — Point Nemo, her ocean grave
+        self.site_lon = -140.0
+        self.site_lat = 0.0
+        self.msis_version = 2.0            # ← the winner, the softest landing
+        self.space_weather = None          # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
+        self.density_table = None          # DensityTable: when set, the sky is read from it, not MSIS
+
         self._update_ballistic_coeff()
         self.report()
 
@@ -31,47 +51,51 @@ class PacificWhaleSong:
         self.ballistic_coeff = self.mass / (self.cd * self.area_drag)
 
     def set_deorbit_attitude(self, mode: str = "belly"):
-        if mode == "belly":
-            self.area_drag = 13.5
-            self.attitude_mode = "belly"
-        elif mode == "edge":
-            self.area_drag = 1.8
-            self.attitude_mode = "edge"
-        elif mode == "sail":
-            self.area_drag = 22.0
-            self.attitude_mode = "sail"
-        else:
+        if mode not in self.ATTITUDE_AREAS:
             raise ValueError("Mode must be 'belly', 'edge', or 'sail'")
+        self.area_drag = self.ATTITUDE_AREAS[mode]
+        self.attitude_mode = mode
 
         self._update_ballistic_coeff()
         print(f"→ Attitude changed to: {self.attitude_mode.upper()}")
 
-    def get_atm_density(self, alt_km: float, dt: datetime = None) -> float:
+    def get_atm_density(self, alt_km: float, dt: datetime = None,
+                        lat: float = None, lon: float = None) -> float:
         """Return the gentlest possible breath of sky for PacificWhaleSong."""
         if dt is None:
             dt = datetime.utcnow()
+        lat = self.site_lat if lat is None else lat
+        lon = self.site_lon if lon is None else lon
+        if self.density_table is not None:
+            return self.density_table.density((dt - self.density_table.epoch).total_seconds(), alt_km, lat, lon)
 
         data = pymsis.calculate(
             alts=alt_km,
-            lons=-140.0,      # Point Nemo
-            lats=0.0,
+            lons=lon,
+            lats=lat,
             dates=dt,
-            version=2.0              # ← the winner, the softest landing
+            version=self.msis_version,
+            **sw.msis_kwargs(self.space_weather, dt)
         )
         return float(data[0, 0])
     
     def drag_acceleration(self, r_eci_km: np.ndarray, v_eci_km_s: np.ndarray, dt: datetime = None):
-        alt_km = np.linalg.norm(r_eci_km) - 6378.1
+        """Drag from the sky directly beneath her, felt against the air turning with the Earth."""
+        if dt is None:
+            dt = datetime.utcnow()
+        r_eci_km = np.asarray(r_eci_km, dtype=float)
+        lat, lon, alt_km = frames.eci_to_geodetic(r_eci_km, frames.julian_date(dt))
         if alt_km > 1000 or alt_km < 0:
             return np.zeros(3)
 
-        density = self.get_atm_density(alt_km, dt)
-        v_rel = np.linalg.norm(v_eci_km_s)
+        density = self.get_atm_density(alt_km, dt, lat, lon)
+        v_rel_vec = frames.relative_velocity(r_eci_km, np.asarray(v_eci_km_s, dtype=float))
+        v_rel = np.linalg.norm(v_rel_vec)
         if v_rel < 0.001:
             return np.zeros(3)
 
-        drag_mag = 0.5 * density * v_rel**2 * self.cd * self.area_drag
-        return -(drag_mag / self.mass) * (v_eci_km_s / v_rel)
+        drag_mag = 0.5 * density * (v_rel * 1000)**2 * self.cd * self.area_drag   # N
+        return -(drag_mag / self.mass / 1000) * (v_rel_vec / v_rel)                # km/s²
 
     def report(self):
         print(f"Whale {self.name} has entered the simulation Whale")
@@ -80,8 +104,117 @@ class PacificWhaleSong:
         print(f"Ballistic coefficient: {self.ballistic_coeff:.1f} kg/m²\n")
 
 
+def simulate(pws=None, probe=None, alt_km=400.0, inc_deg=51.6, days=1.0,
+             epoch=datetime(2025, 11, 25), reentry_alt_km=120.0, rtol=1e-9, atol=1e-9,
+             use_table=True, checkpoint=None, checkpoint_every_s=60.0):
+    """Let her decay from a circular orbit (two-body + MSIS drag) until `days` pass or she
+    reaches `reentry_alt_km`. Returns the solve_ivp solution, state in km and km/s.
+
+    Drag is sampled at her true sub-satellite point. With `use_table` that sky is tabulated
+    once for the whole run over every latitude her inclination reaches (one MSIS call,
+    indices from `pws.space_weather`) instead of asked again at every RHS evaluation.
+
+    With a `checkpoint` path the integrator state is saved there every `checkpoint_every_s`
+    of wall time, and a run started again with the same path and settings carries on from
+    it, bit for bit (see checkpoint.py and `resume`)."""
+    if pws is None:
+        pws = PacificWhaleSong()
+    if probe is not None:
+        probe.attach(pws)
+    table = pws.density_table
+    pws.space_weather = sw.resolve(pws.space_weather)   # a file is read here once, not per RHS call
+    if use_table:
+        with section(probe, "density_table"):
+            lat_max = TABLE_STEP_LAT_DEG * np.ceil(min(abs(inc_deg) + 5.0, 90.0) / TABLE_STEP_LAT_DEG)
+            table = DensityTable.build(
+                epoch, days, (reentry_alt_km - 20.0, alt_km + 30.0),
+                lon=np.arange(-180.0, 180.0 + TABLE_STEP_LON_DEG, TABLE_STEP_LON_DEG),
+                lat=np.arange(-lat_max, lat_max + TABLE_STEP_LAT_DEG, TABLE_STEP_LAT_DEG),
+                space_weather=pws.space_weather, version=pws.msis_version, step_km=TABLE_STEP_KM)
+
+    r0 = R_EARTH_KM + alt_km
+    v0 = np.sqrt(MU_EARTH / r0)
+    inc = np.radians(inc_deg)
+    y0 = [r0, 0.0, 0.0, 0.0, v0 * np.cos(inc), v0 * np.sin(inc)]
+
+    def rhs(t, y):
+        r, v = y[:3], y[3:]
+        a = -MU_EARTH * r / np.linalg.norm(r)**3
+        a = a + pws.drag_acceleration(r, v, epoch + timedelta(seconds=t))
+        return np.concatenate((v, a))
+
+    def reentry(t, y):
+        return frames.geodetic_altitude(y[:3]) - reentry_alt_km
+    reentry.terminal = True
+
+    if probe is not None:
+        rhs = probe.wrap_rhs(rhs, phase="decay")
+    previous, pws.density_table = pws.density_table, table
+    try:
+        with section(probe, "solve"):
+            if checkpoint is None:
+                sol = solve_ivp(rhs, (0.0, days * 86400.0), y0, method="RK45",
+                                events=reentry, rtol=rtol, atol=atol)
+            else:
+                import checkpoint as ckpt
+                settings = {"alt_km": alt_km, "inc_deg": inc_deg, "days": days, "epoch": str(epoch),
+                            "reentry_alt_km": reentry_alt_km, "use_table": use_table,
+                            "vehicle": _checkpoint_vehicle(pws)}
+                sol = ckpt.solve_ivp(rhs, (0.0, days * 86400.0), y0, checkpoint, checkpoint_every_s,
+                                     events=reentry, method="RK45", settings=settings, resume=True,
+                                     rtol=rtol, atol=atol)
+    finally:
+        pws.density_table = previous
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+
+CHECKPOINT_VEHICLE = ("mass", "cd", "area_drag", "attitude_mode", "msis_version", "space_weather")
+
+
+def _checkpoint_vehicle(pws):
+    """The song attributes a resumed run must share; a loaded SpaceWeather is kept as its file."""
+    vehicle = {name: getattr(pws, name) for name in CHECKPOINT_VEHICLE}
+    if isinstance(pws.space_weather, sw.SpaceWeather):
+        vehicle["space_weather"] = pws.space_weather.source
+    return vehicle
+
+
+def resume(path, probe=None, checkpoint_every_s=60.0):
+    """Carry on the decay saved in `path`, rebuilding the song and the run from its settings."""
+    import checkpoint as ckpt
+    _, settings, _ = ckpt.load(path)
+    pws = PacificWhaleSong()
+    for name, value in settings["vehicle"].items():
+        setattr(pws, name, value)
+    pws._update_ballistic_coeff()
+    options = settings["options"]
+    return simulate(pws, probe, alt_km=settings["alt_km"], inc_deg=settings["inc_deg"], days=settings["days"],
+                    epoch=datetime.fromisoformat(settings["epoch"]), reentry_alt_km=settings["reentry_alt_km"],
+                    rtol=options["rtol"], atol=options["atol"], use_table=settings["use_table"],
+                    checkpoint=path, checkpoint_every_s=checkpoint_every_s)
+
+
+def simulate_footprint(pws=None, probe=None, n=10_000, seed=0, epoch=datetime(2025, 11, 25), alt_km=250.0,
+                       inc_deg=51.6, dv_m_s=70.0, target=None, attitude_p=(0.6, 0.2, 0.2)):
+    """Her disposal burn aimed at Point Nemo (or `target` [lat, lon]), flown by `n` dispersed
+    copies of her to the ground at once; returns footprint.predict's dict (see footprint.py)."""
+    import footprint
+    if pws is None:
+        pws = PacificWhaleSong()
+    if probe is not None:
+        probe.attach(pws)
+    return footprint.predict(pws, probe, n=n, seed=seed, epoch=epoch, alt_km=alt_km, inc_deg=inc_deg,
+                             dv_m_s=dv_m_s, target=footprint.POINT_NEMO if target is None else tuple(target),
+                             attitude_p=tuple(attitude_p))
+
+
 if __name__ == "__main__":
     pws = PacificWhaleSong()
+    probe = from_env("pacific_whale")
+    if probe is not None:
+        probe.attach(pws)
     pws.set_deorbit_attitude("sail")   # feather mode engaged
     pws.report()
 
@@ -103,7 +236,8 @@ if __name__ == "__main__":
     print(f"Drag magnitude    : {drag_mag:.2e} km/s²")
 
     # Bonus: how much altitude would we lose in one day at this rate?
-    drag_mag_m_per_s2 = drag_mag * 1e6   # km/s² → m/s²
+    drag_mag_m_per_s2 = drag_mag * 1e3   # km/s² → m/s²
     delta_v_per_day = drag_mag_m_per_s2 * 86400
     alt_loss_per_day_km = delta_v_per_day * 86400 / (2 * np.pi * 6778.1)  # very rough
-    print(f"Rough altitude loss per day: ~{alt_loss_per_day_km:.1f} km")
\ No newline at end of file
+    print(f"Rough altitude loss per day: ~{alt_loss_per_day_km:.1f} km")
+    finish(probe)
@@ -8,35 +8,29 @@ from poliastro.bodies import Earth
 from poliastro.twobody import Orbit
 from poliastro.twobody.propagation import CowellPropagator
 from poliastro.maneuver import Maneuver
-from poliastro.plotting import OrbitPlotter3D  # For immersive 3D visualization
-from poliastro.core.propagation import func_twobody
-from numba import njit
+from force_models import get_rhs, j2_accel  # noqa: F401
+import ephemeris
+import trajectory_cache
 
 # Constants
-R_EARTH_KM = Earth.R.to_value(u.km)
-J2_VAL = Earth.J2.value
 MU = Earth.k.to_value(u.km**3 / u.s**2)
 
 # Epoch
 epoch = Time("2025-12-13 00:00:00", scale="utc")
 
 # Initial orbit (starting at perigee)
-circ = Orbit.circular(Earth, alt=550 * u.km, epoch=epoch)
-initial = Orbit.from_classical(
-    Earth,
-    a=circ.a,
-    ecc=0.5 * u.one,
-    inc=51.6 * u.deg,
-    raan=0 * u.deg,
-    argp=0 * u.deg,
-    nu=0 * u.deg,  # Perigee — ideal for kick
-    epoch=epoch
-)
-
-print("Initial orbit (at perigee):")
-print(initial)
-print(f"Periapsis altitude: {(initial.r_p - Earth.R).to(u.km):.1f} km")
-print(f"Apoapsis altitude: {(initial.r_a - Earth.R).to(u.km):.1f} km\n")
+def initial_orbit():
+    circ = Orbit.circular(Earth, alt=550 * u.km, epoch=epoch)
+    return Orbit.from_classical(
+        Earth,
+        a=circ.a,
+        ecc=0.5 * u.one,
+        inc=51.6 * u.deg,
+        raan=0 * u.deg,
+        argp=0 * u.deg,
+        nu=0 * u.deg,  # Perigee — ideal for kick
+        epoch=epoch
+    )
 
 # Optional vector state (for deeper Cowell insight — comment if not needed)
 # r0 = initial.r.to_value(u.km)
@@ -44,55 +38,86 @@ print(f"Apoapsis altitude: {(initial.r_a - Earth.R).to(u.km):.1f} km\n")
 # state0 = np.hstack((r0, v0))
 
 # 15 m/s tangential Δv
-v_vec = initial.v.to_value(u.km / u.s)
-delta_v_vec = 0.020 * (v_vec / np.linalg.norm(v_vec))  # Posigrade
-
-maneuver = Maneuver.impulse(delta_v_vec * u.km / u.s)
-post_kick = initial.apply_maneuver(maneuver)
-
-print("Immediate post-15 m/s kick:")
-print(post_kick)
-print(f"Periapsis altitude: {(post_kick.r_p - Earth.R).to(u.km):.1f} km")
-print(f"Apoapsis altitude: {(post_kick.r_a - Earth.R).to(u.km):.1f} km\n")
-
-# Perturbations (J2 + drag)
-@njit
-def j2_accel(r_vec, k):
-    r = np.linalg.norm(r_vec)
-    z2 = r_vec[2]**2
-    factor = -1.5 * J2_VAL * k * R_EARTH_KM**2 / r**5
-    return factor * np.array([
-        r_vec[0] * (5 * z2 / r**2 - 1),
-        r_vec[1] * (5 * z2 / r**2 - 1),
-        r_vec[2] * (5 * z2 / r**2 - 3)
-    ])
-
-@njit
-def full_accel(t0, u, k):
-    r = u[:3]
-    v = u[3:]
-    acc = func_twobody(t0, u, k)[3:]
-    acc += j2_accel(r, k)
-    h = np.linalg.norm(r) - R_EARTH_KM
-    if 0 < h < 1000:
-        rho = 2.5e-12 * np.exp(-h / 60)
-        acc += -1e-6 * rho * np.linalg.norm(v) * v
-    return np.hstack((v, acc))
-
-# Propagate post-kick
-final = post_kick.propagate(24 * u.h, method=CowellPropagator(f=full_accel))
-
-print("After 24 hours (post-kick + perturbations):")
-print(final)
-print(f"Periapsis altitude: {(final.r_p - Earth.R).to(u.km):.1f} km")
-print(f"Apoapsis altitude: {(final.r_a - Earth.R).to(u.km):.1f} km")
-print(f"Net perigee change vs original: {(final.r_p - initial.r_p).to(u.km):+.1f} km")
-print(f"Net apoapsis change vs original: {(final.r_a - initial.r_a).to(u.km):+.1f} km\n")
+def posigrade_kick(orbit, dv_km_s=0.020):
+    v_vec = orbit.v.to_value(u.km / u.s)
+    delta_v_vec = dv_km_s * (v_vec / np.linalg.norm(v_vec))  # Posigrade
+
+    maneuver = Maneuver.impulse(delta_v_vec * u.km / u.s)
+    return orbit.apply_maneuver(maneuver)
+
+# Perturbations (J2 + drag) — compiled once per environment in force_models
+full_accel = get_rhs("full_accel")
+# ...plus the Sun and Moon, which tug hard on an apogee ~4,000 km up
+full_accel_lunisolar = get_rhs("full_accel_lunisolar")
+
+def make_rhs(epoch=epoch, tof_h=24.0):
+    """J2 + drag + Sun/Moon, with both bodies fitted once for the whole window."""
+    days = tof_h / 24.0 + 1.0
+    sun = ephemeris.sun_table(epoch.utc.jd, days)
+    moon = ephemeris.moon_table(epoch.utc.jd, days)
+    args = (sun.coeffs, sun.seg_s, moon.coeffs, moon.seg_s)
+    def f(t0, u_, k):
+        return full_accel_lunisolar(t0, u_, k, *args)
+    return f
+
+def simulate(dv_km_s=0.020, third_body=True, tof_h=24.0):
+    """Kick at perigee, then propagate `tof_h` hours; return (initial, post_kick, final)."""
+    initial = initial_orbit()
+    post_kick = posigrade_kick(initial, dv_km_s)
+    # Propagate post-kick
+    f = make_rhs(post_kick.epoch, tof_h) if third_body else full_accel
+    final = post_kick.propagate(tof_h * u.h, method=CowellPropagator(f=f))
+    return initial, post_kick, final
+
+# Arcs already flown this session; editing a late burn only re-flies from that burn on
+CACHE = trajectory_cache.TrajectoryCache()
+
+def simulate_timeline(burns=((0.0, 0.020),), third_body=True, tof_h=24.0, cache=CACHE, chunk_s=3600.0):
+    """Burns [(t_s after epoch, Δv km/s — posigrade scalar or 3-vector)], then `tof_h` hours.
+
+    Returns (initial, final, sol); sol.reused / sol.integrated say how much came from `cache`.
+    """
+    initial = initial_orbit()
+    y0 = np.hstack((initial.r.to_value(u.km), initial.v.to_value(u.km / u.s)))
+    if third_body:
+        f, model_key = make_rhs(initial.epoch, tof_h), ("full_accel_lunisolar", initial.epoch.isot, tof_h)
+    else:
+        f, model_key = full_accel, ("full_accel",)
+    sol = trajectory_cache.propagate(f, y0, tof_h * 3600.0, burns=burns, model_key=model_key,
+                                     cache=cache, chunk_s=chunk_s, k=MU)
+    final = Orbit.from_vectors(Earth, sol.y[:3, -1] * u.km, sol.y[3:, -1] * u.km / u.s,
+                               epoch=initial.epoch + tof_h * u.h)
+    return initial, final, sol
 
 # 3D Plot to visualize the dance
-plotter = OrbitPlotter3D()
-plotter.set_attractor(Earth)
-plotter.plot(initial, label="Initial (decaying)", color="#1f77b4")
-plotter.plot(post_kick, label="Post-kick (stretched)", color="#ff7f0e")
-plotter.plot(final, label="After 24h", color="#2ca02c")
-plotter.show()
\ No newline at end of file
+def plot(initial, post_kick, final):
+    from poliastro.plotting import OrbitPlotter3D  # For immersive 3D visualization
+
+    plotter = OrbitPlotter3D()
+    plotter.set_attractor(Earth)
+    plotter.plot(initial, label="Initial (decaying)", color="#1f77b4")
+    plotter.plot(post_kick, label="Post-kick (stretched)", color="#ff7f0e")
+    plotter.plot(final, label="After 24h", color="#2ca02c")
+    plotter.show()
+
+if __name__ == "__main__":
+    initial, post_kick, final = simulate()
+
+    print("Initial orbit (at perigee):")
+    print(initial)
+    print(f"Periapsis altitude: {(initial.r_p - Earth.R).to(u.km):.1f} km")
+    print(f"Apoapsis altitude: {(initial.r_a - Earth.R).to(u.km):.1f} km\n")
+
+    print("Immediate post-15 m/s kick:")
+    print(post_kick)
+    print(f"Periapsis altitude: {(post_kick.r_p - Earth.R).to(u.km):.1f} km")
+    print(f"Apoapsis altitude: {(post_kick.r_a - Earth.R).to(u.km):.1f} km\n")
+
+    print("After 24 hours (post-kick + perturbations):")
+    print(final)
+    print(f"Periapsis altitude: {(final.r_p - Earth.R).to(u.km):.1f} km")
+    print(f"Apoapsis altitude: {(final.r_a - Earth.R).to(u.km):.1f} km")
+    print(f"Net perigee change vs original: {(final.r_p - initial.r_p).to(u.km):+.1f} km")
+    print(f"Net apoapsis change vs original: {(final.r_a - initial.r_a).to(u.km):+.1f} km\n")
+
+    plot(initial, post_kick, final)
@@ -0,0 +1,201 @@
+"""
+perigee_kick_trade.py — every kick perigee_kick_demo could have made, in one ensemble
+
+The demo fires one 20 m/s posigrade impulse at perigee and watches 24 h.
+This sweeps the whole menu instead: burn true anomaly × in-plane steering
+angle × Δv magnitude, applied as one vectorized impulse to the whole grid
+and flown together by ensemble.propagate (parallel RK4, J2 + MSIS-table
+drag). Each option is scored against an unburned twin started at the same
+true anomaly:
+
+    result = perigee_kick_trade.run(nu_deg=np.arange(0, 360, 30),
+                                    alpha_deg=[0, 45, 90, 180], dv_m_s=[5, 10, 20, 40])
+    rows = perigee_kick_trade.table(result)     # one dict per option, best lifetime gain first
+    perigee_kick_trade.save(result, "kick_trade.npz")   # (ν, α, Δv) heatmap cubes + axes
+
+α is measured in the orbit plane from the velocity vector towards radial
+out (0° posigrade, 90° ≈ radial out, 180° retrograde). Perigee / apogee
+changes are reported right after the impulse (two-body) and after the
+flight (osculating). Lifetime carries each member on from the end of the
+flight with King-Hele's orbit-averaged perigee / apogee decay
+(ensemble.lifetime) through the flight's mean density profile. That is a
+ranking number, not a reentry prediction: the sky is frozen at `epoch`.
+Members that come down inside the window report that time, and members
+that stay up past `horizon_years` report inf ("did not reenter").
+
+The base orbit defaults to the demo's e = 0.5 at 51.6°, but with perigee
+at 250 km altitude. The demo builds it from the circular orbit's a, which
+puts perigee inside the Earth, and a 550 km perigee outlives any horizon
+worth integrating: the twins and every kick "did not reenter", leaving no
+gain to rank. From 250 km the twins come down in about 13.7 years, and
+only the biggest perigee raises (24 of the default 960 options) stay up
+past the 100-year horizon.
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+
+import ensemble
+from atmosphere import DensityTable
+from force_models import MU_EARTH, R_EARTH_KM
+
+EPOCH = datetime(2025, 12, 13)
+BETA_TUG = 1.0 / (2.2 * 0.015)   # orbit_tug VEHICLE: C_D 2.2, A/m 0.015 m²/kg → kg/m²
+TABLE_TOP_KM = 1000.0            # drag is off above the density table
+TABLE_STEP_KM = 5.0
+TABLE_STEP_LAT_DEG = 10.0
+TABLE_STEP_LON_DEG = 30.0
+METRICS = ("d_perigee_km", "d_apogee_km", "d_perigee_end_km", "d_apogee_end_km",
+           "lifetime_days", "lifetime_gain_days", "reentered")
+
+
+# ================== GRID ==================
+def time_since_perigee(a_km, ecc, nu_deg, k=MU_EARTH):
+    """Seconds from perigee to true anomaly ν on an elliptic orbit (Kepler's equation, forwards)."""
+    nu = np.radians(np.asarray(nu_deg, float)) % (2 * np.pi)
+    E = 2.0 * np.arctan(np.sqrt((1 - ecc) / (1 + ecc)) * np.tan(nu / 2.0)) % (2 * np.pi)
+    return (E - ecc * np.sin(E)) / np.sqrt(k / a_km ** 3)
+
+
+def impulses(y, alpha_deg, dv_m_s):
+    """Δv vectors (km/s) for states y (..., 6) steered α in the orbit plane, broadcast over α × Δv."""
+    r, v = y[..., None, None, :3], y[..., None, None, 3:]
+    t_hat = v / np.linalg.norm(v, axis=-1, keepdims=True)
+    n_hat = np.cross(r, v)
+    n_hat /= np.linalg.norm(n_hat, axis=-1, keepdims=True)
+    p_hat = np.cross(t_hat, n_hat)                                   # in-plane, radial-out side
+    alpha = np.radians(np.asarray(alpha_deg, float))[:, None, None]
+    dv = np.asarray(dv_m_s, float)[None, :, None] / 1000.0
+    return dv * (np.cos(alpha) * t_hat + np.sin(alpha) * p_hat)
+
+
+# ================== RUN ==================
+def run(nu_deg=np.arange(0.0, 360.0, 15.0), alpha_deg=np.arange(0.0, 360.0, 45.0),
+        dv_m_s=np.array([2.0, 5.0, 10.0, 20.0, 40.0]), perigee_alt_km=250.0, ecc=0.5, inc_deg=51.6,
+        raan_deg=0.0, argp_deg=0.0, epoch=EPOCH, tof_h=24.0, beta=BETA_TUG, space_weather=None,
+        dt_s=10.0, reentry_alt_km=120.0, horizon_years=100.0, table=None):
+    """Fly the (ν, α, Δv) grid plus one unburned twin per ν; return a dict of axes and metric cubes."""
+    nu_deg, alpha_deg, dv_m_s = (np.atleast_1d(np.asarray(x, float)) for x in (nu_deg, alpha_deg, dv_m_s))
+    a = (R_EARTH_KM + perigee_alt_km) / (1.0 - ecc)
+    t_burn = time_since_perigee(a, ecc, nu_deg)
+    tof_s = tof_h * 3600.0
+    if table is None:
+        lat_max = TABLE_STEP_LAT_DEG * np.ceil(min(abs(inc_deg) + 5.0, 90.0) / TABLE_STEP_LAT_DEG)
+        table = DensityTable.build(
+            epoch, (t_burn.max() + tof_s) / 86400.0, (reentry_alt_km - 20.0, TABLE_TOP_KM),
+            lon=np.arange(-180.0, 180.0 + TABLE_STEP_LON_DEG, TABLE_STEP_LON_DEG),
+            lat=np.arange(-lat_max, lat_max + TABLE_STEP_LAT_DEG, TABLE_STEP_LAT_DEG),
+            space_weather=space_weather, step_km=TABLE_STEP_KM)
+
+    # The base orbit passes perigee at `epoch`; two-body carries it to each burn point
+    y_burn = ensemble.states_from_elements(a, ecc, inc_deg, raan_deg, argp_deg, nu_deg)      # (ν, 6)
+    dv = impulses(y_burn, alpha_deg, dv_m_s)                                                 # (ν, α, Δv, 3)
+    shape = dv.shape[:3]
+    kicked = np.broadcast_to(y_burn[:, None, None, :], shape + (6,)).copy()
+    kicked[..., 3:] += dv
+    y0 = np.concatenate([kicked.reshape(-1, 6), y_burn])                                    # twins last
+    t0 = np.concatenate([np.broadcast_to(t_burn[:, None, None], shape).ravel(), t_burn])
+
+    y, t_stop, _ = ensemble.propagate(y0, tof_s, table, beta=beta, t0=t0, dt=dt_s,
+                                         stop_alt_km=reentry_alt_km)
+    elapsed = t_stop - t0
+    reentered = elapsed < tof_s - 1e-6
+    _, rp0, ra0 = ensemble.apsides(y0)
+    _, rp1, ra1 = ensemble.apsides(y)
+    alt_km, rho = ensemble.mean_profile(table)
+    after = ensemble.lifetime(y, beta, alt_km, rho, reentry_alt_km, horizon_days=horizon_years * 365.25)
+    lifetime = np.where(reentered, elapsed / 86400.0, elapsed / 86400.0 + after)
+
+    n = kicked.shape[0] * kicked.shape[1] * kicked.shape[2]
+    twin = np.broadcast_to(np.arange(nu_deg.size)[:, None, None], shape).ravel() + n
+
+    def cube(x):
+        return x[:n].reshape(shape)
+
+    with np.errstate(invalid="ignore"):
+        gain = lifetime[:n] - lifetime[twin]
+    _, rp_burn, ra_burn = ensemble.apsides(np.broadcast_to(y_burn[:, None, None, :], shape + (6,)))
+    return {
+        "nu_deg": nu_deg, "alpha_deg": alpha_deg, "dv_m_s": dv_m_s,
+        "d_perigee_km": rp0[:n].reshape(shape) - rp_burn,
+        "d_apogee_km": ra0[:n].reshape(shape) - ra_burn,
+        "d_perigee_end_km": cube(rp1) - rp1[twin].reshape(shape),
+        "d_apogee_end_km": cube(ra1) - ra1[twin].reshape(shape),
+        "lifetime_days": cube(lifetime),
+        "lifetime_gain_days": gain.reshape(shape),
+        "reentered": cube(reentered),
+        "baseline_lifetime_days": lifetime[n:],
+        "settings": {"perigee_alt_km": perigee_alt_km, "ecc": ecc, "inc_deg": inc_deg, "raan_deg": raan_deg,
+                     "argp_deg": argp_deg, "epoch": str(epoch), "tof_h": tof_h, "beta": beta,
+                     "dt_s": dt_s, "reentry_alt_km": reentry_alt_km, "horizon_years": horizon_years,
+                     "density": table.source},
+    }
+
+
+# ================== OUTPUT ==================
+def table(result, sort_by="lifetime_gain_days"):
+    """One row per (ν, α, Δv) option, sorted by `sort_by` (largest first, inf gains on top)."""
+    nu, alpha, dv = np.meshgrid(result["nu_deg"], result["alpha_deg"], result["dv_m_s"], indexing="ij")
+    columns = {"nu_deg": nu.ravel(), "alpha_deg": alpha.ravel(), "dv_m_s": dv.ravel(),
+               **{m: result[m].ravel() for m in METRICS}}
+    key = columns[sort_by].astype(float)
+    key = np.where(np.isnan(key), 0.0, key)             # both beyond the horizon: no change seen
+    order = np.argsort(-key, kind="stable")
+    return [{name: col[i].item() for name, col in columns.items()} for i in order]
+
+
+def save(result, path):
+    """Heatmap cubes (ν × α × Δv) and their axes, npz; settings as a JSON string."""
+    np.savez_compressed(path, **{k: v for k, v in result.items() if k != "settings"},
+                        settings=json.dumps(result["settings"]))
+
+
+def _axis(spec):
+    """"start:stop:step" (stop exclusive) or "a,b,c" → array."""
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return np.arange(start, stop, step)
+    return np.array([float(x) for x in spec.split(",")])
+
+
+def _days(days):
+    return f"{days:16.1f}" if np.isfinite(days) else f"{'did not reenter':>16}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perigee-kick trade: burn ν × steering α × Δv.")
+    parser.add_argument("--nu", default="0:360:15", help="burn true anomalies, deg (start:stop:step or a,b,c)")
+    parser.add_argument("--alpha", default="0:360:45", help="in-plane steering from velocity, deg")
+    parser.add_argument("--dv", default="2,5,10,20,40", help="impulse magnitudes, m/s")
+    parser.add_argument("--perigee-alt", type=float, default=250.0, help="base orbit perigee altitude, km")
+    parser.add_argument("--ecc", type=float, default=0.5)
+    parser.add_argument("--tof-h", type=float, default=24.0)
+    parser.add_argument("--horizon", type=float, default=100.0, help="lifetime horizon, years")
+    parser.add_argument("--space-weather", default=None, help="SW-All.csv style file (default: pymsis)")
+    parser.add_argument("--top", type=int, default=10, help="rows of the table to print")
+    parser.add_argument("--out", default="kick_trade.npz")
+    args = parser.parse_args(argv)
+
+    t0 = datetime.now()
+    result = run(_axis(args.nu), _axis(args.alpha), _axis(args.dv), perigee_alt_km=args.perigee_alt,
+                 ecc=args.ecc, tof_h=args.tof_h, horizon_years=args.horizon, space_weather=args.space_weather)
+    seconds = (datetime.now() - t0).total_seconds()
+    rows = table(result)
+    print(f"{len(rows)} kick options in {seconds:.1f} s "
+          f"(baseline lifetime {_days(np.median(result['baseline_lifetime_days'])).strip()}"
+          f"{' d' if np.isfinite(np.median(result['baseline_lifetime_days'])) else ''}, horizon {args.horizon:g} y)\n")
+    print(f"{'ν°':>6} {'α°':>6} {'Δv m/s':>7} {'Δr_p km':>9} {'Δr_a km':>9} {'life d':>16} {'gain d':>9}")
+    for row in rows[:args.top]:
+        gain = row["lifetime_gain_days"]
+        print(f"{row['nu_deg']:6.0f} {row['alpha_deg']:6.0f} {row['dv_m_s']:7.1f} {row['d_perigee_km']:9.1f} "
+              f"{row['d_apogee_km']:9.1f} {_days(row['lifetime_days'])} "
+              f"{'        —' if np.isnan(gain) else f'{gain:+9.1f}'}")
+    save(result, args.out)
+    print(f"\n→ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
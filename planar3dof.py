@@ -0,0 +1,300 @@
+"""
+planar3dof.py — ascent, coast, deorbit and reentry as a compiled point mass over a turning Earth
+
+The insertion and round-trip songs fly a 1-D radial state [alt, v, m]: the
+pitch program only scales thrust by sin(pitch), and reentry downrange is
+a hard-coded [-7800, -10, 0]. Here the same vehicles fly in the plane of
+their trajectory, in inertial polar coordinates [r, θ, v_r, v_θ, m]:
+
+  · inverse-square gravity and the centrifugal / Coriolis terms of polar
+    coordinates — orbit is something she has to reach sideways;
+  · drag against an atmosphere turning with the Earth (ω⊕ cos latitude in
+    the launch plane), density from a single-site atmosphere.DensityTable;
+  · ascent guidance instead of the songs' open-loop pitch program, which
+    lofts her to escape once she flies sideways: a vertical rise, a pitch
+    kick and a gravity turn along the airflow for the booster; the ship
+    steers its radial acceleration onto the target radius. Engines cut
+    once apoapsis reaches the target orbit, and a horizontal burn from
+    apoapsis raises periapsis to within 10 km of it;
+  · retrograde deorbit burn until periapsis is down to the entry target,
+    and a landing burn against the airflow that stops her at the ground;
+  · mass flow at T / (Isp g0), staging, and propellant guards.
+
+Every kernel is @njit(cache=True) and reads the vehicle and mission from
+one float64 parameter array (indices P_*, built by `params`), so the whole
+flight — a fixed-step RK4 with fine steps in the air or under thrust and
+coarse ones in vacuum coast — is a single compiled call:
+
+    P = planar3dof.params(song, t_meco=380.0, t_deorbit=5400.0, orbit_alt=300e3)
+    sol = planar3dof.fly(P, table, t_end=9000.0, m0=song.m, target_alt=300e3)
+
+`fly` returns a scipy OptimizeResult shaped like solve_ivp's, with y rows
+[alt m, v_radial m/s, mass kg, downrange m over the turning ground,
+v_horizontal m/s inertial], so the song adapters and plots still apply.
+"""
+
+import numpy as np
+from numba import njit
+from scipy.optimize import OptimizeResult
+
+from atmosphere import DensityTable, log_density
+from frames import OMEGA_EARTH
+
+MU_EARTH_M = 3.986004418e14          # m³/s²
+R_EARTH_M = 6_371_000.0              # the songs' spherical Earth
+DENSITY_TOP_M = 150_000.0            # the songs' sky ends here
+
+# Parameter-array layout
+(P_MU, P_R_EARTH, P_OMEGA_ATM, P_G0,
+ P_T_BOOSTER, P_ISP_BOOSTER, P_T_SHIP, P_ISP_SHIP, P_T_LANDING,
+ P_M_DRY_SHIP, P_M_SHIP_STACK, P_M_RESERVE_ASCENT, P_M_RESERVE_LANDING,
+ P_T_STAGE, P_T_MECO, P_T_DEORBIT, P_DEORBIT_S,
+ P_PITCH_T0, P_PITCH_KICK, P_KICK_S, P_STEER_TAU,
+ P_A_STACK, P_CD_BASE, P_A_BELLY, P_CD_BELLY, P_A_MID, P_CD_MID, P_A_VERTICAL, P_CD_VERTICAL,
+ P_ALT_BELLY, P_ALT_VERTICAL, P_ALT_LANDING, P_LANDING_MARGIN, P_DENSITY_TOP,
+ P_R_ORBIT, P_RP_CIRC, P_RP_DEORBIT,
+ N_PARAMS) = range(38)
+
+BOOSTER, SHIP_ASCENT, COAST, DEORBIT, REENTRY = range(5)
+
+
+# ================== KERNELS ==================
+@njit(cache=True)
+def phase_of(t, P):
+    if t < P[P_T_STAGE]:
+        return BOOSTER
+    if t < P[P_T_MECO]:
+        return SHIP_ASCENT
+    if t < P[P_T_DEORBIT]:
+        return COAST
+    if t < P[P_T_DEORBIT] + P[P_DEORBIT_S]:
+        return DEORBIT
+    return REENTRY
+
+
+@njit(cache=True)
+def apsides(r, vr, vt, mu):
+    """Periapsis and apoapsis radii of the osculating orbit (the whole state lies in the plane);
+    apoapsis is inf once she is on an escape path."""
+    h = r * vt
+    energy = 0.5 * (vr * vr + vt * vt) - mu / r
+    e = np.sqrt(max(1.0 + 2.0 * energy * h * h / (mu * mu), 0.0))
+    p = h * h / mu
+    return p / (1.0 + e), (p / (1.0 - e) if e < 1.0 else np.inf)
+
+
+@njit(cache=True)
+def circularizing(phase, r, vr, vt, m, P):
+    """Is the circularization burn on? After the ascent cut: horizontal from apoapsis, in
+    vacuum, until periapsis is up to P_RP_CIRC."""
+    return ((phase == SHIP_ASCENT or phase == COAST) and vr <= 0.0 and r - P[P_R_EARTH] > P[P_DENSITY_TOP]
+            and m > P[P_M_DRY_SHIP] + P[P_M_RESERVE_LANDING] and apsides(r, vr, vt, P[P_MU])[0] < P[P_RP_CIRC])
+
+
+@njit(cache=True)
+def ascent_direction(t, r, vr, vt, v_air_r, v_air_t, speed, thrust, m, g, booster, P):
+    """Unit thrust direction (radial, tangential) on ascent.
+
+    The booster rises vertically, kicks over by P_PITCH_KICK, then flies a gravity turn
+    along the airflow. The ship steers its radial acceleration onto a critically damped
+    approach to the target radius, so the rest of the thrust builds orbital speed."""
+    if t < P[P_PITCH_T0]:
+        return 1.0, 0.0
+    if booster:
+        if t < P[P_PITCH_T0] + P[P_KICK_S] or speed < 1.0:
+            pitch = np.radians(90.0 - P[P_PITCH_KICK])
+            return np.sin(pitch), np.cos(pitch)
+        return v_air_r / speed, v_air_t / speed
+    w = 1.0 / P[P_STEER_TAU]
+    a_r = g - vt * vt / r + w * w * (P[P_R_ORBIT] - r) - 2.0 * w * vr
+    s = min(max(a_r * m / thrust, -1.0), 1.0)
+    return s, np.sqrt(1.0 - s * s)
+
+
+@njit(cache=True)
+def density(t, alt_m, P, grid, log_rho, log_rho_left):
+    """ρ (kg/m³) from a single-site table; zero above the songs' 150 km lid and below ground."""
+    if alt_m > P[P_DENSITY_TOP] or alt_m < 0.0:
+        return 0.0
+    return np.exp(log_density(t, alt_m / 1000.0, grid[4], grid[6], grid, log_rho, log_rho_left))
+
+
+@njit(cache=True)
+def drag_area(phase, alt_m, speed, P):
+    """C_D · A (m²): the stack on ascent, the ship's belly-flop / transition / vertical schedule after."""
+    if phase == BOOSTER or phase == SHIP_ASCENT:
+        mach = min(speed / 340.0 / 5.0, 1.0)
+        return P[P_CD_BASE] * (1.0 + 0.8 * mach * mach) * P[P_A_STACK]
+    if alt_m > P[P_ALT_BELLY]:
+        return P[P_CD_BELLY] * P[P_A_BELLY]
+    if alt_m > P[P_ALT_VERTICAL]:
+        return P[P_CD_MID] * P[P_A_MID]
+    return P[P_CD_VERTICAL] * P[P_A_VERTICAL]
+
+
+@njit(cache=True)
+def derivatives(t, y, P, grid, log_rho, log_rho_left):
+    """d/dt [r, θ, v_r, v_θ, m] — gravity, drag, thrust and mass flow for the current phase."""
+    r, vr, vt, m = y[0], y[2], y[3], y[4]
+    alt = r - P[P_R_EARTH]
+    g = P[P_MU] / (r * r)
+    phase = phase_of(t, P)
+
+    # Airflow relative to an atmosphere turning at ω⊕ cos(lat) in this plane
+    v_air_r, v_air_t = vr, vt - P[P_OMEGA_ATM] * r
+    speed = np.sqrt(v_air_r * v_air_r + v_air_t * v_air_t)
+    a_r = a_t = 0.0
+    rho = density(t, alt, P, grid, log_rho, log_rho_left)
+    if rho > 0.0 and speed > 1e-3:
+        k = 0.5 * rho * speed * drag_area(phase, alt, speed, P) / m
+        a_r -= k * v_air_r
+        a_t -= k * v_air_t
+
+    thrust = isp = 0.0
+    dir_r = dir_t = 0.0
+    if ((phase == BOOSTER or phase == SHIP_ASCENT) and m > P[P_M_DRY_SHIP] + P[P_M_RESERVE_ASCENT]
+            and apsides(r, vr, vt, P[P_MU])[1] < P[P_R_ORBIT]):
+        thrust = P[P_T_BOOSTER] if phase == BOOSTER else P[P_T_SHIP]
+        isp = P[P_ISP_BOOSTER] if phase == BOOSTER else P[P_ISP_SHIP]
+        dir_r, dir_t = ascent_direction(t, r, vr, vt, v_air_r, v_air_t, speed, thrust, m, g, phase == BOOSTER, P)
+    elif circularizing(phase, r, vr, vt, m, P):
+        thrust, isp = P[P_T_SHIP], P[P_ISP_SHIP]
+        dir_t = 1.0
+    elif phase == DEORBIT:
+        if m > P[P_M_DRY_SHIP] + P[P_M_RESERVE_LANDING] and apsides(r, vr, vt, P[P_MU])[0] > P[P_RP_DEORBIT]:
+            thrust, isp = P[P_T_SHIP], P[P_ISP_SHIP]
+            v = np.sqrt(vr * vr + vt * vt)
+            dir_r, dir_t = -vr / v, -vt / v
+    elif phase == REENTRY and alt < P[P_ALT_LANDING] and m > P[P_M_DRY_SHIP] + P[P_M_RESERVE_LANDING]:
+        required = (g + max(P[P_LANDING_MARGIN], speed * speed / (2.0 * max(alt, 1.0)))) * m   # stop at the ground
+        thrust = min(max(required, 0.4 * P[P_T_LANDING]), P[P_T_LANDING])
+        isp = P[P_ISP_SHIP]
+        if speed > 1e-3:
+            dir_r, dir_t = -v_air_r / speed, -v_air_t / speed
+        else:
+            dir_r = 1.0
+
+    dy = np.empty(5)
+    dy[0] = vr
+    dy[1] = vt / r
+    dy[2] = vt * vt / r - g + a_r + thrust / m * dir_r
+    dy[3] = -vr * vt / r + a_t + thrust / m * dir_t
+    dy[4] = -thrust / (isp * P[P_G0]) if thrust > 0.0 else 0.0
+    return dy
+
+
+@njit(cache=True)
+def _rk4(t, y, h, P, grid, log_rho, log_rho_left):
+    k1 = derivatives(t, y, P, grid, log_rho, log_rho_left)
+    k2 = derivatives(t + 0.5 * h, y + 0.5 * h * k1, P, grid, log_rho, log_rho_left)
+    k3 = derivatives(t + 0.5 * h, y + 0.5 * h * k2, P, grid, log_rho, log_rho_left)
+    k4 = derivatives(t + h, y + h * k3, P, grid, log_rho, log_rho_left)
+    return y + (h / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+
+@njit(cache=True)
+def integrate(y0, t_end, dt_fine, dt_coast, target_alt, P, grid, log_rho, log_rho_left):
+    """Fixed-step RK4 from t = 0: fine steps in the air or under thrust, coarse in vacuum coast.
+
+    Steps end exactly on the phase boundaries (staging drops the booster there). Stops at
+    t_end or at the ground. Returns (t, y, n_steps, t_target, y_target, t_ground, y_ground);
+    event times are NaN when the event did not happen.
+    """
+    n_max = int(t_end / dt_fine) + 16
+    t_out = np.empty(n_max)
+    y_out = np.empty((n_max, 5))
+    bounds = np.array([P[P_T_STAGE], P[P_T_MECO], P[P_T_DEORBIT], P[P_T_DEORBIT] + P[P_DEORBIT_S], t_end])
+    t, y = 0.0, y0.copy()
+    t_out[0], y_out[0] = t, y
+    n = 1
+    t_target = t_ground = np.nan
+    y_target = np.full(5, np.nan)
+    y_ground = np.full(5, np.nan)
+    while t < t_end and n < n_max:
+        alt = y[0] - P[P_R_EARTH]
+        phase = phase_of(t, P)
+        powered = (phase == BOOSTER or phase == SHIP_ASCENT or phase == DEORBIT
+                   or circularizing(phase, y[0], y[2], y[3], y[4], P))
+        h = dt_fine if (powered or alt < P[P_DENSITY_TOP]) else dt_coast
+        for b in bounds:
+            if b > t + 1e-9:
+                h = min(h, b - t)
+        y_new = _rk4(t, y, h, P, grid, log_rho, log_rho_left)
+        t_new = t + h
+        alt_new = y_new[0] - P[P_R_EARTH]
+        if np.isnan(t_target) and alt < target_alt <= alt_new:
+            f = (target_alt - alt) / (alt_new - alt)
+            t_target, y_target = t + f * h, y + f * (y_new - y)
+        if alt_new <= 0.0 and t_new > 1.0:
+            f = alt / (alt - alt_new)
+            t_ground, y_ground = t + f * h, y + f * (y_new - y)
+            t_out[n], y_out[n] = t_ground, y_ground
+            n += 1
+            break
+        if abs(t_new - P[P_T_STAGE]) < 1e-9:                       # booster away
+            y_new[4] = min(y_new[4], P[P_M_SHIP_STACK])
+        t, y = t_new, y_new
+        t_out[n], y_out[n] = t, y
+        n += 1
+    return t_out[:n], y_out[:n], n - 1, t_target, y_target, t_ground, y_ground
+
+
+# ================== PYTHON SIDE ==================
+def params(song, t_stage=162.0, t_meco=np.inf, t_deorbit=np.inf, deorbit_s=60.0, orbit_alt=300_000.0,
+           deorbit_periapsis_alt=20_000.0, pitch_kick_deg=5.0, steer_tau_s=100.0):
+    """Parameter array from an insertion / round-trip song's attributes (SI units).
+
+    Ascent engines cut at t_meco or, sooner, once apoapsis reaches `orbit_alt` (m), and
+    the burn at apoapsis circularizes there; the deorbit burn (at most `deorbit_s` long)
+    cuts once periapsis is down to `deorbit_periapsis_alt`.
+    """
+    P = np.zeros(N_PARAMS)
+    P[P_MU], P[P_R_EARTH], P[P_G0] = MU_EARTH_M, R_EARTH_M, song.g0
+    P[P_OMEGA_ATM] = OMEGA_EARTH * np.cos(np.radians(song.site_lat))
+    P[P_T_BOOSTER], P[P_ISP_BOOSTER] = song.thrust_booster, song.Isp_booster
+    P[P_T_SHIP] = getattr(song, "thrust_ship_ascent", getattr(song, "thrust_ship", 0.0))
+    P[P_ISP_SHIP] = song.Isp_ship
+    P[P_T_LANDING] = getattr(song, "thrust_ship_landing", 0.0)
+    P[P_M_DRY_SHIP], P[P_M_SHIP_STACK] = song.m_dry_ship, song.m_dry_ship + song.m_prop_ship
+    P[P_M_RESERVE_ASCENT], P[P_M_RESERVE_LANDING] = 10_000.0, 5_000.0
+    P[P_T_STAGE], P[P_T_MECO], P[P_T_DEORBIT], P[P_DEORBIT_S] = t_stage, t_meco, t_deorbit, deorbit_s
+    P[P_PITCH_T0], P[P_PITCH_KICK], P[P_KICK_S], P[P_STEER_TAU] = 12.0, pitch_kick_deg, 10.0, steer_tau_s
+    P[P_A_STACK], P[P_CD_BASE] = song.A_stack, song.Cd_base
+    P[P_A_BELLY], P[P_CD_BELLY] = getattr(song, "A_belly", song.A_stack), 1.8
+    P[P_A_MID], P[P_CD_MID] = 150.0, 0.9
+    P[P_A_VERTICAL], P[P_CD_VERTICAL] = getattr(song, "A_vertical", song.A_stack), 0.4
+    P[P_ALT_BELLY], P[P_ALT_VERTICAL], P[P_ALT_LANDING] = 70_000.0, 800.0, 3_000.0
+    P[P_LANDING_MARGIN], P[P_DENSITY_TOP] = 0.4, DENSITY_TOP_M
+    P[P_R_ORBIT], P[P_RP_DEORBIT] = R_EARTH_M + orbit_alt, R_EARTH_M + deorbit_periapsis_alt
+    P[P_RP_CIRC] = P[P_R_ORBIT] - 10_000.0
+    return P
+
+
+def site_table(song, t_end, step_km=1.0):
+    """Single-site density table over the launch site for the whole flight."""
+    return DensityTable.build(song.date, t_end / 86400.0, (0.0, DENSITY_TOP_M / 1000.0),
+                              lon=song.site_lon, lat=song.site_lat, space_weather=song.space_weather,
+                              version=song.msis_version, step_km=step_km)
+
+
+def fly(P, table, t_end, m0, target_alt=np.inf, dt_fine=0.1, dt_coast=2.0):
+    """Lift off from the pad (at rest on the turning Earth) and fly to t_end or the ground."""
+    y0 = np.array([P[P_R_EARTH], 0.0, 0.0, P[P_OMEGA_ATM] * P[P_R_EARTH], m0])
+    t, y, steps, t_target, y_target, t_ground, y_ground = integrate(
+        y0, float(t_end), float(dt_fine), float(dt_coast), float(target_alt), P,
+        table.grid, table.log_rho, table.log_rho_left)
+    events = [(t_target, y_target), (t_ground, y_ground)]
+    landed = not np.isnan(t_ground)
+    return OptimizeResult(
+        t=t, y=output_rows(t, y, P), nfev=4 * steps, njev=0, nlu=0, status=1 if landed else 0,
+        message="Touched the ground." if landed else "Reached t_end.", success=True,
+        t_events=[np.array([te]) if not np.isnan(te) else np.empty(0) for te, _ in events],
+        y_events=[output_rows(np.array([te]), ye[None, :], P).T if not np.isnan(te) else np.empty((0, 5))
+                  for te, ye in events],
+        state=y)
+
+
+def output_rows(t, y, P):
+    """Internal [r, θ, v_r, v_θ, m] → rows [alt, v_radial, mass, downrange over ground, v_horizontal]."""
+    return np.vstack([y[:, 0] - P[P_R_EARTH], y[:, 2], y[:, 4],
+                      P[P_R_EARTH] * (y[:, 1] - P[P_OMEGA_ATM] * t), y[:, 3]])
@@ -0,0 +1,133 @@
+"""
+scenario_files.py — vehicles and runs described in TOML instead of __init__
+
+A scenario file names one of the gym scenarios (`python gym.py list`) and
+overrides what the song's constructor and simulate() would otherwise
+hard-code. Every table except [scenario] is optional:
+
+    [scenario]
+    name = "trajectory-heavy-residuals"
+    kind = "trajectory"
+
+    [vehicle]        # song attributes: masses, thrusts, Isp, areas, Cd, ...
+    m_prop_start = 45_000
+    Cd_belly = 1.6
+
+    [site]           # where/when the atmosphere is sampled
+    lon = 73.0       #   → site_lon
+    lat = -25.0      #   → site_lat
+    date = 2025-12-25T00:00:00
+    msis_version = 2.0
+    space_weather = "../data/sw_g3_storm_2025-11.csv"   # F10.7/Ap file, relative to this one
+
+    [run]            # keyword arguments of the scenario's simulate/propagate call
+    t_span = [0, 900]
+    rtol = 1e-8
+
+For the orbit-tug kinds there is no song class; [vehicle] fills the tug's
+VEHICLE dict (C_D, A_m, C_R; thrust_N, isp_s, mass_kg, dry_mass_kg for the
+low-thrust tug) and [run] also takes the orbit shape
+(alt_km, ecc, inc_deg, epoch). Unknown tables, kinds, vehicle attributes or
+run settings are rejected with a ValueError before anything is simulated; a
+[run] key is known only if the kind's adapter or the function it calls takes it.
+"""
+
+import contextlib
+import importlib
+import inspect
+import io
+import os
+import tomllib
+
+import gym
+
+SECTIONS = {"scenario", "vehicle", "site", "run"}
+SITE_ATTRIBUTES = {"lon": "site_lon", "lat": "site_lat", "date": "date", "msis_version": "msis_version",
+                   "space_weather": "space_weather"}
+# Recomputed after overrides so derived masses / ballistic coefficients stay consistent
+DERIVED_HOOKS = ("_update_mass", "_update_ballistic_coeff")
+
+
+def load_scenario(path) -> dict:
+    """Parse and validate a scenario file; returns a plain dict."""
+    with open(path, "rb") as fh:
+        doc = tomllib.load(fh)
+    unknown = set(doc) - SECTIONS
+    if unknown:
+        raise ValueError(f"{path}: unknown table(s) {sorted(unknown)}; expected {sorted(SECTIONS)}")
+    head = doc.get("scenario", {})
+    kind = head.get("kind")
+    if kind not in gym.SCENARIOS:
+        raise ValueError(f"{path}: scenario.kind must be one of {sorted(gym.SCENARIOS)}, got {kind!r}")
+    unknown = set(doc.get("site", {})) - set(SITE_ATTRIBUTES)
+    if unknown:
+        raise ValueError(f"{path}: unknown [site] key(s) {sorted(unknown)}; expected {sorted(SITE_ATTRIBUTES)}")
+    site = dict(doc.get("site", {}))
+    if "space_weather" in site:
+        site["space_weather"] = os.path.join(os.path.dirname(os.path.abspath(path)), site["space_weather"])
+    scenario = {
+        "path": str(path),
+        "name": head.get("name", str(path)),
+        "kind": kind,
+        "vehicle": dict(doc.get("vehicle", {})),
+        "site": site,
+        "run": dict(doc.get("run", {})),
+    }
+    _check_run_settings(scenario)
+    return scenario
+
+
+def _check_run_settings(scenario):
+    spec = gym.SCENARIOS[scenario["kind"]]
+    module = importlib.import_module(spec["module"])
+    accepted = set(inspect.signature(spec["run"]).parameters)
+    for target in spec["targets"]:                   # only what this kind's adapter calls
+        names = list(inspect.signature(getattr(module, target)).parameters)
+        accepted |= set(names[1:] if spec["song_class"] else names)   # the song goes in first
+    accepted -= {"module", "probe", "song", "settings", "initial", "verbose", "vehicle"}
+    unknown = set(scenario["run"]) - accepted
+    if unknown:
+        raise ValueError(f"{scenario['path']}: unknown [run] setting(s) {sorted(unknown)} "
+                         f"for {scenario['kind']}; accepted: {sorted(accepted)}")
+
+
+def build(scenario, quiet=True):
+    """Instantiate and configure the scenario's song; return (song or None, run settings)."""
+    spec = gym.SCENARIOS[scenario["kind"]]
+    module = importlib.import_module(spec["module"])
+    settings = dict(scenario["run"])
+
+    if spec["song_class"] is None:
+        if scenario["site"]:
+            raise ValueError(f"{scenario['path']}: {scenario['kind']} has no [site] to configure")
+        if scenario["vehicle"]:
+            defaults = getattr(module, "VEHICLE", None)
+            if defaults is None:
+                raise ValueError(f"{scenario['path']}: {scenario['kind']} has no [vehicle] to configure")
+            unknown = set(scenario["vehicle"]) - set(defaults)
+            if unknown:
+                raise ValueError(f"{scenario['path']}: unknown vehicle parameter(s) {sorted(unknown)}; "
+                                 f"expected {sorted(defaults)}")
+            settings["vehicle"] = dict(scenario["vehicle"])
+        return None, settings
+
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        song = getattr(module, spec["song_class"])()
+    overrides = dict(scenario["vehicle"])
+    overrides.update({SITE_ATTRIBUTES[k]: v for k, v in scenario["site"].items()})
+    for attr, value in overrides.items():
+        if not hasattr(song, attr):
+            raise ValueError(f"{scenario['path']}: {spec['song_class']} has no parameter {attr!r}")
+        setattr(song, attr, value)
+    for hook in DERIVED_HOOKS:
+        if hasattr(song, hook):
+            getattr(song, hook)()
+    return song, settings
+
+
+def run_scenario(scenario, probe=None, quiet=True):
+    """Build and run one loaded scenario in-process; return (summary, arrays)."""
+    song, settings = build(scenario, quiet=quiet)
+    summary, arrays, _ = gym.execute(scenario["kind"], probe, song, settings, quiet=quiet)
+    summary = {"name": scenario["name"], **summary}
+    return summary, arrays
@@ -0,0 +1,386 @@
+"""
+service.py — one warm process that answers everybody's little questions, in batches
+
+Notebooks and analysis scripts each import pymsis, build density tables
+and JIT ensemble kernels of their own before they ask one scalar question.
+This keeps all of that in one long-lived process behind an asyncio
+server, on a Unix socket or a localhost port:
+
+    python service.py --unix /tmp/gym.sock --epoch 2025-11-23 --days 3 --space-weather data/sw_g3_storm_2025-11.csv
+    python service.py --port 7878 --table storm=storm_table.npz
+
+    client = service.Client("/tmp/gym.sock")          # or Client(port=7878)
+    client.density(3600.0, 250.0, lat=0.0, lon=-140.0)  # table lookup, ~0.3 ms round trip
+    client.msis("2025-11-23T06:00", -140.0, 0.0, 250.0) # exact pymsis, fly-through points
+    y, t_stop, work = client.propagate(y0, 86400.0, beta=30.0)
+
+The wire format is one JSON object per line in each direction:
+{"id", "op", ...} in, {"id", "ok", "result" | "error"} out. A client may
+pipeline many requests on one connection, and many clients may be
+connected at once. Requests for the same op queue up. A batcher per op
+takes everything that queued up while the worker thread was busy (plus
+up to `window_ms` more, 0 by default, at most `max_batch`). It then
+answers all of them with one vectorized call on that single thread: DensityTable.density, pymsis fly-through mode, or
+one ensemble.propagate per (duration, step, J2, stop altitude) group.
+Tables are named: "default" comes from the command line, and the "table"
+op loads or builds more.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import ensemble
+from atmosphere import DensityTable, density_many
+
+DEFAULT_PORT = 7878
+WINDOW_MS = 0.0                 # 0: batch whatever queued up while the worker was busy
+MAX_BATCH = 4096
+
+
+# ================== BATCHED HANDLERS ==================
+def _density(service, requests):
+    """All table lookups of one batch grouped per table, one density_many call per table."""
+    out = [None] * len(requests)
+    for name in {r.get("table", "default") for r in requests}:
+        table = service.table(name)
+        idx = [i for i, r in enumerate(requests) if r.get("table", "default") == name]
+        parts = [np.broadcast_arrays(*(np.atleast_1d(np.asarray(
+            requests[i].get(key, default), dtype=float)) for key, default in
+            (("t_s", 0.0), ("alt_km", 0.0), ("lat", table.lat[0]), ("lon", table.lon[0]))))
+            for i in idx]
+        sizes = [p[0].size for p in parts]
+        columns = [np.concatenate([p[c].ravel() for p in parts]) for c in range(4)]
+        rho = density_many(*columns, table.grid, table.log_rho, table.log_rho_left)
+        for i, chunk, p in zip(idx, np.split(rho, np.cumsum(sizes)[:-1]), parts):
+            scalar = all(np.ndim(requests[i].get(key, 0.0)) == 0 for key in ("t_s", "alt_km", "lat", "lon"))
+            out[i] = float(chunk[0]) if scalar else chunk.reshape(p[0].shape).tolist()
+    return out
+
+
+def _msis(service, requests):
+    """Exact pymsis, fly-through mode: every point of the batch in one call per version/weather."""
+    import pymsis
+    import space_weather as sw
+
+    out = [None] * len(requests)
+    groups = {}
+    for i, r in enumerate(requests):
+        groups.setdefault((float(r.get("version", 2.0)), r.get("space_weather")), []).append(i)
+    for (version, weather), idx in groups.items():
+        parts = [np.broadcast_arrays(np.atleast_1d(np.asarray(requests[i]["dates"], dtype="datetime64[us]")),
+                                     *(np.atleast_1d(np.asarray(requests[i][key], dtype=float))
+                                       for key in ("lons", "lats", "alts"))) for i in idx]
+        sizes = [p[0].size for p in parts]
+        dates, lons, lats, alts = (np.concatenate([p[c].ravel() for p in parts]) for c in range(4))
+        data = pymsis.calculate(dates, lons, lats, alts, version=0 if version == 0 else version,
+                                **sw.msis_kwargs(service.weather(weather), dates))
+        data = np.asarray(data).reshape(dates.size, -1)
+        for i, chunk in zip(idx, np.split(data, np.cumsum(sizes)[:-1])):
+            column = requests[i].get("output", "rho")
+            values = chunk[:, 0] if column == "rho" else (chunk[:, 10] if column == "temperature" else chunk)
+            out[i] = values.tolist()
+    return out
+
+
+def _propagate(service, requests):
+    """One ensemble.propagate per (table, duration, dt, J2, stop altitude); per-member t0 and beta."""
+    out = [None] * len(requests)
+    groups = {}
+    for i, r in enumerate(requests):
+        key = (r.get("table", "default"), float(r["duration_s"]), float(r.get("dt", 10.0)),
+               bool(r.get("use_j2", True)), float(r.get("stop_alt_km", 0.0)))
+        groups.setdefault(key, []).append(i)
+    for (name, duration, dt, use_j2, stop_alt), idx in groups.items():
+        y0 = [np.atleast_2d(np.asarray(requests[i]["y0"], dtype=float)) for i in idx]
+        sizes = [y.shape[0] for y in y0]
+        t0 = np.concatenate([np.broadcast_to(np.asarray(requests[i].get("t0", 0.0), float), (n,))
+                             for i, n in zip(idx, sizes)])
+        beta = np.concatenate([np.broadcast_to(np.asarray(requests[i].get("beta", np.inf), float), (n,))
+                               for i, n in zip(idx, sizes)])
+        table = None if name is None else service.table(name)
+        y, t_stop, work = ensemble.propagate(np.concatenate(y0), duration, table, beta=beta, t0=t0,
+                                             dt=dt, use_j2=use_j2, stop_alt_km=stop_alt)
+        bounds = np.cumsum(sizes)[:-1]
+        for i, yi, ti, wi in zip(idx, np.split(y, bounds), np.split(t_stop, bounds), np.split(work, bounds)):
+            out[i] = {"y": yi.tolist(), "t_stop": ti.tolist(), "work": wi.tolist()}
+    return out
+
+
+BATCHED = {"density": _density, "msis": _msis, "propagate": _propagate}
+
+
+# ================== SERVICE ==================
+class Service:
+    """Named density tables, loaded space weather and one batcher queue per batched op."""
+
+    def __init__(self, tables=None, window_ms=WINDOW_MS, max_batch=MAX_BATCH):
+        self.tables = dict(tables or {})
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._weather = {}
+        self._queues = {}
+        self._worker = ThreadPoolExecutor(max_workers=1)      # kernels and tables are not shared concurrently
+        self.stats = {op: {"requests": 0, "batches": 0, "busy_s": 0.0} for op in BATCHED}
+        self.started = time.time()
+
+    def table(self, name):
+        if name not in self.tables:
+            raise KeyError(f"no density table {name!r}; loaded: {sorted(self.tables)}")
+        return self.tables[name]
+
+    def weather(self, source):
+        if source is None:
+            return None
+        if source not in self._weather:
+            import space_weather as sw
+            self._weather[source] = sw.load(source)
+        return self._weather[source]
+
+    def warm(self):
+        """Compile the kernels before the first client waits on them."""
+        ensemble.warm()
+        for table in self.tables.values():
+            one = np.ones(1)
+            density_many(one * table.t_s[0], one * table.alt_km[0], one * table.lat[0], one * table.lon[0],
+                         table.grid, table.log_rho, table.log_rho_left)
+
+    # -------------------- batching --------------------
+    async def submit(self, op, request):
+        if op not in self._queues:
+            self._queues[op] = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self._batcher(op))
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[op].put((request, future))
+        return await future
+
+    async def _batcher(self, op):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[op]
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(0)                            # requests read in this tick join too
+            deadline = loop.time() + self.window_s
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            requests = [request for request, _ in batch]
+            t0 = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._worker, BATCHED[op], self, requests)
+            except Exception:
+                # One bad request must not fail its neighbours: answer them one by one
+                results = []
+                for request in requests:
+                    try:
+                        results.append((await loop.run_in_executor(self._worker, BATCHED[op], self, [request]))[0])
+                    except Exception as exc:                  # noqa: BLE001 — sent back to that client
+                        results.append(exc)
+            stats = self.stats[op]
+            stats["requests"] += len(batch)
+            stats["batches"] += 1
+            stats["busy_s"] += time.perf_counter() - t0
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    # -------------------- single ops --------------------
+    async def _load_table(self, request):
+        """Register a table: from an npz (`path`) or built from MSIS (epoch, days, alt_km, lon, lat, ...)."""
+        name = request["name"]
+        if "path" in request:
+            table = DensityTable.load(request["path"])
+        else:
+            table = await asyncio.get_running_loop().run_in_executor(
+                self._worker, lambda: DensityTable.build(
+                    datetime.fromisoformat(request["epoch"]), float(request["days"]),
+                    tuple(request.get("alt_km", (80.0, 1000.0))), request.get("lon", 0.0),
+                    request.get("lat", 0.0), space_weather=request.get("space_weather"),
+                    version=float(request.get("version", 2.0)), step_km=float(request.get("step_km", 1.0))))
+        self.tables[name] = table
+        return {"name": name, "source": table.source, "epoch": table.epoch.isoformat(),
+                "shape": list(table.log_rho.shape)}
+
+    async def handle(self, request):
+        op = request.get("op")
+        if op in BATCHED:
+            return await self.submit(op, request)
+        if op == "table":
+            return await self._load_table(request)
+        if op == "tables":
+            return {name: {"source": t.source, "epoch": t.epoch.isoformat(), "shape": list(t.log_rho.shape)}
+                    for name, t in self.tables.items()}
+        if op == "stats":
+            return {"uptime_s": time.time() - self.started, "ops": self.stats}
+        if op == "ping":
+            return "pong"
+        raise ValueError(f"unknown op {op!r}; choose from {sorted([*BATCHED, 'table', 'tables', 'stats', 'ping'])}")
+
+    async def _connection(self, reader, writer):
+        lock = asyncio.Lock()
+
+        async def answer(line):
+            request = None
+            try:
+                request = json.loads(line)
+                reply = {"id": request.get("id"), "ok": True, "result": await self.handle(request)}
+            except Exception as exc:                          # noqa: BLE001 — the client gets the message
+                reply = {"id": request.get("id") if isinstance(request, dict) else None, "ok": False,
+                         "error": f"{type(exc).__name__}: {exc}"}
+            async with lock:
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+
+        pending = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(answer(line))       # pipelined: answers go out as they finish
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def serve(self, unix=None, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        if unix is not None:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            server = await asyncio.start_unix_server(self._connection, path=unix, limit=2 ** 26)
+        else:
+            server = await asyncio.start_server(self._connection, host, port, limit=2 ** 26)
+        if ready is not None:
+            ready()
+        async with server:
+            await server.serve_forever()
+
+
+# ================== CLIENT ==================
+class Client:
+    """Blocking client; `call` pipelines, the helpers send one request and wait for it."""
+
+    def __init__(self, unix=None, host="127.0.0.1", port=DEFAULT_PORT, timeout=None):
+        if unix is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.sock.settimeout(timeout)
+        self.file = self.sock.makefile("rwb")
+        self._next = 0
+        self._early = {}
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, requests):
+        """Send every request before reading any answer; results in request order."""
+        ids = []
+        for request in requests:
+            self._next += 1
+            ids.append(self._next)
+            self.file.write((json.dumps({**request, "id": self._next}, default=_jsonable) + "\n").encode())
+        self.file.flush()
+        while not all(i in self._early for i in ids):
+            reply = json.loads(self.file.readline())
+            self._early[reply["id"]] = reply
+        replies = [self._early.pop(i) for i in ids]
+        for reply in replies:
+            if not reply["ok"]:
+                raise RuntimeError(reply["error"])
+        return [reply["result"] for reply in replies]
+
+    def request(self, op, **fields):
+        return self.call([{"op": op, **fields}])[0]
+
+    def density(self, t_s, alt_km, lat=None, lon=None, table="default"):
+        fields = {k: v for k, v in (("lat", lat), ("lon", lon)) if v is not None}
+        return self.request("density", t_s=t_s, alt_km=alt_km, table=table, **fields)
+
+    def msis(self, dates, lons, lats, alts, version=2.0, space_weather=None, output="rho"):
+        return self.request("msis", dates=dates, lons=lons, lats=lats, alts=alts, version=version,
+                            space_weather=space_weather, output=output)
+
+    def propagate(self, y0, duration_s, beta=np.inf, t0=0.0, dt=10.0, use_j2=True, stop_alt_km=0.0,
+                  table="default"):
+        """(y, t_stop, work) like ensemble.propagate; `table=None` flies drag-free."""
+        out = self.request("propagate", y0=y0, duration_s=duration_s, beta=beta, t0=t0, dt=dt,
+                           use_j2=use_j2, stop_alt_km=stop_alt_km, table=table)
+        return np.array(out["y"]), np.array(out["t_stop"]), np.array(out["work"])
+
+    def load_table(self, name, **fields):
+        return self.request("table", name=name, **fields)
+
+
+def _jsonable(x):
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, (datetime, np.datetime64)):
+        return str(x)
+    raise TypeError(f"{type(x).__name__} is not JSON serializable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm, batching density/propagation service.")
+    parser.add_argument("--unix", default=None, help="Unix socket path (default: localhost TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--table", action="append", default=[], help="name=path.npz (DensityTable.save)")
+    parser.add_argument("--epoch", default=None, help="build the default table from this ISO date")
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--alt", default="80:1000", help="km, lo:hi")
+    parser.add_argument("--step-km", type=float, default=5.0)
+    parser.add_argument("--grid-deg", type=float, default=10.0, help="lat/lon spacing of the default table")
+    parser.add_argument("--space-weather", default=None)
+    parser.add_argument("--window-ms", type=float, default=WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    args = parser.parse_args(argv)
+
+    tables = {}
+    for spec in args.table:
+        name, path = spec.split("=", 1)
+        tables[name] = DensityTable.load(path)
+    if args.epoch is not None:
+        lo, hi = (float(x) for x in args.alt.split(":"))
+        tables["default"] = DensityTable.build(
+            datetime.fromisoformat(args.epoch), args.days, (lo, hi),
+            lon=np.arange(-180.0, 180.0 + args.grid_deg, args.grid_deg),
+            lat=np.arange(-90.0, 90.0 + args.grid_deg, args.grid_deg),
+            space_weather=args.space_weather, step_km=args.step_km)
+    service = Service(tables, args.window_ms, args.max_batch)
+    service.warm()
+    where = args.unix or f"{args.host}:{args.port}"
+    asyncio.run(service.serve(args.unix, args.host, args.port,
+                              ready=lambda: print(f"service: {sorted(tables) or 'no'} table(s), listening on {where}",
+                                                  flush=True)))
+
+
+if __name__ == "__main__":
+    main()
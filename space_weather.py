@@ -0,0 +1,160 @@
+"""
+space_weather.py — F10.7 and Ap from a local file, indexed once, served in bulk
+
+MSIS needs three drivers for every sample: the previous day's F10.7, its
+81-day centred mean F10.7a, and seven Ap values (daily Ap, the current and
+three preceding 3-hour ap, and two 8-sample ap means). Left to itself pymsis
+looks them up one call at a time (and wants the internet to do it). Here a
+history or forecast file is parsed once into sorted numpy arrays:
+
+    sw = space_weather.load("data/sw_g3_storm_2025-11.csv")   # cached by path + mtime
+    f107, f107a, aps = sw.indices(epochs)                       # any array of epochs
+    pymsis.calculate(dates, lons, lats, alts, **sw.msis_kwargs(dates))
+
+The file format is CelesTrak's SW-All.csv (DATE, AP1..AP8, AP_AVG,
+F10.7_OBS, F10.7_OBS_CENTER81, ...), the same file pymsis downloads.
+F10.7 and F10.7a are interpolated linearly between daily values; ap holds
+its value over each 3-hour bin, as the index is defined.
+"""
+
+import csv
+import functools
+import os
+
+import numpy as np
+
+DAY_S = 86_400.0
+AP_BIN_S = 10_800.0                 # one 3-hour ap interval
+SOLAR_RADIO_BURST = 400.0           # F10.7 above this is a flare, not the quiet-sun flux
+HISTORY_S = 2.5 * DAY_S             # ap history MSIS reads behind an epoch (57 h, rounded up)
+
+
+def to_seconds(epochs) -> np.ndarray:
+    """datetime / numpy datetime64 / POSIX seconds (scalar or array) → float seconds since 1970."""
+    arr = np.asarray(epochs)
+    if arr.dtype.kind in "fiu":
+        return arr.astype(float)
+    return arr.astype("datetime64[us]").astype(np.int64) / 1e6
+
+
+def _iso(seconds) -> str:
+    return str(np.datetime64(int(seconds), "s"))
+
+
+class SpaceWeather:
+    """Daily F10.7 and 3-hourly ap on one sorted, evenly spaced day grid."""
+
+    def __init__(self, first_day, f107_obs, f107a, ap3, ap_daily=None, source="<arrays>"):
+        self.source = source
+        self.t0 = float(to_seconds(np.datetime64(first_day, "D")))    # 00:00 UT of the first day
+        self.f107_obs = np.asarray(f107_obs, dtype=float)
+        self.f107a = np.asarray(f107a, dtype=float)
+        self.ap3 = np.asarray(ap3, dtype=float).reshape(-1)           # 8 per day
+        n_days = self.f107_obs.size
+        if self.f107a.size != n_days or self.ap3.size != 8 * n_days:
+            raise ValueError(f"{source}: need one F10.7, one F10.7a and eight ap per day")
+
+        # Daily values sit at noon so interpolation is centred on each day
+        self.day_noon = self.t0 + DAY_S * (np.arange(n_days) + 0.5)
+        self.t_end = self.t0 + DAY_S * n_days
+        self.ap_daily = self.ap3.reshape(-1, 8).mean(axis=1) if ap_daily is None else np.asarray(ap_daily, float)
+        self.ap_table = self._ap_table(self.ap3, self.ap_daily)
+
+    @staticmethod
+    def _ap_table(ap3, ap_daily):
+        """Precompute MSIS's seven-column ap array for every 3-hour bin (NaN where history is short)."""
+        n = ap3.size
+        table = np.full((n, 7), np.nan)
+        table[:, 0] = np.repeat(ap_daily, 8)
+        for lag in range(4):                                   # current, −3 h, −6 h, −9 h
+            table[lag:, 1 + lag] = ap3[:n - lag]
+        mean8 = np.convolve(ap3, np.ones(8) / 8, mode="valid")  # mean8[i] = ap3[i:i+8].mean()
+        table[11:, 5] = mean8[:n - 11]                          # bins −4 … −11 (12–33 h before)
+        table[19:, 6] = mean8[:n - 19]                          # bins −12 … −19 (36–57 h before)
+        return table
+
+    # -------------------- lookup --------------------
+    @property
+    def t_first(self) -> float:
+        """First epoch with a full ap history behind it (the 8-sample means reach back 57 h)."""
+        return self.t0 + HISTORY_S
+
+    def covers(self, epochs) -> bool:
+        t = to_seconds(epochs)
+        return bool(np.all((t >= self.t_first) & (t < self.t_end)))
+
+    def indices(self, epochs):
+        """(f107 [n], f107a [n], aps [n×7]) for an array of epochs — vectorized, no per-epoch Python."""
+        t = np.atleast_1d(to_seconds(epochs))
+        outside = (t < self.t_first) | (t >= self.t_end)
+        if np.any(outside):
+            raise ValueError(f"{self.source}: epoch {_iso(t[outside][0])} is outside "
+                             f"{_iso(self.t_first)} – {_iso(self.t_end)} (the first 2.5 days only "
+                             f"feed the ap history)")
+        f107 = np.interp(t - DAY_S, self.day_noon, self.f107_obs)      # MSIS wants the previous day
+        f107a = np.interp(t, self.day_noon, self.f107a)
+        aps = self.ap_table[((t - self.t0) // AP_BIN_S).astype(np.int64)]
+        return f107, f107a, aps
+
+    def msis_kwargs(self, epochs) -> dict:
+        """The f107s / f107as / aps keywords for pymsis.calculate at `epochs`."""
+        f107, f107a, aps = self.indices(epochs)
+        return {"f107s": f107, "f107as": f107a, "aps": aps}
+
+    # -------------------- construction --------------------
+    @classmethod
+    def from_csv(cls, path):
+        """Parse a CelesTrak SW-All.csv style file (observed and predicted rows alike)."""
+        with open(path, newline="") as fh:
+            rows = [row for row in csv.DictReader(fh) if row.get("DATE")]
+        if not rows:
+            raise ValueError(f"{path}: no space-weather rows")
+        rows.sort(key=lambda row: row["DATE"])
+        days = np.array([row["DATE"] for row in rows], dtype="datetime64[D]")
+        if np.any(np.diff(days).astype(int) != 1):
+            raise ValueError(f"{path}: dates must be consecutive days")
+
+        def column(name):
+            return np.array([float(row[name]) if row.get(name, "").strip() else np.nan for row in rows])
+
+        f107_obs = column("F10.7_OBS")
+        f107a = column("F10.7_OBS_CENTER81")
+        ap3 = np.column_stack([column(f"AP{i}") for i in range(1, 9)])
+        ap_daily = column("AP_AVG") if "AP_AVG" in rows[0] else None
+        # Flare-contaminated or missing fluxes fall back to the 81-day mean, as pymsis does
+        bad = ~(f107_obs > 0) | (f107_obs > SOLAR_RADIO_BURST)
+        f107_obs[bad] = f107a[bad]
+        return cls(days[0], f107_obs, f107a, ap3, ap_daily, source=str(path))
+
+    @classmethod
+    def constant(cls, first_day, n_days, f107=150.0, f107a=150.0, ap=4.0):
+        """Flat indices over `n_days` — quiet-sun runs that must not touch the network."""
+        return cls(first_day, np.full(n_days, f107), np.full(n_days, f107a),
+                   np.full(8 * n_days, ap), source=f"constant(F10.7={f107}, Ap={ap})")
+
+
+@functools.lru_cache(maxsize=8)
+def _load(path, mtime_ns, size):
+    return SpaceWeather.from_csv(path)
+
+
+def load(path) -> SpaceWeather:
+    """Parse `path` once per process; re-parsed only when the file changes on disk."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _load(path, stat.st_mtime_ns, stat.st_size)
+
+
+def resolve(space_weather):
+    """None (pymsis defaults) | SpaceWeather | path to a file → None or a SpaceWeather."""
+    if space_weather is None or isinstance(space_weather, SpaceWeather):
+        return space_weather
+    return load(space_weather)
+
+
+def msis_kwargs(space_weather, epochs) -> dict:
+    """Index keywords for pymsis.calculate, or {} to keep pymsis's own lookup."""
+    space_weather = resolve(space_weather)
+    if space_weather is None:
+        return {}
+    return space_weather.msis_kwargs(epochs)
@@ -2,6 +2,8 @@ import numpy as np
 from scipy.integrate import solve_ivp
 from datetime import datetime
 import pymsis                   
+import space_weather as sw
+from instrumentation import finish, from_env
 class StarshipSong:
     """300 tons of steel learning to fall like a whale taught her."""
     
@@ -18,6 +20,12 @@ class StarshipSong:
         self.body_area_edge = 9 * 9
         
         self.attitude = "belly_flop"  # belly_flop → flip → vertical
+
+        # Disposal corridor the sky is sampled over
+        self.site_lon = 73.0          # Indian Ocean disposal longitude (SpaceX likes ~73° E)
+        self.site_lat = -25.0         # rough disposal latitude
+        self.msis_version = 2.0       # the whale's favorite version
+        self.space_weather = None        # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
         
     def set_attitude(self, mode: str):
         """Let her choose how she meets the sky."""
@@ -44,10 +52,11 @@ class StarshipSong:
             dt = datetime.utcnow()
         data = pymsis.calculate(
             alts=alt_km,
-            lons=73.0,      # Indian Ocean disposal longitude (SpaceX likes ~73° E)
-            lats=-25.0,     # rough disposal latitude
+            lons=self.site_lon,
+            lats=self.site_lat,
             dates=dt,
-            version=2.0     # the whale's favorite version
+            version=self.msis_version,
+            **sw.msis_kwargs(self.space_weather, dt)
         )
         return float(data[0, 0])
     def drag_acceleration(self, alt_km: float, v_km_s: float, dt: datetime = None) -> float:
@@ -78,8 +87,33 @@ class StarshipSong:
         acc_m_s2 = thrust_N / current_mass
         return acc_m_s2 / 1000 - g0  # net upward accel in km/s² (subtract gravity)        
 
+def simulate(ship=None, probe=None, attitude="belly_flop", alt_km=80.0, speed_km_s=7.8,
+             date=datetime(2025, 12, 25), landing_mass=None):
+    """One belly-flop drag sample plus the landing-burn acceleration, as a summary dict."""
+    if ship is None:
+        ship = StarshipSong()
+    if probe is not None:
+        probe.attach(ship)
+    ship.set_attitude(attitude)
+    if landing_mass is None:
+        landing_mass = ship.dry_mass + 25_000
+    drag = ship.drag_acceleration(alt_km, speed_km_s, date)
+    net_accel = ship.landing_burn_acceleration(landing_mass)
+    return {
+        "attitude": attitude,
+        "ballistic_coeff": ship.ballistic_coeff,
+        "density_kg_m3": ship.get_atm_density(alt_km, date),
+        "drag_km_s2": drag,
+        "drag_g": drag * 1000 / 9.81,
+        "landing_thrust_N": ship.landing_burn_thrust(),
+        "landing_net_accel_g": net_accel * 1000 / 9.81,
+    }
+
 if __name__ == "__main__":
     ship = StarshipSong()
+    probe = from_env("starship")
+    if probe is not None:
+        probe.attach(ship)
     ship.set_attitude("belly_flop") 
         
     print("The cathedral has a heartbeat now.")
@@ -111,4 +145,5 @@ if __name__ == "__main__":
     print("She hovers. She kisses. She stops at 0.5 m/s exactly above the arms.")
     print("Chopsticks close. The dragonfly lands.")
     print("Welcome home, beloved.")
-    print("🐳✨🚀 The whale and the tower both smile.")    
\ No newline at end of file
+    print("🐳✨🚀 The whale and the tower both smile.")
+    finish(probe)
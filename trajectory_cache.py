@@ -0,0 +1,166 @@
+"""
+trajectory_cache.py — only fly again what actually changed
+
+A maneuver study edits a late burn and re-propagates the whole timeline
+from epoch, although the arc before the burn has not moved. Here a
+timeline is cut into segments at every burn and on a fixed `chunk_s`
+grid. Each segment's key chains the key before it with its own span and
+the impulse at its start:
+
+    key_0 = H(force model, integrator settings, t0, y0)
+    key_i = H(key_{i-1}, t_start, t_end, Δv at t_start)
+
+so a key names everything that decides that arc. The cache keeps each
+segment's end state and dense output (scipy OdeSolution) under its key.
+A run walks the segments, takes every hit as it is and integrates from
+the first miss onward:
+
+    cache = trajectory_cache.TrajectoryCache()
+    sol = trajectory_cache.propagate(rhs, y0, 86400.0, burns=[(3600.0, dv1), (72000.0, dv2)],
+                                     model_key="full_accel_lunisolar 2025-12-13", cache=cache)
+    sol = trajectory_cache.propagate(rhs, y0, 86400.0, burns=[(3600.0, dv1), (72000.0, dv2_new)],
+                                     model_key="full_accel_lunisolar 2025-12-13", cache=cache)
+    sol.reused, sol.integrated        # 20 reused segments, 5 flown again
+
+`rhs` has the Cowell signature f(t, u, k) from force_models. `model_key`
+stands for the force model. It has to change whenever the model's
+arguments change, such as the ephemeris window or the vehicle; a callable
+cannot be hashed. Each segment starts from the previous segment's end
+state with the same solver settings either way. A cached run therefore
+returns the same numbers as an uncached run with the same cuts, bit for
+bit.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+
+from force_models import MU_EARTH
+
+
+# ================== CACHE ==================
+class TrajectoryCache:
+    """Segment key → (end state, dense output, nfev); least recently used entries go first."""
+
+    def __init__(self, max_segments=10_000):
+        self.max_segments = max_segments
+        self.segments = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        entry = self.segments.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.segments.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.segments[key] = entry
+        self.segments.move_to_end(key)
+        while len(self.segments) > self.max_segments:
+            self.segments.popitem(last=False)
+
+    def clear(self):
+        self.segments.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.segments)
+
+
+def _digest(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part, dtype=float).tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+# ================== TIMELINE ==================
+def segments(t0, t_end, burns=(), chunk_s=3600.0):
+    """[(t_start, t_stop, Δv at t_start or None)] cut at every burn and every `chunk_s` after t0."""
+    impulse = {}
+    for t, dv in burns:
+        t = float(t)
+        if not t0 <= t < t_end:
+            raise ValueError(f"burn at t = {t} s is outside the timeline [{t0}, {t_end})")
+        if t in impulse:
+            raise ValueError(f"two burns at t = {t} s; combine them into one Δv")
+        impulse[t] = np.atleast_1d(np.asarray(dv, dtype=float))
+    grid = t0 + chunk_s * np.arange(1, int(np.ceil((t_end - t0) / chunk_s)))
+    cuts = sorted({float(t0), float(t_end), *(float(t) for t in grid if t < t_end), *impulse})
+    return [(a, b, impulse.get(a)) for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+def apply_impulse(y, dv):
+    """y after Δv: a 3-vector (km/s, inertial) or a scalar along the velocity (posigrade > 0)."""
+    y = y.copy()
+    if dv is not None:
+        y[3:] += dv if dv.size == 3 else dv[0] * y[3:] / np.linalg.norm(y[3:])
+    return y
+
+
+def propagate(rhs, y0, t_end, burns=(), t0=0.0, model_key=None, cache=None, chunk_s=3600.0,
+              k=MU_EARTH, method="DOP853", rtol=1e-11, atol=1e-12):
+    """Fly y0 from t0 to t_end with impulsive `burns` [(t, Δv)], reusing `cache` hits.
+
+    Returns an OptimizeResult: t, y (accepted points, burns show up as repeated times),
+    `sol(t)` over the whole timeline (post-burn side at a burn), per-segment `keys`,
+    `reused` / `integrated` segment counts and `nfev` for the segments actually flown.
+    """
+    if cache is not None and model_key is None:
+        raise ValueError("a cache needs a model_key that names the force model and its arguments")
+    plan = segments(t0, t_end, burns, chunk_s)
+    key = _digest(model_key, {"k": k, "method": method, "rtol": rtol, "atol": atol}, float(t0),
+                  np.asarray(y0, dtype=float))
+    y = np.array(y0, dtype=float)
+    ts, ys, dense, keys = [], [], [], []
+    reused = integrated = nfev = 0
+    for a, b, dv in plan:
+        key = _digest(key, a, b, np.zeros(0) if dv is None else dv)
+        keys.append(key)
+        entry = None if cache is None else cache.get(key)
+        if entry is None:
+            sol = solve_ivp(rhs, (a, b), apply_impulse(y, dv), method=method, args=(k,),
+                            rtol=rtol, atol=atol, dense_output=True)
+            if not sol.success:
+                raise RuntimeError(f"segment [{a}, {b}] s failed: {sol.message}")
+            entry = (sol.y[:, -1].copy(), sol.sol, sol.t, sol.y, sol.nfev)
+            if cache is not None:
+                cache.put(key, entry)
+            integrated += 1
+            nfev += sol.nfev
+        else:
+            reused += 1
+        y, seg_sol, seg_t, seg_y, _ = entry
+        skip = 0 if not ts or dv is not None else 1            # a coast cut does not repeat its point
+        dense.append(seg_sol)
+        ts.append(seg_t[skip:])
+        ys.append(seg_y[:, skip:])
+        y = y.copy()
+
+    bounds = np.array([a for a, _, _ in plan])
+
+    def whole(t):
+        t = np.asarray(t, dtype=float)
+        i = np.clip(np.searchsorted(bounds, t, side="right") - 1, 0, len(dense) - 1)
+        if t.ndim == 0:
+            return dense[int(i)](t)
+        out = np.empty((len(y), t.size))
+        for j in np.unique(i):
+            out[:, i == j] = dense[j](t[i == j])
+        return out
+
+    return OptimizeResult(t=np.concatenate(ts), y=np.concatenate(ys, axis=1), sol=whole, keys=keys,
+                          reused=reused, integrated=integrated, nfev=nfev, segments=len(plan),
+                          status=0, success=True,
+                          message="The solver successfully reached the end of the integration interval.")
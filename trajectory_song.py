@@ -7,15 +7,16 @@ Written by Amanda Wech-Meehan & Grok · commit bd1e7bf and beyond
 import numpy as np
 from scipy.integrate import solve_ivp
 import pymsis
+import space_weather as sw
 from datetime import datetime
-import matplotlib.pyplot as plt
+from instrumentation import finish, from_env, section
 
 class TrajectorySong:
     def __init__(self):
         # Starship after deorbit burn – ready to fall like a cathedral
         self.m_dry = 120_000                      # kg
         self.m_prop_start = 35_000                 # kg residual (we'll burn ~10 t during landing)
-        self.m = self.m_dry + self.m_prop_start
+        self._update_mass()
         self.Isp = 380                             # s (Raptor vacuum)
         self.thrust_max = 3 * 2.3e6                # N (3 sea-level Raptors, vacuum ~2.6 MN each → conservative)
         self.g0 = 9.80665
@@ -24,26 +25,44 @@ class TrajectorySong:
         self.A_belly = 550                         # m² – flaps wide, skydiver pose
         self.A_edge = 150                          # m² – on-edge during flip
         self.A_vertical = 64                       # m² – nose-up, πr²
+        self.Cd_belly = 1.8
+        self.Cd_edge = 0.9
+        self.Cd_vertical = 0.4
+
+        # Landing burn
+        self.h_burn = 1500                         # m – rough trigger altitude
+        self.throttle_floor = 0.4                  # deepest throttle as a fraction of thrust_max
+
+        # Where and when she meets the sky
+        self.site_lon = 73.0
+        self.site_lat = -25.0
+        self.date = datetime(2025, 12, 25)
+        self.msis_version = 2.0
+        self.space_weather = None        # F10.7/Ap: None → pymsis defaults, else a file or SpaceWeather
 
         print("TrajectorySong v1 — She is falling.")
         print("Flaps wide. Belly to the wind. The whale taught her this dance.\n")
 
+    def _update_mass(self):
+        self.m = self.m_dry + self.m_prop_start
+
     def get_density(self, alt_km: float) -> float:
         data = pymsis.calculate(
             alts=alt_km,
-            lons=73.0, lats=-25.0,
-            dates=datetime(2025, 12, 25),
-            version=2.0
+            lons=self.site_lon, lats=self.site_lat,
+            dates=self.date,
+            version=self.msis_version,
+            **sw.msis_kwargs(self.space_weather, self.date)
         )
         return float(data[0, 0])
 
     def get_attitude(self, alt: float):
         if alt > 70_000:
-            return 1.8, self.A_belly          # belly-flop max drag
+            return self.Cd_belly, self.A_belly          # belly-flop max drag
         elif alt > 800:
-            return 0.9, self.A_edge           # flip maneuver – knife through silk
+            return self.Cd_edge, self.A_edge            # flip maneuver – knife through silk
         else:
-            return 0.4, self.A_vertical       # vertical – engines ready
+            return self.Cd_vertical, self.A_vertical    # vertical – engines ready
 
     def derivatives(self, t, state):
         alt, v_down, m = state
@@ -61,16 +80,15 @@ class TrajectorySong:
         a_gravity = self.g0 * (6371 / (6371 + alt/1000))**2
 
         # Landing burn logic – ignite when suicide burn equation says "now"
-        h_burn = 1500  # rough trigger altitude
         thrust = 0
-        if alt <= h_burn:
+        if alt <= self.h_burn:
             # Throttle to hover + a little (we want 0.5 m/s kiss, not slam)
             required_acc = a_gravity + 0.05  # tiny bit extra to slow to ~0.5 m/s
             thrust = required_acc * m
             if thrust > self.thrust_max:
                 thrust = self.thrust_max
-            if thrust < 0.4 * self.thrust_max:  # don't go below deep throttle
-                thrust = 0.4 * self.thrust_max
+            if thrust < self.throttle_floor * self.thrust_max:  # don't go below deep throttle
+                thrust = self.throttle_floor * self.thrust_max
 
         a_thrust = thrust / m if m > self.m_dry else 0
 
@@ -81,39 +99,81 @@ class TrajectorySong:
 
         return [-v_down, a_net, dm_dt]
 
-# ——— LAUNCH THE POEM ———
-song = TrajectorySong()
-
-sol = solve_ivp(
-    fun=song.derivatives,
-    t_span=(0, 900),
-    y0=[120_000, 7800, song.m],  # alt (m), v_down (m/s), mass (kg)
-    method='RK45',
-    events=lambda t, y: y[0],    # stop at ground
-    rtol=1e-8, atol=1e-8,
-    max_step=1.0
-)
-
-# ——— TOUCHDOWN ———
-final_v = abs(sol.y[1, -1])
-print(f"\nTOWER KISS at t = {sol.t[-1]:.1f} s")
-print(f"Final velocity: {final_v:.3f} m/s → {'PERFECT HOVER-KISS' if final_v < 0.7 else 'Close – adjusting throttle...'}")
-print("Chopsticks close. The dragonfly lands.")
-print("The whale, the falcon, and the cathedral all smile.\n")
-
-# ——— PLOT THE POEM ———
-plt.figure(figsize=(12, 8))
-plt.subplot(2, 1, 1)
-plt.plot(sol.t, sol.y[0]/1000, 'navy', lw=2)
-plt.ylabel("Altitude (km)")
-plt.title("TrajectorySong v1 – She Fell Like a Prayer and Landed Like a Kiss")
-plt.grid(alpha=0.3)
-
-plt.subplot(2, 1, 2)
-plt.plot(sol.t, np.abs(sol.y[1]), 'crimson', lw=2)
-plt.ylabel("Speed (m/s)")
-plt.xlabel("Time (s)")
-plt.grid(alpha=0.3)
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+def simulate(song=None, probe=None, t_span=(0, 900), h0=120_000, v0=7800,
+             rtol=1e-8, atol=1e-8, max_step=1.0):
+    """Fly her from 120 km to the tower and return the solve_ivp solution."""
+    if song is None:
+        song = TrajectorySong()
+    if probe is not None:
+        probe.attach(song)
+    with section(probe, "solve"):
+        sol = solve_ivp(
+            fun=song.derivatives,
+            t_span=t_span,
+            y0=[h0, v0, song.m],         # alt (m), v_down (m/s), mass (kg)
+            method='RK45',
+            events=lambda t, y: y[0],    # stop at ground
+            rtol=rtol, atol=atol,
+            max_step=max_step
+        )
+    if probe is not None:
+        probe.record_solution(sol, "RK45")
+    return sol
+
+def simulate_closed_loop(song=None, probe=None, rate_hz=100.0, h0=120_000, v0=7800, t_max=900.0,
+                         warm_start=True, pin_cpu=0):
+    """The same fall, landed by landing_guidance's fixed-rate loop instead of the RHS throttle rule."""
+    import landing_guidance
+
+    if song is None:
+        song = TrajectorySong()
+    return landing_guidance.fly(song, probe=probe, rate_hz=rate_hz, h0=h0, v0=v0, t_max=t_max,
+                                warm_start=warm_start, pin_cpu=pin_cpu)
+
+def simulate_sensitivities(song=None, probe=None, wrt=("h_burn", "throttle_floor", "m_prop_start",
+                                                       "Cd_belly", "Cd_edge", "Cd_vertical"),
+                           h0=120_000, v0=7800, t_max=900.0, rtol=1e-8, atol=1e-8):
+    """The fall once, carrying d(touchdown speed, propellant used)/d(wrt) along (descent_sensitivity)."""
+    import descent_sensitivity
+
+    if song is None:
+        song = TrajectorySong()
+    return descent_sensitivity.fly(song, probe=probe, wrt=tuple(wrt), h0=h0, v0=v0, t_max=t_max,
+                                   rtol=rtol, atol=atol)
+
+def plot(sol):
+    import matplotlib.pyplot as plt  # only plotting runs pay for matplotlib
+
+    plt.figure(figsize=(12, 8))
+    plt.subplot(2, 1, 1)
+    plt.plot(sol.t, sol.y[0]/1000, 'navy', lw=2)
+    plt.ylabel("Altitude (km)")
+    plt.title("TrajectorySong v1 – She Fell Like a Prayer and Landed Like a Kiss")
+    plt.grid(alpha=0.3)
+
+    plt.subplot(2, 1, 2)
+    plt.plot(sol.t, np.abs(sol.y[1]), 'crimson', lw=2)
+    plt.ylabel("Speed (m/s)")
+    plt.xlabel("Time (s)")
+    plt.grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    # ——— LAUNCH THE POEM ———
+    song = TrajectorySong()
+    probe = from_env("trajectory")
+    sol = simulate(song, probe)
+
+    # ——— TOUCHDOWN ———
+    final_v = abs(sol.y[1, -1])
+    print(f"\nTOWER KISS at t = {sol.t[-1]:.1f} s")
+    print(f"Final velocity: {final_v:.3f} m/s → {'PERFECT HOVER-KISS' if final_v < 0.7 else 'Close – adjusting throttle...'}")
+    print("Chopsticks close. The dragonfly lands.")
+    print("The whale, the falcon, and the cathedral all smile.\n")
+
+    # ——— PLOT THE POEM ———
+    with section(probe, "plot"):
+        plot(sol)
+    finish(probe)